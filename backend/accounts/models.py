@@ -56,6 +56,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS: list[str] = []
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # роль из БД: сигналы видят смену роли без повторного SELECT
+        instance._loaded_role = instance.__dict__.get("role")
+        return instance
+
     def __str__(self) -> str:
         return f"{self.email} ({self.role})"
 
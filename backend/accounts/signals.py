@@ -1,6 +1,7 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from core import refdata
 from .models import User, UserRole, DoctorProfile
 
 
@@ -11,3 +12,19 @@ def ensure_doctor_profile(sender, instance: User, created: bool, **kwargs):
             user=instance,
             defaults={"full_name": instance.full_name, "specialization": "", "phone": ""},
         )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def doctor_changed(sender, instance: User, created: bool = False, **kwargs):
+    loaded = getattr(instance, "_loaded_role", None)
+    # бывший врач тоже меняет список; роль до изменения неизвестна (объект не из БД) -> сбрасываем на всякий случай
+    if instance.role == UserRole.DOCTOR or loaded == UserRole.DOCTOR or (loaded is None and not created):
+        refdata.invalidate("doctors")
+    instance._loaded_role = instance.role
+
+
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_delete, sender=DoctorProfile)
+def doctor_profile_changed(sender, instance: DoctorProfile, **kwargs):
+    refdata.invalidate("doctors")
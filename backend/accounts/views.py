@@ -3,6 +3,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from core.permissions import IsAdminRole
+from core.refdata import CachedListMixin
 from .models import User, UserRole
 from .serializers import AdminDoctorSerializer, MeSerializer
 
@@ -12,7 +13,8 @@ class MeView(APIView):
         return Response(MeSerializer(request.user).data)
 
 
-class AdminDoctorViewSet(viewsets.ModelViewSet):
+class AdminDoctorViewSet(CachedListMixin, viewsets.ModelViewSet):
+    refdata_name = "doctors"
     serializer_class = AdminDoctorSerializer
     permission_classes = [IsAdminRole]
 
@@ -0,0 +1,13 @@
+import django_filters
+
+from .models import AuditLog
+
+
+class AuditLogFilter(django_filters.FilterSet):
+    # фильтр по created_at отсекает месячные разделы, которые не пересекаются с диапазоном
+    date_from = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="gte")
+    date_to = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="lte")
+
+    class Meta:
+        model = AuditLog
+        fields = ("action", "object_type", "object_id", "actor", "date_from", "date_to")
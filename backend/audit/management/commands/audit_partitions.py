@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from audit import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Monthly partitions of the audit log: create upcoming months (run daily from cron), "
+        "list them, or archive months older than the retention period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("mode", choices=["create", "list", "archive"])
+        parser.add_argument(
+            "--ahead", type=int, default=settings.AUDIT_PARTITIONS_AHEAD, help="create: months after the current one",
+        )
+        parser.add_argument(
+            "--keep-months", type=int, default=settings.AUDIT_RETENTION_MONTHS,
+            help="archive: months kept in the table, the current one included",
+        )
+        parser.add_argument("--dir", default=None, help="archive: directory for .csv.gz files (default AUDIT_ARCHIVE_DIR)")
+        parser.add_argument(
+            "--no-drop", action="store_true", help="archive: only detach, keep the tables (later runs skip them)",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["mode"] == "create":
+            created = partitions.ensure(opts["ahead"])
+            for name in created:
+                self.stdout.write(f"  created {name}")
+            self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions"))
+            return
+
+        if opts["mode"] == "list":
+            for p in partitions.stats():
+                self.stdout.write(f"  {p['table']}: ~{p['rows']} rows, {p['bytes'] // 1024} KiB, {p['bounds']}")
+            for name in partitions.detached(kept=True):
+                self.stdout.write(f"  {name}: detached, kept (--no-drop)")
+            for name in partitions.detached(kept=False):
+                self.stdout.write(self.style.WARNING(f"  {name}: detached, not archived"))
+            return
+
+        if opts["keep_months"] < 1:
+            raise CommandError("--keep-months must be at least 1")
+        current = partitions.month_start(timezone.now().date())
+        before = partitions.add_months(current, 1 - opts["keep_months"])
+        directory = Path(opts["dir"] or settings.AUDIT_ARCHIVE_DIR)
+        done = partitions.archive(before, directory, drop=not opts["no_drop"])
+        for name, path in done:
+            self.stdout.write(f"  {name}: {path or 'detached'}")
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(done)} partitions older than {before}"))
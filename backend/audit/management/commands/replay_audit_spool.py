@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from audit.writer import replay_spool
+
+
+class Command(BaseCommand):
+    help = "Write audit entries left in spool files by stopped processes (files of running processes are skipped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=None, help="Spool directory (default AUDIT_SPOOL_DIR)")
+
+    def handle(self, *args, **opts):
+        directory = Path(opts["dir"] or settings.AUDIT_SPOOL_DIR)
+        written = replay_spool(directory)
+        self.stdout.write(self.style.SUCCESS(f"Replayed {written} audit entries from {directory}"))
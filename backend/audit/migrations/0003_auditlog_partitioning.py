@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Таблица пересоздаётся секционированной по created_at (месяц UTC) и данные копируются в неё:
+# на большом журнале миграцию запускать в окно обслуживания. Первичный ключ (id, created_at) —
+# ключ секционирования обязан в него входить; для Django первичным ключом остаётся id (уникален по последовательности).
+FORWARD = """
+ALTER TABLE audit_auditlog RENAME TO audit_auditlog_unpartitioned;
+ALTER INDEX audit_auditlog_pkey RENAME TO audit_auditlog_unpartitioned_pkey;
+ALTER INDEX audit_audit_action_766c6d_idx RENAME TO audit_auditlog_unpartitioned_action;
+ALTER INDEX audit_audit_object__1f9df3_idx RENAME TO audit_auditlog_unpartitioned_object;
+ALTER INDEX audit_auditlog_actor_id_20e70a27 RENAME TO audit_auditlog_unpartitioned_actor;
+
+CREATE SEQUENCE audit_auditlog_partitioned_id_seq;
+CREATE TABLE audit_auditlog (
+    id bigint NOT NULL DEFAULT nextval('audit_auditlog_partitioned_id_seq'),
+    action varchar(20) NOT NULL,
+    object_type varchar(120) NOT NULL,
+    object_id varchar(64) NOT NULL,
+    ip varchar(64) NOT NULL,
+    user_agent text NOT NULL,
+    meta jsonb NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    actor_id bigint NULL,
+    CONSTRAINT audit_auditlog_pkey PRIMARY KEY (id, created_at),
+    CONSTRAINT audit_auditlog_actor_id_20e70a27_fk_accounts_user_id
+        FOREIGN KEY (actor_id) REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED
+) PARTITION BY RANGE (created_at);
+ALTER SEQUENCE audit_auditlog_partitioned_id_seq OWNED BY audit_auditlog.id;
+
+CREATE INDEX audit_audit_action_766c6d_idx ON audit_auditlog (action, created_at);
+CREATE INDEX audit_audit_object__1f9df3_idx ON audit_auditlog (object_type, object_id);
+CREATE INDEX audit_auditlog_actor_id_20e70a27 ON audit_auditlog (actor_id);
+CREATE INDEX audit_created_at_idx ON audit_auditlog (created_at);
+
+CREATE TABLE audit_auditlog_default PARTITION OF audit_auditlog DEFAULT;
+
+-- месяцы с данными и три месяца вперёд (дальше — `manage.py audit_partitions create` по расписанию)
+DO $$
+DECLARE
+    m date;
+    last date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months')::date;
+BEGIN
+    SELECT date_trunc('month', coalesce(min(created_at), now()) AT TIME ZONE 'UTC')::date INTO m
+    FROM audit_auditlog_unpartitioned;
+    WHILE m <= last LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF audit_auditlog FOR VALUES FROM (%L) TO (%L)',
+            'audit_auditlog_p' || to_char(m, 'YYYY_MM'),
+            m::timestamp AT TIME ZONE 'UTC',
+            (m + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+        );
+        m := (m + interval '1 month')::date;
+    END LOOP;
+END $$;
+
+INSERT INTO audit_auditlog (id, action, object_type, object_id, ip, user_agent, meta, created_at, actor_id)
+SELECT id, action, object_type, object_id, ip, user_agent, meta, created_at, actor_id
+FROM audit_auditlog_unpartitioned;
+SELECT setval('audit_auditlog_partitioned_id_seq', coalesce((SELECT max(id) FROM audit_auditlog), 0) + 1, false);
+
+DROP TABLE audit_auditlog_unpartitioned;
+"""
+
+BACKWARD = """
+ALTER TABLE audit_auditlog RENAME TO audit_auditlog_partitioned;
+ALTER INDEX audit_auditlog_pkey RENAME TO audit_auditlog_partitioned_pkey;
+ALTER INDEX audit_audit_action_766c6d_idx RENAME TO audit_auditlog_partitioned_action;
+ALTER INDEX audit_audit_object__1f9df3_idx RENAME TO audit_auditlog_partitioned_object;
+ALTER INDEX audit_auditlog_actor_id_20e70a27 RENAME TO audit_auditlog_partitioned_actor;
+DROP INDEX audit_created_at_idx;
+
+CREATE TABLE audit_auditlog (
+    id bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    action varchar(20) NOT NULL,
+    object_type varchar(120) NOT NULL,
+    object_id varchar(64) NOT NULL,
+    ip varchar(64) NOT NULL,
+    user_agent text NOT NULL,
+    meta jsonb NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    actor_id bigint NULL
+        CONSTRAINT audit_auditlog_actor_id_20e70a27_fk_accounts_user_id
+        REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED
+);
+CREATE INDEX audit_audit_action_766c6d_idx ON audit_auditlog (action, created_at);
+CREATE INDEX audit_audit_object__1f9df3_idx ON audit_auditlog (object_type, object_id);
+CREATE INDEX audit_auditlog_actor_id_20e70a27 ON audit_auditlog (actor_id);
+INSERT INTO audit_auditlog (id, action, object_type, object_id, ip, user_agent, meta, created_at, actor_id)
+SELECT id, action, object_type, object_id, ip, user_agent, meta, created_at, actor_id
+FROM audit_auditlog_partitioned;
+SELECT setval(pg_get_serial_sequence('audit_auditlog', 'id'), coalesce((SELECT max(id) FROM audit_auditlog), 0) + 1, false);
+
+DROP TABLE audit_auditlog_partitioned;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_created_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(FORWARD, BACKWARD)],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='auditlog',
+                    index=models.Index(fields=['created_at'], name='audit_created_at_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class AuditAction(models.TextChoices):
@@ -27,12 +28,15 @@ class AuditLog(models.Model):
     user_agent = models.TextField(blank=True)
 
     meta = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # не auto_now_add: буферизованная запись сохраняет время события, а не время сброса
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=["action", "created_at"]),
             models.Index(fields=["object_type", "object_id"]),
+            # таблица секционирована по месяцам created_at (миграция 0003, audit/partitions.py)
+            models.Index(fields=["created_at"], name="audit_created_at_idx"),
         ]
 
     def __str__(self):
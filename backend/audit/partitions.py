@@ -0,0 +1,176 @@
+"""
+Monthly partitions of the audit log (audit/migrations/0003_auditlog_partitioning).
+
+audit_auditlog is partitioned by RANGE (created_at): one partition per UTC month named
+audit_auditlog_pYYYY_MM, plus audit_auditlog_default for rows outside every month partition (so an INSERT
+never fails when `audit_partitions create` did not run in time). Retention detaches old months, copies them
+to gzip CSV files and drops them: the log shrinks without a DELETE.
+"""
+from __future__ import annotations
+
+import gzip
+import os
+import re
+from datetime import date, datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AuditLog
+
+
+PARENT = AuditLog._meta.db_table
+DEFAULT = f"{PARENT}_default"
+NAME_RE = re.compile(rf"^{PARENT}_p(\d{{4}})_(\d{{2}})$")
+# комментарий таблицы, отсоединённой с --no-drop: следующие запуски archive её не трогают
+KEPT = "audit_partitions: kept detached (--no-drop)"
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_p{month.year:04d}_{month.month:02d}"
+
+
+def _bound(month: date) -> datetime:
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _month_of(name: str) -> date | None:
+    m = NAME_RE.match(name)
+    return date(int(m[1]), int(m[2]), 1) if m else None
+
+
+def attached() -> dict[date, str]:
+    """Month partitions currently attached: {month: table}."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [PARENT],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return {month: name for name in names if (month := _month_of(name))}
+
+
+def detached(kept: bool | None = None) -> list[str]:
+    """
+    Month tables that are not attached: kept by `archive --no-drop` (kept=True), left by an interrupted
+    archive run (kept=False) or both (None).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, obj_description(c.oid, 'pg_class') IS NOT DISTINCT FROM %s FROM pg_class c "
+            "WHERE c.relkind = 'r' AND c.relname LIKE %s AND NOT c.relispartition AND pg_table_is_visible(c.oid)",
+            [KEPT, f"{PARENT}\\_p%"],
+        )
+        return sorted(
+            name for name, is_kept in cursor.fetchall()
+            if _month_of(name) and (kept is None or is_kept == kept)
+        )
+
+
+def create_partition(month: date) -> str:
+    """
+    Create and attach the partition of `month`. Rows of that month already in the default partition
+    are moved into it first (ATTACH fails while the default holds rows of the range).
+    """
+    name = partition_name(month)
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    qn = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        # пока переносим строки, новые записи того же месяца не должны попасть в раздел по умолчанию
+        cursor.execute(f"LOCK TABLE {qn(DEFAULT)} IN EXCLUSIVE MODE")
+        cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(PARENT)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(DEFAULT)} WHERE created_at >= %s AND created_at < %s RETURNING *) "
+            f"INSERT INTO {qn(name)} SELECT * FROM moved",
+            [lower, upper],
+        )
+        # индексы и внешний ключ родителя создаются на разделе при ATTACH
+        cursor.execute(
+            f"ALTER TABLE {qn(PARENT)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+            [lower, upper],
+        )
+    return name
+
+
+def ensure(ahead: int, today: date | None = None) -> list[str]:
+    """Partitions from the current month to `ahead` months later; returns the created ones."""
+    current = month_start(today or timezone.now().astimezone(dt_timezone.utc).date())
+    existing = attached()
+    return [
+        create_partition(month)
+        for month in (add_months(current, i) for i in range(ahead + 1))
+        if month not in existing
+    ]
+
+
+def _archive_table(name: str, directory: Path) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.csv.gz"
+    partial = directory / f".{name}.csv.gz.partial"
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor, gzip.open(partial, "wb", compresslevel=6) as out:
+        with cursor.copy(f"COPY (SELECT * FROM {qn(name)} ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+            for chunk in copy:
+                out.write(chunk)
+    with open(partial, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+    return path
+
+
+def archive(before: date, directory: Path, drop: bool = True) -> list[tuple[str, Path | None]]:
+    """
+    Detach month partitions older than `before`, write each to <directory>/<table>.csv.gz and drop it.
+    drop=False only detaches and marks the tables as kept (e.g. to re-attach them): later runs skip them.
+    Tables left detached by an interrupted run are archived too. Returns [(table, file or None)].
+    """
+    qn = connection.ops.quote_name
+    just_detached = []
+    for month, name in sorted(attached().items()):
+        if month < month_start(before):
+            # без CONCURRENTLY: он невозможен при разделе по умолчанию; отсоединение без сканирования, блокировка короткая
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {qn(PARENT)} DETACH PARTITION {qn(name)}")
+                if not drop:
+                    cursor.execute(f"COMMENT ON TABLE {qn(name)} IS %s", [KEPT])
+            just_detached.append(name)
+
+    if not drop:
+        return [(name, None) for name in just_detached]
+
+    done = []
+    leftovers = [name for name in detached(kept=False) if _month_of(name) < month_start(before)]
+    for name in sorted(set(just_detached) | set(leftovers)):
+        path = _archive_table(name, directory)
+        # таблицу удаляем только после того, как файл записан на диск
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {qn(name)}")
+        done.append((name, path))
+    return done
+
+
+def stats() -> list[dict]:
+    """Every partition (month ones and the default) with its estimated rows and size."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid), "
+            "pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+            [PARENT],
+        )
+        return [
+            {"table": name, "rows": max(rows, 0), "bytes": size, "bounds": bounds}
+            for name, rows, size, bounds in cursor.fetchall()
+        ]
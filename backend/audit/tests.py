@@ -1,3 +1,232 @@
-from django.test import TestCase
+import csv
+import fcntl
+import gzip
+import json
+import os
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from accounts.models import User, UserRole
+from audit import partitions
+from audit.models import AuditLog
+from audit.utils import log_action
+from audit.writer import AuditWriter, replay_spool
+from clinic.models import Patient, Service, Appointment, VisitNote
+from clinic.tests.helpers import MONDAY, at
+from clinic.tests.test_api import auth
+
+
+class BufferedAuditTests(APITransactionTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spool = Path(tmp.name)
+        # сбрасываем вручную: фоновый поток спит дольше теста
+        settings = override_settings(AUDIT_SPOOL_DIR=tmp.name, AUDIT_FLUSH_SECONDS=60, AUDIT_BATCH_SIZE=50)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.writer = AuditWriter()
+        patcher = mock.patch("audit.writer.writer", self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.writer.close)
+
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        patient = Patient.objects.create(first_name="John", last_name="Doe")
+        service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        appt = Appointment.objects.create(
+            patient=patient, doctor=self.doctor, service=service, start_at=at(MONDAY, 9), end_at=at(MONDAY, 9, 30),
+        )
+        self.note = VisitNote.objects.create(appointment=appt, note_text="Headache.")
+        auth(self.client, self.doctor)
+
+    def logs(self):
+        return AuditLog.objects.filter(meta__type="visit_note", object_id=str(self.note.id))
+
+    def spooled(self):
+        return [json.loads(line) for path in self.spool.glob("*.jsonl") for line in path.read_text().splitlines()]
+
+    def test_read_is_queued_then_flushed(self):
+        before = timezone.now()
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get(f"/api/doctor/visit-notes/{self.note.id}/")
+        self.assertEqual(r.status_code, 200)
+        self.assertFalse([q for q in queries if "audit_auditlog" in q["sql"]])
+        self.assertFalse(self.logs().exists())
+        self.assertEqual([e["object_id"] for e in self.spooled()], [str(self.note.id)])
+
+        self.assertEqual(self.writer.flush(), 1)
+        log = self.logs().get()
+        self.assertEqual((log.actor_id, log.action), (self.doctor.id, "READ"))
+        self.assertLess(log.created_at, timezone.now())
+        self.assertGreaterEqual(log.created_at, before)  # время запроса, а не сброса
+        self.assertEqual(self.spooled(), [])
+
+    def test_batch_size_wakes_the_thread(self):
+        with override_settings(AUDIT_BATCH_SIZE=3):
+            for _ in range(3):
+                self.client.get(f"/api/doctor/visit-notes/{self.note.id}/")
+            for _ in range(50):
+                if self.logs().count() == 3:
+                    break
+                self.writer._wake.wait(0.05)
+        self.assertEqual(self.logs().count(), 3)
+
+    def test_failed_flush_keeps_entries(self):
+        self.client.get(f"/api/doctor/visit-notes/{self.note.id}/")
+        with mock.patch("audit.writer.write_entries", side_effect=RuntimeError("db down")), self.assertLogs("audit.writer"):
+            self.assertEqual(self.writer.flush(), 0)
+        self.assertEqual(self.writer.stats(), {"pending": 0, "failed": 1})
+        self.assertEqual(len(self.spooled()), 1)
+
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(self.logs().count(), 1)
+
+    def test_outage_does_not_open_a_spool_per_flush(self):
+        self.client.get(f"/api/doctor/visit-notes/{self.note.id}/")
+        with mock.patch("audit.writer.write_entries", side_effect=RuntimeError("db down")) as write, \
+                self.assertLogs("audit.writer"):
+            for _ in range(5):
+                self.client.get(f"/api/doctor/visit-notes/{self.note.id}/")
+                self.assertEqual(self.writer.flush(), 0)
+        # повторялась только первая пачка, остальные ждут в одном файле
+        self.assertEqual([len(call.args[0]) for call in write.call_args_list], [2] * 5)
+        self.assertEqual(self.writer.stats(), {"pending": 4, "failed": 2})
+        self.assertEqual(len(list(self.spool.glob("*.jsonl"))), 2)
+
+        self.assertEqual(self.writer.flush(), 6)
+        self.assertEqual(self.logs().count(), 6)
+        self.assertEqual(self.spooled(), [])
+
+    def test_close_flushes_and_deleted_actor_becomes_null(self):
+        admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+        request.user = admin
+        log_action(request=request, action="READ", obj=self.note, meta={"type": "visit_note"})
+        admin.delete()
+
+        self.writer.close()
+        self.assertEqual(list(self.logs().values_list("actor_id", "ip")), [(None, "10.0.0.1")])
+        self.assertEqual(list(self.spool.iterdir()), [])
+
+    def test_spool_of_a_dead_process_is_replayed(self):
+        entry = {
+            "actor_id": self.doctor.id, "action": "READ", "object_type": "clinic.VisitNote",
+            "object_id": str(self.note.id), "ip": "", "user_agent": "", "meta": {"type": "visit_note"},
+            "created_at": "2030-01-07T09:00:00+05:00",
+        }
+        (self.spool / "audit-1-dead.jsonl").write_text(json.dumps(entry) + "\n" + '{"actor_id": ')  # оборван при падении
+
+        # файл живого процесса не трогаем
+        self.client.get(f"/api/doctor/visit-notes/{self.note.id}/")
+        with self.assertLogs("audit.writer", "WARNING"):
+            self.assertEqual(replay_spool(self.spool), 1)
+        self.assertEqual(self.logs().get().created_at, datetime.fromisoformat(entry["created_at"]))
+        self.assertEqual(len(list(self.spool.glob("*.jsonl"))), 1)
+
+        self.writer.close()
+        self.assertEqual(self.logs().count(), 2)
+
+    def test_file_replayed_while_waiting_for_the_lock_is_skipped(self):
+        path = self.spool / "audit-3-dead.jsonl"
+        path.write_text(json.dumps({
+            "actor_id": None, "action": "DELETE", "object_type": "", "object_id": "", "ip": "", "user_agent": "",
+            "meta": {}, "created_at": "2030-01-07T09:00:00+05:00",
+        }) + "\n")
+        real_flock = fcntl.flock
+
+        def replayed_by_another_process(file, operation):
+            # другой процесс открыл файл раньше, записал и удалил его
+            path.unlink()
+            real_flock(file, operation)
+
+        with mock.patch("audit.writer.fcntl.flock", replayed_by_another_process):
+            self.assertEqual(replay_spool(self.spool), 0)
+        self.assertFalse(AuditLog.objects.filter(action="DELETE").exists())
+
+    def test_replay_command(self):
+        os.makedirs(self.spool, exist_ok=True)
+        (self.spool / "audit-2-dead.jsonl").write_text(json.dumps({
+            "actor_id": None, "action": "DELETE", "object_type": "", "object_id": "", "ip": "", "user_agent": "",
+            "meta": {}, "created_at": "2030-01-07T09:00:00+05:00",
+        }) + "\n")
+        call_command("replay_audit_spool", "--dir", str(self.spool), stdout=open(os.devnull, "w"))
+        self.assertEqual(AuditLog.objects.filter(action="DELETE").count(), 1)
+
+
+class TransactionalAuditTests(TestCase):
+    def test_inside_transaction_written_at_once(self):
+        with self.assertNumQueries(1):
+            log_action(request=None, action="DELETE", meta={"type": "test"})
+        self.assertEqual(AuditLog.objects.filter(meta__type="test").count(), 1)
+
+
+class PartitionTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.log = self.entry(datetime(2031, 5, 10, 9, tzinfo=dt_timezone.utc))
+        self.entry(datetime(2031, 4, 30, 23, tzinfo=dt_timezone.utc))
+
+    def entry(self, created_at):
+        return AuditLog.objects.create(actor=self.admin, action="READ", object_type="clinic.Patient", created_at=created_at)
+
+    def partition_of(self, log):
+        return AuditLog.objects.filter(pk=log.pk).extra(select={"t": "tableoid::regclass::text"}).values_list("t", flat=True).get()
+
+    def test_create_moves_rows_out_of_default(self):
+        self.assertEqual(self.partition_of(self.log), partitions.DEFAULT)
+        created = partitions.ensure(2, today=date(2031, 5, 3))
+        self.assertEqual(created, ["audit_auditlog_p2031_05", "audit_auditlog_p2031_06", "audit_auditlog_p2031_07"])
+        self.assertEqual(self.partition_of(self.log), "audit_auditlog_p2031_05")
+        self.assertEqual(partitions.ensure(2, today=date(2031, 5, 3)), [])
+
+        # запрос с диапазоном created_at читает только свой месяц
+        plan = AuditLog.objects.filter(
+            created_at__gte=datetime(2031, 5, 1, tzinfo=dt_timezone.utc), created_at__lt=datetime(2031, 6, 1, tzinfo=dt_timezone.utc),
+        ).explain()
+        self.assertIn("audit_auditlog_p2031_05", plan)
+        self.assertNotIn("default", plan)
+
+    def test_viewset_filters_by_date(self):
+        partitions.ensure(0, today=date(2031, 5, 3))
+        auth(self.client, self.admin)
+        r = self.client.get("/api/admin/audit-logs/", {"date_from": "2031-05-01T00:00:00Z", "date_to": "2031-05-31T23:59:59Z"})
+        self.assertEqual([row["id"] for row in r.data["results"]], [self.log.id])
+        self.assertEqual(self.client.get(f"/api/admin/audit-logs/{self.log.id}/").data["id"], self.log.id)
+
+    def test_archive_detaches_and_writes_file(self):
+        partitions.ensure(1, today=date(2031, 4, 3))
+        with tempfile.TemporaryDirectory() as tmp:
+            done = dict(partitions.archive(date(2031, 5, 1), Path(tmp)))
+            self.assertEqual(done["audit_auditlog_p2031_04"], Path(tmp) / "audit_auditlog_p2031_04.csv.gz")
+            self.assertEqual(partitions.detached(), [])
+            self.assertEqual(AuditLog.objects.count(), 1)  # апрельская запись ушла вместе с разделом
+            with gzip.open(Path(tmp) / "audit_auditlog_p2031_04.csv.gz", "rt") as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual([(row["action"], row["actor_id"]) for row in rows], [("READ", str(self.admin.id))])
+
+    def test_archive_skips_kept_tables(self):
+        partitions.ensure(1, today=date(2031, 3, 3))
+        with tempfile.TemporaryDirectory() as tmp:
+            done = dict(partitions.archive(date(2031, 4, 1), Path(tmp), drop=False))
+            self.assertIsNone(done["audit_auditlog_p2031_03"])
+            self.assertIn("audit_auditlog_p2031_03", partitions.detached(kept=True))
+
+            # прерванный запуск: раздел отсоединён, но не записан
+            with connection.cursor() as cursor:
+                cursor.execute("ALTER TABLE audit_auditlog DETACH PARTITION audit_auditlog_p2031_04")
+            done = dict(partitions.archive(date(2031, 5, 1), Path(tmp)))
+            self.assertIn("audit_auditlog_p2031_04", done)
+            self.assertNotIn("audit_auditlog_p2031_03", done)
+            self.assertIn("audit_auditlog_p2031_03", partitions.detached(kept=True))
+            self.assertEqual(partitions.detached(kept=False), [])
+            self.assertNotIn("audit_auditlog_p2031_03.csv.gz", os.listdir(tmp))
@@ -1,3 +1,8 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
 def _get_ip(request) -> str:
     return request.META.get("REMOTE_ADDR", "") if request else ""
 
@@ -6,26 +11,68 @@ def _get_user_agent(request) -> str:
     return request.META.get("HTTP_USER_AGENT", "") if request else ""
 
 
-def log_action(*, request, action: str, obj=None, meta: dict | None = None):
-    from audit.models import AuditLog
-
+def _get_actor(request):
     actor = getattr(request, "user", None)
     if not actor or not getattr(actor, "is_authenticated", False):
-        actor = None
+        return None
+    return actor
+
 
-    object_type = ""
-    object_id = ""
+def _object_ref(obj) -> tuple[str, str]:
+    if obj is None:
+        return "", ""
+    return f"{obj._meta.app_label}.{obj.__class__.__name__}", str(getattr(obj, "pk", ""))
 
-    if obj is not None:
-        object_type = f"{obj._meta.app_label}.{obj.__class__.__name__}"
-        object_id = str(getattr(obj, "pk", ""))
 
-    AuditLog.objects.create(
-        actor=actor,
+def log_action(*, request, action: str, obj=None, meta: dict | None = None):
+    """
+    Outside a transaction (reads, autocommit writes) the entry goes to the buffered writer (audit.writer)
+    and the request does not wait for the INSERT. Inside one it is written at once, so it commits
+    or rolls back together with the change it describes.
+    """
+    from audit.models import AuditLog
+    from audit.writer import writer
+
+    object_type, object_id = _object_ref(obj)
+    actor = _get_actor(request)
+    entry = dict(
+        actor_id=actor.pk if actor else None,
         action=action,
         object_type=object_type,
         object_id=object_id,
         ip=_get_ip(request),
         user_agent=_get_user_agent(request),
         meta=meta or {},
+        created_at=timezone.now(),
     )
+
+    if settings.AUDIT_BUFFER and not transaction.get_connection().in_atomic_block:
+        writer.put(entry)
+    else:
+        AuditLog.objects.create(**entry)
+
+
+def log_actions_bulk(*, request, action: str, objs, meta=None):
+    """
+    Same as log_action for many objects, written with a single bulk INSERT.
+    meta: dict shared by all rows, or a callable obj -> dict.
+    """
+    from audit.models import AuditLog
+
+    actor = _get_actor(request)
+    ip = _get_ip(request)
+    user_agent = _get_user_agent(request)
+
+    rows = []
+    for obj in objs:
+        object_type, object_id = _object_ref(obj)
+        rows.append(AuditLog(
+            actor=actor,
+            action=action,
+            object_type=object_type,
+            object_id=object_id,
+            ip=ip,
+            user_agent=user_agent,
+            meta=(meta(obj) if callable(meta) else meta) or {},
+        ))
+    AuditLog.objects.bulk_create(rows)
@@ -1,12 +1,17 @@
 from rest_framework import viewsets
 from core.permissions import IsAdminRole
+from .filters import AuditLogFilter
 from .models import AuditLog
 from .serializers import AuditLogSerializer
 
 
 class AdminAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    The table is partitioned by month of created_at: ?date_from= / ?date_to= scan only the matching months,
+    the newest-first list reads the last months through the created_at index and stops at the page size.
+    """
     queryset = AuditLog.objects.select_related("actor").all().order_by("-created_at")
     serializer_class = AuditLogSerializer
     permission_classes = [IsAdminRole]
     search_fields = ("actor__email", "object_type", "object_id", "ip")
-    filterset_fields = ("action", "object_type")
+    filterset_class = AuditLogFilter
@@ -0,0 +1,259 @@
+"""
+Buffered audit writer: log_action outside a transaction only queues the entry, a background thread writes
+the queue with one bulk INSERT every AUDIT_FLUSH_SECONDS or AUDIT_BATCH_SIZE entries, and at exit.
+
+Every queued entry is first appended to this process' spool file in AUDIT_SPOOL_DIR; a flushed batch
+removes its file. Files left by a crashed process are written to the table by the next process that starts
+(or by `manage.py replay_audit_spool`). A live process holds an flock on its files, so they are never
+replayed twice. Delivery is at least once: a crash between the INSERT and the unlink replays the batch again.
+
+While a batch fails, new entries stay in the current spool file and only the failed batch is retried (with a
+growing pause), so an outage does not open a file per flush.
+"""
+from __future__ import annotations
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SUFFIX = ".jsonl"
+# потолок паузы между повторами, пока база недоступна
+MAX_RETRY_SECONDS = 60.0
+
+
+def write_entries(lines) -> int:
+    """
+    One INSERT ... SELECT FROM jsonb_to_recordset for a batch of JSON lines: Postgres parses the JSON, so the
+    flushing thread does almost no Python work (it shares the GIL with the requests). An actor deleted
+    while the entry waited becomes NULL, as with on_delete=SET_NULL.
+    """
+    from django.contrib.auth import get_user_model
+
+    from audit.models import AuditLog
+
+    if not lines:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {AuditLog._meta.db_table}
+                (actor_id, action, object_type, object_id, ip, user_agent, meta, created_at)
+            SELECT
+                (SELECT u.id FROM {get_user_model()._meta.db_table} u WHERE u.id = r.actor_id),
+                r.action, r.object_type, r.object_id, r.ip, r.user_agent, coalesce(r.meta, '{{}}'), r.created_at
+            FROM jsonb_to_recordset(%s::jsonb) AS r(
+                actor_id bigint, action text, object_type text, object_id text, ip text, user_agent text,
+                meta jsonb, created_at timestamptz
+            )
+            """,
+            ["[" + ",".join(lines) + "]"],
+        )
+    return len(lines)
+
+
+class _Spool:
+    """Append-only JSON lines file locked by this process."""
+
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"audit-{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        # блокируем до того, как файл станет виден под итоговым именем: иначе его могли бы забрать как брошенный
+        tmp = directory / f".{name}.tmp"
+        self.file = open(tmp, "a", encoding="utf-8")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        self.path = directory / f"{name}{SPOOL_SUFFIX}"
+        os.rename(tmp, self.path)
+
+    def append(self, line: str):
+        self.file.write(line)
+        self.file.flush()
+        if settings.AUDIT_SPOOL_FSYNC:
+            os.fsync(self.file.fileno())
+
+    def discard(self):
+        self.path.unlink(missing_ok=True)
+        self.file.close()
+
+
+def replay_spool(directory: Path | None = None) -> int:
+    """Write entries of spool files not locked by a live process; returns the number of entries."""
+    directory = Path(directory or settings.AUDIT_SPOOL_DIR)
+    if not directory.is_dir():
+        return 0
+    total = 0
+    for path in sorted(directory.glob(f"*{SPOOL_SUFFIX}")):
+        try:
+            file = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            continue
+        with file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue  # процесс-владелец жив
+            # пока ждали блокировку, файл мог записать и удалить другой процесс
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if os.fstat(file.fileno()).st_ino != current.st_ino:
+                continue
+            entries = []
+            for line in file:
+                try:
+                    json.loads(line)
+                except ValueError:
+                    # последняя строка могла быть недописана при падении
+                    logger.warning("Skipping a broken line in %s", path)
+                    continue
+                entries.append(line)
+            for start in range(0, len(entries), settings.AUDIT_BATCH_SIZE):
+                total += write_entries(entries[start:start + settings.AUDIT_BATCH_SIZE])
+            path.unlink(missing_ok=True)
+    return total
+
+
+class AuditWriter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def _start(self):
+        # после fork (gunicorn --preload) поток и файл родителя не наши: начинаем заново
+        self._pid = os.getpid()
+        self._pending = []
+        self._failed = []
+        self._stop = False
+        directory = settings.AUDIT_SPOOL_DIR
+        self._spool_dir = Path(directory) if directory else None
+        self._spool = None
+        if self._spool_dir:
+            try:
+                self._spool = _Spool(self._spool_dir)
+            except OSError:
+                logger.exception("Cannot open an audit spool file in %s; entries are kept in memory only", directory)
+        self._thread = threading.Thread(target=self._loop, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, entry: dict):
+        # DjangoJSONEncoder округляет время до миллисекунд
+        line = json.dumps(dict(entry, created_at=entry["created_at"].isoformat()), cls=DjangoJSONEncoder)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            if self._spool:
+                try:
+                    self._spool.append(line + "\n")
+                except OSError:
+                    # запрос не роняем: запись остаётся в памяти
+                    logger.exception("Cannot append to the audit spool %s", self._spool.path)
+            # в памяти держим ту же строку, что в файле
+            self._pending.append(line)
+            # пока база недоступна, поток повторяет по своему расписанию
+            full = len(self._pending) >= settings.AUDIT_BATCH_SIZE and not self._failed
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write everything queued so far in the calling thread; returns the number of entries written."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return 0
+            batches, self._failed = self._failed, []
+        written, ok = self._write(batches)
+        if not ok:
+            # новые записи ждут в текущем файле спула, пока не запишутся старые
+            return written
+
+        with self._lock:
+            if not self._pending or self._failed:
+                return written
+            spool = self._spool
+            if spool:
+                try:
+                    self._spool = _Spool(self._spool_dir)
+                except OSError:
+                    logger.exception("Cannot open a new audit spool file; entries stay in %s", spool.path)
+                    return written
+            batches = [(self._pending, spool)]
+            self._pending = []
+        more, _ = self._write(batches)
+        return written + more
+
+    def _write(self, batches) -> tuple[int, bool]:
+        written = 0
+        for i, (entries, spool) in enumerate(batches):
+            try:
+                written += write_entries(entries)
+            except Exception:
+                logger.exception("Audit flush failed, %s entries kept for the next attempt", len(entries))
+                with self._lock:
+                    self._failed[:0] = batches[i:]
+                return written, False
+            if spool:
+                spool.discard()
+        return written, True
+
+    def _loop(self):
+        replayed = False
+        failures = 0
+        while True:
+            self._wake.wait(min(settings.AUDIT_FLUSH_SECONDS * 2 ** failures, MAX_RETRY_SECONDS))
+            self._wake.clear()
+            try:
+                if not replayed and self._spool_dir:
+                    # файлы процессов, упавших до записи
+                    replay_spool(self._spool_dir)
+                    replayed = True
+                self.flush()
+            except Exception:
+                logger.exception("Audit writer iteration failed")
+            finally:
+                # между сбросами соединение не держим
+                connection.close()
+            with self._lock:
+                failures = min(failures + 1, 10) if self._failed else 0
+            if self._stop:
+                return
+
+    def close(self, timeout: float = 10.0):
+        """Stop the thread after a last flush (called at exit)."""
+        if self._pid != os.getpid():
+            return
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return
+        # пока поток сбрасывал, могли добавиться записи
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Audit flush at exit failed; entries stay in the spool")
+        with self._lock:
+            if self._spool and not self._pending:
+                self._spool.discard()
+                self._spool = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._pid != os.getpid():
+                return {"pending": 0, "failed": 0}
+            return {"pending": len(self._pending), "failed": sum(len(e) for e, _ in self._failed)}
+
+
+writer = AuditWriter()
+atexit.register(writer.close)
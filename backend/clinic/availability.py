@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.utils import timezone
+
+from .models import ACTIVE_APPOINTMENT_STATUSES, Appointment, DoctorSchedule, DoctorTimeOff, Room
+
+
+MAX_RANGE_DAYS = 31
+
+
+def iter_days(date_from: date, date_to: date):
+    day = date_from
+    while day <= date_to:
+        yield day
+        day += timedelta(days=1)
+
+
+def local_bounds(date_from: date, date_to: date) -> tuple[datetime, datetime]:
+    """Aware [start, end) datetimes covering date_from..date_to in the current timezone."""
+    start = timezone.make_aware(datetime.combine(date_from, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return start, end
+
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping/touching (start, end) pairs."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def load_schedules(doctor_ids) -> dict[int, dict[int, list[tuple]]]:
+    """doctor_id -> weekday -> [(start_time, end_time, slot_minutes), ...] in one query."""
+    out: dict[int, dict[int, list[tuple]]] = defaultdict(lambda: defaultdict(list))
+    rows = (
+        DoctorSchedule.objects.filter(doctor_id__in=doctor_ids)
+        .order_by("doctor_id", "weekday", "start_time")
+        .values_list("doctor_id", "weekday", "start_time", "end_time", "slot_minutes")
+    )
+    for doctor_id, weekday, start_time, end_time, slot_minutes in rows:
+        out[doctor_id][weekday].append((start_time, end_time, slot_minutes))
+    return out
+
+
+def load_appointments(doctor_ids, start: datetime, end: datetime, exclude_appointment_ids=()) -> dict[int, list[tuple]]:
+    """doctor_id -> merged active appointment intervals inside [start, end)."""
+    out: dict[int, list[tuple]] = defaultdict(list)
+    appts = Appointment.objects.filter(
+        doctor_id__in=doctor_ids,
+        status__in=ACTIVE_APPOINTMENT_STATUSES,
+        start_at__lt=end,
+        end_at__gt=start,
+    )
+    if exclude_appointment_ids:
+        appts = appts.exclude(pk__in=exclude_appointment_ids)
+    for doctor_id, s, e in appts.values_list("doctor_id", "start_at", "end_at"):
+        out[doctor_id].append((s, e))
+    return {doctor_id: merge_intervals(items) for doctor_id, items in out.items()}
+
+
+def load_time_off(doctor_ids, start: datetime, end: datetime) -> dict[int, list[tuple]]:
+    """doctor_id -> merged time off intervals inside [start, end)."""
+    out: dict[int, list[tuple]] = defaultdict(list)
+    offs = DoctorTimeOff.objects.filter(
+        doctor_id__in=doctor_ids,
+        start_at__lt=end,
+        end_at__gt=start,
+    ).values_list("doctor_id", "start_at", "end_at")
+    for doctor_id, s, e in offs:
+        out[doctor_id].append((s, e))
+    return {doctor_id: merge_intervals(items) for doctor_id, items in out.items()}
+
+
+def load_room_bookings(room_ids, start: datetime, end: datetime) -> dict[int, list[tuple]]:
+    """room_id -> merged active appointment intervals inside [start, end)."""
+    out: dict[int, list[tuple]] = defaultdict(list)
+    rows = Appointment.objects.filter(
+        room_id__in=room_ids,
+        status__in=ACTIVE_APPOINTMENT_STATUSES,
+        start_at__lt=end,
+        end_at__gt=start,
+    ).values_list("room_id", "start_at", "end_at")
+    for room_id, s, e in rows:
+        out[room_id].append((s, e))
+    return {room_id: merge_intervals(items) for room_id, items in out.items()}
+
+
+def intersects(merged, start: datetime, end: datetime) -> bool:
+    """Binary search in merged (sorted, non-overlapping) intervals."""
+    i = bisect_right(merged, start, key=lambda item: item[1])
+    return i < len(merged) and merged[i][0] < end
+
+
+def fits_schedule(day_schedule, start: datetime, end: datetime) -> bool:
+    """Same rule as Appointment.clean: no schedule for the weekday means no restriction."""
+    if not day_schedule:
+        return True
+    st = timezone.localtime(start).time()
+    en = timezone.localtime(end).time()
+    return any(start_time <= st and end_time >= en for start_time, end_time, _ in day_schedule)
+
+
+def working_intervals(day_schedule, day: date) -> list[tuple[datetime, datetime, int]]:
+    """Schedule rows of one weekday turned into aware (start, end, slot_minutes) for a concrete day."""
+    out = []
+    for start_time, end_time, slot_minutes in day_schedule:
+        out.append((
+            timezone.make_aware(datetime.combine(day, start_time)),
+            timezone.make_aware(datetime.combine(day, end_time)),
+            slot_minutes,
+        ))
+    return out
+
+
+def schedule_slots(day_schedule, day: date, duration: timedelta | None = None):
+    """Slot grid of a day, sorted by start. duration overrides slot length, grid step stays slot_minutes."""
+    slots = []
+    for start, end, slot_minutes in working_intervals(day_schedule, day):
+        step = timedelta(minutes=slot_minutes or 30)
+        length = duration or step
+        cursor = start
+        while cursor + length <= end:
+            slots.append((cursor, cursor + length))
+            cursor += step
+    slots.sort()
+    return slots
+
+
+def free_slots(
+    doctor_ids,
+    date_from: date,
+    date_to: date,
+    duration: timedelta | None = None,
+    schedules=None,
+) -> dict[int, list[tuple]]:
+    """
+    Free slots per doctor for date_from..date_to (inclusive, local dates).
+    Slot grid comes from the schedules, occupancy from the per-day bitmaps:
+    two queries once the bitmaps are materialized (one if schedules are passed in).
+    """
+    from .bitmaps import get_bitmaps, slot_is_free
+
+    doctor_ids = list(doctor_ids)
+    if schedules is None:
+        schedules = load_schedules(doctor_ids)
+    bitmaps = get_bitmaps(doctor_ids, date_from, date_to, schedules)
+
+    out: dict[int, list[tuple]] = {}
+    for doctor_id in doctor_ids:
+        by_weekday = schedules.get(doctor_id, {})
+        items = []
+        for day in iter_days(date_from, date_to):
+            day_schedule = by_weekday.get(day.weekday())
+            if day_schedule:
+                items.extend(
+                    (s, e) for s, e in schedule_slots(day_schedule, day, duration)
+                    if slot_is_free(bitmaps, doctor_id, s, e)
+                )
+        out[doctor_id] = items
+    return out
+
+
+def first_available(
+    doctor_ids,
+    duration: timedelta,
+    start: datetime,
+    end: datetime,
+    k: int,
+    room_ids=None,
+    preferred_room: dict[int, int] | None = None,
+) -> list[tuple[datetime, datetime, int, int | None]]:
+    """
+    Top-k earliest (start, end, doctor_id, room_id) inside [start, end) for a visit of `duration`.
+    Schedules, day bitmaps and room bookings of all candidates are loaded in bulk,
+    per-doctor free slots are merged lazily by start time.
+    room_ids=None means any room; an empty list of rooms in the clinic means no room is needed.
+    """
+    from .bitmaps import get_bitmaps, slot_is_free
+
+    doctor_ids = list(doctor_ids)
+    preferred_room = preferred_room or {}
+
+    date_from = timezone.localtime(start).date()
+    date_to = timezone.localtime(end).date()
+
+    schedules = load_schedules(doctor_ids)
+    bitmaps = get_bitmaps(doctor_ids, date_from, date_to, schedules)
+    room_ids = list(room_ids) if room_ids is not None else list(Room.objects.order_by("name").values_list("id", flat=True))
+    room_busy = load_room_bookings(room_ids, start, end) if room_ids else {}
+
+    def doctor_slots(doctor_id):
+        by_weekday = schedules.get(doctor_id, {})
+        for day in iter_days(date_from, date_to):
+            day_schedule = by_weekday.get(day.weekday())
+            if not day_schedule:
+                continue
+            for s, e in schedule_slots(day_schedule, day, duration):
+                if s >= start and e <= end and slot_is_free(bitmaps, doctor_id, s, e):
+                    yield s, doctor_id, e
+
+    def pick_room(doctor_id, s, e):
+        preferred = preferred_room.get(doctor_id)
+        ordered = ([preferred] if preferred in room_ids else []) + [r for r in room_ids if r != preferred]
+        for room_id in ordered:
+            if not intersects(room_busy.get(room_id, []), s, e):
+                return room_id
+        return None
+
+    out = []
+    for s, doctor_id, e in heapq.merge(*(doctor_slots(d) for d in doctor_ids)):
+        if room_ids:
+            room_id = pick_room(doctor_id, s, e)
+            if room_id is None:
+                continue
+        else:
+            room_id = None
+        out.append((s, e, doctor_id, room_id))
+        if len(out) >= k:
+            break
+    return out
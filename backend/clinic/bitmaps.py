@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .availability import iter_days, load_appointments, load_schedules, load_time_off, local_bounds
+from .models import DoctorBitmapStamp, DoctorDayBitmap
+
+
+BITMAP_TABLE = DoctorDayBitmap._meta.db_table
+STAMP_TABLE = DoctorBitmapStamp._meta.db_table
+# новая строка счётчика начинается с текущего времени в микросекундах, а не с 0: строки удаляет
+# `availability_bitmaps prune`, и пересозданный счётчик не должен совпасть с версией, прочитанной до удаления
+STAMP_SEED = "(extract(epoch FROM clock_timestamp()) * 1000000)::bigint"
+
+
+CELL_MINUTES = 5
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+BITMAP_BYTES = CELLS_PER_DAY // 8
+
+
+@dataclass(frozen=True)
+class DayBits:
+    working: int
+    busy: int
+
+    @property
+    def free(self) -> int:
+        return self.working & ~self.busy
+
+
+def span_mask(lo: int, hi: int) -> int:
+    """Bits lo..hi-1 set."""
+    if hi <= lo:
+        return 0
+    return ((1 << (hi - lo)) - 1) << lo
+
+
+def to_bytes(bits: int) -> bytes:
+    return bits.to_bytes(BITMAP_BYTES, "big")
+
+
+def from_bytes(raw) -> int:
+    return int.from_bytes(bytes(raw), "big")
+
+
+def _minute_of_day(moment: datetime, day: date) -> int:
+    """Local minutes since midnight of `day`, clipped to 0..1440."""
+    local = timezone.localtime(moment)
+    if local.date() < day:
+        return 0
+    if local.date() > day:
+        return 24 * 60
+    return local.hour * 60 + local.minute + (1 if local.second or local.microsecond else 0)
+
+
+def cell_span(start: datetime, end: datetime, day: date) -> tuple[int, int]:
+    """Cells touched by [start, end) on `day` (outer rounding)."""
+    lo = _minute_of_day(start, day) // CELL_MINUTES
+    hi = -(-_minute_of_day(end, day) // CELL_MINUTES)
+    return lo, hi
+
+
+def inner_span(start: datetime, end: datetime, day: date) -> tuple[int, int]:
+    """Cells fully covered by [start, end) on `day` (inner rounding)."""
+    lo = -(-_minute_of_day(start, day) // CELL_MINUTES)
+    hi = _minute_of_day(end, day) // CELL_MINUTES
+    return lo, hi
+
+
+def _intervals_mask(intervals, day: date, day_start: datetime, day_end: datetime) -> int:
+    bits = 0
+    for s, e in intervals:
+        if s < day_end and e > day_start:
+            bits |= span_mask(*cell_span(s, e, day))
+    return bits
+
+
+def compute(doctor_ids, date_from: date, date_to: date, schedules=None) -> dict[tuple[int, date], DayBits]:
+    """Bitmaps from source rows: three queries (two if schedules are passed in)."""
+    doctor_ids = list(doctor_ids)
+    start, end = local_bounds(date_from, date_to)
+    if schedules is None:
+        schedules = load_schedules(doctor_ids)
+    appts = load_appointments(doctor_ids, start, end)
+    offs = load_time_off(doctor_ids, start, end)
+
+    out = {}
+    for doctor_id in doctor_ids:
+        by_weekday = schedules.get(doctor_id, {})
+        busy_intervals = appts.get(doctor_id, []) + offs.get(doctor_id, [])
+        for day in iter_days(date_from, date_to):
+            day_start, day_end = local_bounds(day, day)
+            working = 0
+            for start_time, end_time, _ in by_weekday.get(day.weekday(), []):
+                working |= span_mask(*inner_span(
+                    timezone.make_aware(datetime.combine(day, start_time)),
+                    timezone.make_aware(datetime.combine(day, end_time)),
+                    day,
+                ))
+            out[(doctor_id, day)] = DayBits(working, _intervals_mask(busy_intervals, day, day_start, day_end))
+    return out
+
+
+def stamps(doctor_ids) -> dict[int, int]:
+    """
+    Current stamps of the doctors, read before compute(); a doctor without a stamp row gets one (STAMP_SEED).
+    A doctor missing from the result (its row was inserted concurrently) is simply not stored.
+    """
+    doctor_ids = sorted(doctor_ids)
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            WITH created AS (
+                INSERT INTO {STAMP_TABLE} (doctor_id, version) SELECT unnest(%s::bigint[]), {STAMP_SEED}
+                ON CONFLICT (doctor_id) DO NOTHING
+                RETURNING doctor_id, version
+            )
+            SELECT doctor_id, version FROM created
+            UNION ALL
+            SELECT doctor_id, version FROM {STAMP_TABLE} WHERE doctor_id = ANY(%s)
+            """,
+            [doctor_ids, doctor_ids],
+        )
+        return dict(cur.fetchall())
+
+
+def store(bitmaps: dict[tuple[int, date], DayBits], read_stamps: dict[int, int]) -> int:
+    """
+    Upsert bitmaps of the doctors whose stamp still equals `read_stamps`; returns the number of rows stored.
+    The stamp rows are locked FOR SHARE: a writer that bumped a stamp and has not committed yet makes
+    the store wait and then skip that doctor; a writer that bumps after the store deletes the stored rows itself.
+    """
+    keys = sorted(key for key in bitmaps if key[0] in read_stamps)
+    if not keys:
+        return 0
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {BITMAP_TABLE} AS t (doctor_id, day, working, busy, built_at)
+            SELECT d.doctor_id, d.day, d.working, d.busy, now()
+            FROM unnest(%s::bigint[], %s::date[], %s::bytea[], %s::bytea[], %s::bigint[])
+                AS d(doctor_id, day, working, busy, version)
+            JOIN {STAMP_TABLE} s ON s.doctor_id = d.doctor_id AND s.version = d.version
+            FOR SHARE OF s
+            ON CONFLICT (doctor_id, day) DO UPDATE SET
+                working = EXCLUDED.working, busy = EXCLUDED.busy, built_at = EXCLUDED.built_at
+            """,
+            [
+                [k[0] for k in keys], [k[1] for k in keys],
+                [to_bytes(bitmaps[k].working) for k in keys], [to_bytes(bitmaps[k].busy) for k in keys],
+                [read_stamps[k[0]] for k in keys],
+            ],
+        )
+        return cur.rowcount
+
+
+def get_bitmaps(doctor_ids, date_from: date, date_to: date, schedules=None) -> dict[tuple[int, date], DayBits]:
+    """
+    Stored bitmaps for the range; missing doctor-days are computed in bulk and saved unless a writer
+    changed the doctor meanwhile (see store()). One query when everything is materialized.
+    """
+    doctor_ids = list(doctor_ids)
+    out = {
+        (doctor_id, day): DayBits(from_bytes(working), from_bytes(busy))
+        for doctor_id, day, working, busy in DoctorDayBitmap.objects.filter(
+            doctor_id__in=doctor_ids, day__gte=date_from, day__lte=date_to,
+        ).values_list("doctor_id", "day", "working", "busy")
+    }
+
+    missing_doctors = {d for d in doctor_ids for day in iter_days(date_from, date_to) if (d, day) not in out}
+    if missing_doctors:
+        missing_days = [day for day in iter_days(date_from, date_to) if any((d, day) not in out for d in missing_doctors)]
+        # штамп читаем до расчёта: если запись изменится во время расчёта, результат не сохранится
+        read_stamps = stamps(missing_doctors)
+        built = compute(missing_doctors, min(missing_days), max(missing_days), schedules)
+        built = {key: bits for key, bits in built.items() if key not in out}
+        store(built, read_stamps)
+        out.update(built)
+    return out
+
+
+def slot_is_free(bitmaps: dict[tuple[int, date], DayBits], doctor_id: int, start: datetime, end: datetime) -> bool:
+    day = timezone.localtime(start).date()
+    bits = bitmaps.get((doctor_id, day))
+    if bits is None:
+        return False
+    return not bits.busy & span_mask(*cell_span(start, end, day))
+
+
+def bump(doctor_ids):
+    """Move the stamps of the doctors; the row locks are held until the writer's transaction ends."""
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {STAMP_TABLE} AS s (doctor_id, version)
+            SELECT d, {STAMP_SEED} FROM unnest(%s::bigint[]) AS d ORDER BY d
+            ON CONFLICT (doctor_id) DO UPDATE SET version = s.version + 1
+            """,
+            [sorted(doctor_ids)],
+        )
+
+
+def invalidate(doctor_id: int, days=None):
+    """
+    Bump the doctor's stamp and drop its stored bitmaps (all days, or the given ones) inside the current
+    transaction. Readers that computed from data before this write can no longer store (see store());
+    the delete runs after the bump, so it also removes rows stored just before the stamp was locked.
+    """
+    bump([doctor_id])
+    qs = DoctorDayBitmap.objects.filter(doctor_id=doctor_id)
+    if days is not None:
+        qs = qs.filter(day__in=list(days))
+    qs.delete()
+
+
+def days_touched(start: datetime, end: datetime) -> list[date]:
+    first = timezone.localtime(start).date()
+    last = timezone.localtime(end - timedelta(microseconds=1)).date()
+    return list(iter_days(first, last))
+
+
+def invalidate_intervals(rows):
+    """rows: iterable of (doctor_id, start_at, end_at). One bump and one delete for all of them."""
+    keys = sorted({
+        (doctor_id, day)
+        for doctor_id, start, end in rows if doctor_id and start and end
+        for day in days_touched(start, end)
+    })
+    if not keys:
+        return
+    bump({doctor_id for doctor_id, _ in keys})
+    with connection.cursor() as cur:
+        cur.execute(
+            f"DELETE FROM {BITMAP_TABLE} WHERE (doctor_id, day) IN (SELECT * FROM unnest(%s::bigint[], %s::date[]))",
+            [[k[0] for k in keys], [k[1] for k in keys]],
+        )
@@ -1,5 +1,9 @@
 import django_filters
+from django.db.models import Q
+from rest_framework.filters import SearchFilter
+
 from .models import Appointment
+from .translit import search_key
 
 
 class AppointmentFilter(django_filters.FilterSet):
@@ -12,3 +16,20 @@ class AppointmentFilter(django_filters.FilterSet):
     class Meta:
         model = Appointment
         fields = ("doctor", "patient", "status", "date_from", "date_to")
+
+
+class PatientSearchFilter(SearchFilter):
+    """
+    ?search= for patients over the trigram-indexed columns instead of icontains on every field:
+    Patient.search_text (name, phone, email) or Patient.search_key (name in any script).
+    Every term must match, as in SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for term in self.get_search_terms(request):
+            cond = Q(search_text__contains=term.lower())
+            key = search_key(term)
+            if key:
+                cond |= Q(search_key__contains=key)
+            queryset = queryset.filter(cond)
+        return queryset
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from clinic import rollups
+from clinic.models import Appointment, AppointmentDailyStat
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily appointment rollup (AppointmentDailyStat), or verify it against appointments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("mode", choices=["rebuild", "verify"])
+        parser.add_argument("--date-from", help="YYYY-MM-DD, default: first day with data")
+        parser.add_argument("--date-to", help="YYYY-MM-DD, default: last day with data")
+        parser.add_argument("--chunk", type=int, default=31, help="Days per transaction")
+
+    def handle(self, *args, **opts):
+        first, last = self._span()
+        date_from = parse_date(opts["date_from"]) if opts["date_from"] else first
+        date_to = parse_date(opts["date_to"]) if opts["date_to"] else last
+        if (opts["date_from"] and not date_from) or (opts["date_to"] and not date_to):
+            raise CommandError("--date-from / --date-to must be YYYY-MM-DD")
+        if date_from > date_to:
+            raise CommandError("--date-from is after --date-to")
+
+        # короткие транзакции: блокировка таблицы сводки держится на один кусок, а не на весь диапазон
+        chunks = []
+        day = date_from
+        while day <= date_to:
+            end = min(day + timedelta(days=opts["chunk"] - 1), date_to)
+            chunks.append((day, end))
+            day = end + timedelta(days=1)
+
+        if opts["mode"] == "rebuild":
+            total = 0
+            for start, end in chunks:
+                with transaction.atomic():
+                    total += rollups.rebuild(start, end)
+                self.stdout.write(f"  {start}..{end}: {total} rows")
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} rollup rows, {date_from}..{date_to}"))
+            return
+
+        mismatched = []
+        for start, end in chunks:
+            mismatched += rollups.mismatches(start, end)
+        for day, doctor_id, service_id, status in mismatched:
+            self.stdout.write(self.style.WARNING(
+                f"  mismatch: day={day} doctor={doctor_id} service={service_id} status={status}"
+            ))
+        if mismatched:
+            raise CommandError(f"{len(mismatched)} rollup rows do not match appointments (run rebuild)")
+
+        self.stdout.write(self.style.SUCCESS(f"Verified rollup {date_from}..{date_to}"))
+
+    def _span(self):
+        """Days covered by appointments or by stored rollup rows (stale rows outside appointments too)."""
+        days = []
+        span = Appointment.objects.aggregate(first=Min("start_at"), last=Max("start_at"))
+        if span["first"] is not None:
+            days += [timezone.localdate(span["first"]), timezone.localdate(span["last"])]
+        span = AppointmentDailyStat.objects.aggregate(first=Min("day"), last=Max("day"))
+        if span["first"] is not None:
+            days += [span["first"], span["last"]]
+        if not days:
+            days = [timezone.localdate()]
+        return min(days), max(days)
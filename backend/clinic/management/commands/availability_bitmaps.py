@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from accounts.models import User, UserRole
+from clinic.bitmaps import DayBits, compute, from_bytes, stamps, store
+from clinic.models import DoctorBitmapStamp, DoctorDayBitmap
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild per-doctor daily availability bitmaps, verify stored ones against source rows, "
+        "or prune bitmaps of days before --date-from."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("mode", choices=["rebuild", "verify", "prune"])
+        parser.add_argument("--date-from", help="YYYY-MM-DD, default: today")
+        parser.add_argument("--days", type=int, default=60)
+        parser.add_argument("--doctor", type=int, action="append", help="Limit to doctor id (repeatable)")
+        parser.add_argument("--chunk", type=int, default=50, help="Doctors per batch")
+        parser.add_argument("--fix", action="store_true", help="verify: drop mismatching rows")
+
+    def handle(self, *args, **opts):
+        date_from = parse_date(opts["date_from"]) if opts["date_from"] else timezone.localdate()
+        if not date_from:
+            raise CommandError("--date-from must be YYYY-MM-DD")
+        date_to = date_from + timedelta(days=opts["days"] - 1)
+
+        doctors = User.objects.filter(role=UserRole.DOCTOR).order_by("id")
+        if opts["doctor"]:
+            doctors = doctors.filter(pk__in=opts["doctor"])
+        doctor_ids = list(doctors.values_list("id", flat=True))
+
+        if opts["mode"] == "prune":
+            self._prune(date_from, opts["doctor"])
+            return
+
+        chunk = opts["chunk"]
+        batches = [doctor_ids[i:i + chunk] for i in range(0, len(doctor_ids), chunk)]
+
+        if opts["mode"] == "rebuild":
+            total = 0
+            for batch in batches:
+                read_stamps = stamps(batch)
+                bitmaps = compute(batch, date_from, date_to)
+                with transaction.atomic():
+                    DoctorDayBitmap.objects.filter(doctor_id__in=batch, day__gte=date_from, day__lte=date_to).delete()
+                    # врачи, изменённые во время расчёта, достроятся при чтении
+                    total += store(bitmaps, read_stamps)
+                self.stdout.write(f"  {total} doctor-days rebuilt")
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt {total} bitmaps for {len(doctor_ids)} doctors, {date_from}..{date_to}"
+            ))
+            return
+
+        checked = 0
+        mismatched = []
+        for batch in batches:
+            stored = {
+                (doctor_id, day): DayBits(from_bytes(working), from_bytes(busy))
+                for doctor_id, day, working, busy in DoctorDayBitmap.objects.filter(
+                    doctor_id__in=batch, day__gte=date_from, day__lte=date_to,
+                ).values_list("doctor_id", "day", "working", "busy")
+            }
+            if not stored:
+                continue
+            expected = compute(batch, date_from, date_to)
+            for key, bits in stored.items():
+                checked += 1
+                if expected.get(key) != bits:
+                    mismatched.append(key)
+
+        for doctor_id, day in mismatched:
+            self.stdout.write(self.style.WARNING(f"  mismatch: doctor={doctor_id} day={day}"))
+
+        if mismatched and opts["fix"]:
+            for doctor_id, day in mismatched:
+                DoctorDayBitmap.objects.filter(doctor_id=doctor_id, day=day).delete()
+            self.stdout.write(self.style.SUCCESS(f"Dropped {len(mismatched)} stale bitmaps (rebuilt on next read)"))
+        elif mismatched:
+            raise CommandError(f"{len(mismatched)} of {checked} stored bitmaps do not match source rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Verified {checked} stored bitmaps"))
+
+    def _prune(self, before, doctor_ids):
+        bitmaps = DoctorDayBitmap.objects.filter(day__lt=before)
+        stale_stamps = DoctorBitmapStamp.objects.exclude(doctor_id__in=DoctorDayBitmap.objects.values("doctor_id"))
+        if doctor_ids:
+            bitmaps = bitmaps.filter(doctor_id__in=doctor_ids)
+            stale_stamps = stale_stamps.filter(doctor_id__in=doctor_ids)
+        with transaction.atomic():
+            days, _ = bitmaps.delete()
+            # счётчик нужен, только пока у врача есть строки; при чтении он создаётся заново (bitmaps.STAMP_SEED)
+            doctors, _ = stale_stamps.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {days} bitmaps before {before} and {doctors} stamps of doctors without bitmaps"
+        ))
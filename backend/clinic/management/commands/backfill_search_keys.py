@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import time as pytime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from clinic.models import Patient, Service
+from core import refdata
+
+
+MODELS = {"patient": Patient, "service": Service}
+# bulk_update не шлёт post_save: кэш справочника сбрасываем сами
+REFDATA = {Service: "services"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute derived lookup columns (Patient.phone_digits / search_key, Service.search_key) "
+        "in keyset-paginated batches. Idempotent: only changed rows are written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", choices=sorted(MODELS), action="append", help="Default: all")
+        parser.add_argument("--chunk", type=int, default=5000, help="Rows per transaction")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Pause between chunks, seconds")
+
+    def handle(self, *args, **opts):
+        if opts["chunk"] < 1:
+            raise CommandError("--chunk must be positive")
+        for name in opts["model"] or sorted(MODELS):
+            self._backfill(MODELS[name], opts)
+
+    def _backfill(self, model, opts):
+        fields = list(model.DERIVED_FIELDS)
+        label = model._meta.model_name
+        last_id = 0
+        scanned = updated = 0
+        while True:
+            rows = list(model.objects.filter(pk__gt=last_id).order_by("pk")[:opts["chunk"]])
+            if not rows:
+                break
+            last_id = rows[-1].pk
+            scanned += len(rows)
+
+            changed = []
+            for obj in rows:
+                before = [getattr(obj, f) for f in fields]
+                obj.refresh_derived()
+                if [getattr(obj, f) for f in fields] != before:
+                    changed.append(obj)
+            if changed:
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, fields)
+                    if model in REFDATA:
+                        refdata.invalidate(REFDATA[model])
+                updated += len(changed)
+
+            self.stdout.write(f"  {label} up to id={last_id}: scanned {scanned}, updated {updated}")
+            if opts["sleep"]:
+                pytime.sleep(opts["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {label}: scanned {scanned}, updated {updated}"))
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import statistics
+import time as pytime
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service, DoctorSchedule, Appointment, AppointmentStatus
+
+
+def _summary(label: str, timings: list[float], queries: list[int]) -> str:
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95 = timings_ms[max(0, int(len(timings_ms) * 0.95) - 1)]
+    return (
+        f"{label}: n={len(timings_ms)} "
+        f"p50={statistics.median(timings_ms):.2f}ms p95={p95:.2f}ms "
+        f"queries/op={statistics.mean(queries):.1f}"
+    )
+
+
+class Command(BaseCommand):
+    help = "Measure Appointment booking latency and query count. All data is rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--n", type=int, default=200)
+
+    def handle(self, *args, **opts):
+        n = opts["n"]
+
+        with transaction.atomic():
+            doctor = User.objects.create_user(email="bench-doctor@bench.local", role=UserRole.DOCTOR)
+            patient = Patient.objects.create(first_name="Bench", last_name="Patient")
+            service = Service.objects.create(code="BENCH-SVC", name_en="Bench", duration_minutes=30)
+            for wd in range(7):
+                DoctorSchedule.objects.create(doctor=doctor, weekday=wd, start_time=time(0, 0), end_time=time(23, 59))
+
+            day0 = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=365), time(0, 0)))
+
+            create_t, create_q = [], []
+            appts = []
+            for i in range(n):
+                start = day0 + timedelta(days=i // 40, minutes=30 * (i % 40))
+                appt = Appointment(
+                    patient=patient, doctor=doctor, service=service,
+                    start_at=start, end_at=start + timedelta(minutes=30),
+                )
+                with CaptureQueriesContext(connection) as ctx:
+                    t0 = pytime.perf_counter()
+                    appt.save()
+                    create_t.append(pytime.perf_counter() - t0)
+                create_q.append(len(ctx.captured_queries))
+                appts.append(appt.pk)
+
+            status_t, status_q = [], []
+            for pk in appts:
+                appt = Appointment.objects.get(pk=pk)
+                appt.status = AppointmentStatus.CONFIRMED
+                with CaptureQueriesContext(connection) as ctx:
+                    t0 = pytime.perf_counter()
+                    appt.save()
+                    status_t.append(pytime.perf_counter() - t0)
+                status_q.append(len(ctx.captured_queries))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(_summary("create", create_t, create_q))
+        self.stdout.write(_summary("status", status_t, status_q))
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import random
+import statistics
+import time as pytime
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service
+from clinic.views_doctor import search_notes
+
+
+# частые слова идут первыми: индекс слова в заметке ~ random()^5, так что начало списка встречается чаще
+WORDS = [
+    "patient", "complains", "pain", "headache", "blood", "pressure", "normal", "no", "dynamics", "recommended", "control",
+    "жалобы", "боли", "давление", "головные", "рекомендовано", "контроль", "осмотр", "динамика", "состояние", "удовлетворительное",
+    "hypertension", "гипертония", "diabetes", "диабет", "cough", "кашель", "fever", "температура", "allergy", "аллергия",
+    "ecg", "экг", "tachycardia", "тахикардия", "arrhythmia", "аритмия", "asthma", "астма", "gastritis", "гастрит",
+    "migraine", "мигрень", "insomnia", "бессонница", "anemia", "анемия", "bronchitis", "бронхит", "sinusitis", "синусит",
+    "pneumonia", "пневмония", "dermatitis", "дерматит", "tonsillitis", "тонзиллит", "cholecystitis", "холецистит",
+    "pyelonephritis", "пиелонефрит", "osteochondrosis", "остеохондроз", "hypothyroidism", "гипотиреоз",
+]
+TERMS = {
+    "common": ["pain", "давление", "headache", "контроль"],
+    "medium": ["hypertension", "гипертонии", "diabetes", "кашель"],
+    "rare": ["pyelonephritis", "гипотиреоз", "cholecystitis", "остеохондроза"],
+    "two_words": ["hypertension headache", "диабет контроль", "cough fever", "аритмия экг"],
+    "phrase": ['"blood pressure"', '"головные боли"', '"no dynamics"', '"patient complains"'],
+}
+
+
+def _p(timings_ms: list[float], pct: float) -> float:
+    return timings_ms[max(0, int(len(timings_ms) * pct) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Measure visit note full-text search latency (count + first page) on generated notes. All data is rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notes", type=int, default=500_000)
+        parser.add_argument("--doctors", type=int, default=50)
+        parser.add_argument("--words", type=int, default=60, help="Words per note")
+        parser.add_argument("--n", type=int, default=100, help="Queries per term kind")
+        parser.add_argument("--page-size", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(42)
+
+        with transaction.atomic():
+            t0 = pytime.perf_counter()
+            doctor_ids = self._seed(opts["notes"], opts["doctors"], opts["words"])
+            self.stdout.write(
+                f"seeded {opts['notes']} notes for {opts['doctors']} doctors in {pytime.perf_counter() - t0:.1f}s"
+            )
+
+            for kind, terms in TERMS.items():
+                timings = []
+                for _ in range(opts["n"]):
+                    doctor = User(pk=rnd.choice(doctor_ids), role=UserRole.DOCTOR)
+                    qs = search_notes(doctor, rnd.choice(terms))
+                    t0 = pytime.perf_counter()
+                    # то же, что делает эндпоинт: count для пагинации + первая страница со сниппетами
+                    qs.count()
+                    list(qs[:opts["page_size"]])
+                    timings.append((pytime.perf_counter() - t0) * 1000)
+                timings.sort()
+                self.stdout.write(
+                    f"{kind}: n={len(timings)} p50={statistics.median(timings):.2f}ms "
+                    f"p95={_p(timings, 0.95):.2f}ms max={timings[-1]:.2f}ms"
+                )
+
+            transaction.set_rollback(True)
+
+    def _seed(self, notes: int, doctors: int, words: int) -> list[int]:
+        patient_id = Patient.objects.create(first_name="Bench", last_name="Patient").id
+        service_id = Service.objects.create(code="BENCH-NOTES", name_en="Bench").id
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO accounts_user (password, is_superuser, email, role, first_name, last_name, is_staff, is_active, date_joined)
+                SELECT '', false, 'bench-doctor' || i || '@bench.local', %s, '', '', false, true, now()
+                FROM generate_series(1, %s) AS i
+                RETURNING id
+                """,
+                [UserRole.DOCTOR, doctors],
+            )
+            doctor_ids = [row[0] for row in cur.fetchall()]
+            # завершённые приёмы подряд по 30 минут у каждого врача, по заметке на приём
+            cur.execute("SELECT setseed(0.42)")
+            cur.execute(
+                """
+                WITH appts AS (
+                    INSERT INTO clinic_appointment (
+                        start_at, end_at, status, reason, comment, created_at, updated_at, doctor_id, patient_id, service_id
+                    )
+                    SELECT
+                        '2020-01-01'::timestamptz + (i / %(d)s) * interval '30 minutes',
+                        '2020-01-01'::timestamptz + (i / %(d)s) * interval '30 minutes' + interval '30 minutes',
+                        'COMPLETED', '', '', now(), now(), (%(doctors)s::bigint[])[1 + i %% %(d)s], %(patient)s, %(service)s
+                    FROM generate_series(0, %(notes)s - 1) AS i
+                    RETURNING id, doctor_id
+                )
+                INSERT INTO clinic_visitnote (appointment_id, doctor_id, patient_id, note_text, created_at, updated_at)
+                SELECT a.id, a.doctor_id, %(patient)s, t.text, now(), now()
+                FROM appts a
+                CROSS JOIN LATERAL (
+                    SELECT string_agg((%(words)s::text[])[1 + floor(random() ^ 5 * %(nwords)s)::int + 0 * k], ' ') AS text
+                    FROM generate_series(1, %(per_note)s + 0 * a.id) AS k
+                ) t
+                """,
+                {
+                    "d": doctors, "doctors": doctor_ids, "patient": patient_id, "service": service_id,
+                    "notes": notes, "words": WORDS, "nwords": len(WORDS), "per_note": words,
+                },
+            )
+            cur.execute("ANALYZE clinic_appointment")
+            cur.execute("ANALYZE clinic_visitnote")
+        return doctor_ids
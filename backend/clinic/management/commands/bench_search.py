@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import random
+import statistics
+import time as pytime
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.models import User, UserRole
+from clinic.models import Patient
+from clinic.phones import normalize_phone
+from clinic.translit import search_key
+from core.views import search_patients
+
+
+SYLLABLES = ["ka", "ra", "li", "mo", "na", "te", "si", "bo", "du", "ve", "za", "ri", "lo", "me", "ni", "ta", "go", "pe", "sa", "ku"]
+SUFFIXES = ["ov", "ova", "ev", "eva", "in", "ina", "enko", "bekov"]
+FIRST_NAMES = [
+    "Ivan", "Petr", "Anna", "Maria", "Aidar", "Dana", "Oleg", "Elena", "Nursultan", "Aigerim",
+    "Sergey", "Olga", "Timur", "Aruzhan", "Dmitry", "Irina", "Yerlan", "Saule", "Pavel", "Madina",
+]
+TO_CYRILLIC = str.maketrans({
+    "a": "а", "b": "б", "d": "д", "e": "е", "g": "г", "i": "и", "k": "к", "l": "л", "m": "м",
+    "n": "н", "o": "о", "p": "п", "r": "р", "s": "с", "t": "т", "u": "у", "v": "в", "z": "з",
+})
+
+
+def _surnames() -> list[str]:
+    return [
+        (a + b + c).capitalize() + suffix
+        for suffix in SUFFIXES for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES
+    ]
+
+
+def _cyrillic(name: str) -> str:
+    return name.lower().translate(TO_CYRILLIC).capitalize()
+
+
+def _p(timings_ms: list[float], pct: float) -> float:
+    return timings_ms[max(0, int(len(timings_ms) * pct) - 1)]
+
+
+def _typo(word: str, rnd: random.Random) -> str:
+    i = rnd.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+class Command(BaseCommand):
+    help = "Measure global patient search latency on a generated patient table. All data is rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--patients", type=int, default=1_000_000)
+        parser.add_argument("--n", type=int, default=200, help="Queries per term kind")
+        parser.add_argument("--limit", type=int, default=10)
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(42)
+        admin = User(email="bench-admin@bench.local", role=UserRole.ADMIN)
+
+        with transaction.atomic():
+            t0 = pytime.perf_counter()
+            self._seed(opts["patients"])
+            self.stdout.write(f"seeded {opts['patients']} patients in {pytime.perf_counter() - t0:.1f}s")
+
+            sample = list(
+                Patient.objects.order_by("?").values_list("last_name", "first_name", "phone", "email")[:opts["n"]]
+            )
+            terms = {
+                "last_name": lambda row: row[0],
+                "full_name": lambda row: f"{row[0]} {row[1]}",
+                "typo": lambda row: _typo(row[0], rnd),
+                "other_script": lambda row: _cyrillic(row[0]) if row[0].isascii() else search_key(row[0]).capitalize(),
+                "phone_prefix": lambda row: row[2][:8],
+                "phone_suffix": lambda row: row[2][-7:],
+                "email": lambda row: row[3].split("@")[0],
+            }
+            for kind, make in terms.items():
+                self._measure(kind, sample, lambda row: search_patients(admin, make(row), opts["limit"]))
+            # определитель номера: точное совпадение, как в /admin/patients/caller_id/
+            self._measure("caller_id", sample, lambda row: list(Patient.objects.filter(phone_digits=normalize_phone(row[2]))[:10]))
+
+            transaction.set_rollback(True)
+
+    def _measure(self, kind, sample, run):
+        timings = []
+        for row in sample:
+            t0 = pytime.perf_counter()
+            run(row)
+            timings.append((pytime.perf_counter() - t0) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"{kind}: n={len(timings)} p50={statistics.median(timings):.2f}ms "
+            f"p95={_p(timings, 0.95):.2f}ms max={timings[-1]:.2f}ms"
+        )
+
+    def _seed(self, count: int):
+        surnames = _surnames()
+        # половина пациентов записана кириллицей — ищем их латиницей и наоборот
+        last_names = surnames + [_cyrillic(name) for name in surnames]
+        with connection.cursor() as cur:
+            # генерим пациентов на стороне БД — миллион INSERT из Python слишком долго
+            cur.execute(
+                """
+                INSERT INTO clinic_patient (
+                    first_name, last_name, middle_name, gender, phone, phone_digits, email,
+                    address, comment, created_at, search_key
+                )
+                SELECT
+                    f.name, l.name, '', 'U',
+                    '+7 7' || lpad(((i::bigint * 7919) %% 1000000000)::text, 9, '0'),
+                    '77' || lpad(((i::bigint * 7919) %% 1000000000)::text, 9, '0'),
+                    'patient' || i::text || '@mail.local',
+                    '', '', now(),
+                    l.key || ' ' || f.key
+                FROM generate_series(1, %s) AS i
+                JOIN unnest(%s::text[], %s::text[]) WITH ORDINALITY AS f(name, key, n) ON f.n = 1 + (i * 7) %% %s
+                JOIN unnest(%s::text[], %s::text[]) WITH ORDINALITY AS l(name, key, n) ON l.n = 1 + (i * 31) %% %s
+                """,
+                [
+                    count,
+                    FIRST_NAMES, [search_key(name) for name in FIRST_NAMES], len(FIRST_NAMES),
+                    last_names, [search_key(name) for name in last_names], len(last_names),
+                ],
+            )
+            cur.execute("ANALYZE clinic_patient")
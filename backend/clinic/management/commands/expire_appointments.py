@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import time as pytime
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from clinic.models import Appointment, AppointmentStatus, ACTIVE_APPOINTMENT_STATUSES
+from clinic.transitions import bulk_transition
+
+
+# подтверждённый, но не пришедший — NO_SHOW; неподтверждённый (SCHEDULED -> NO_SHOW переход запрещён) — CANCELLED
+EXPIRED_STATUS = {
+    AppointmentStatus.CONFIRMED: AppointmentStatus.NO_SHOW,
+    AppointmentStatus.SCHEDULED: AppointmentStatus.CANCELLED,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Move past SCHEDULED/CONFIRMED appointments to a terminal status "
+        "(CONFIRMED -> NO_SHOW, SCHEDULED -> CANCELLED) in small keyset-paginated transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-minutes", type=int, default=60, help="Expire only appointments that ended this long ago")
+        parser.add_argument("--chunk", type=int, default=1000, help="Appointments per transaction")
+        parser.add_argument("--limit", type=int, help="Stop after this many appointments")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Pause between chunks, seconds")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be expired")
+
+    def handle(self, *args, **opts):
+        if opts["chunk"] < 1:
+            raise CommandError("--chunk must be positive")
+        cutoff = timezone.now() - timedelta(minutes=opts["grace_minutes"])
+        stale = Appointment.objects.filter(status__in=ACTIVE_APPOINTMENT_STATUSES, end_at__lt=cutoff)
+
+        if opts["dry_run"]:
+            self.stdout.write(f"{stale.count()} appointments ended before {cutoff:%Y-%m-%d %H:%M} would be expired")
+            return
+
+        limit = opts["limit"]
+        cursor = None
+        totals = {target: 0 for target in EXPIRED_STATUS.values()}
+        skipped = 0
+        chunks = 0
+
+        while limit is None or sum(totals.values()) < limit:
+            size = opts["chunk"] if limit is None else min(opts["chunk"], limit - sum(totals.values()))
+            qs = stale
+            if cursor:
+                qs = qs.filter(Q(end_at__gt=cursor[0]) | Q(end_at=cursor[0], id__gt=cursor[1]))
+
+            with transaction.atomic():
+                # строки, которые сейчас кто-то редактирует, пропускаем — их заберёт следующий запуск
+                rows = list(
+                    qs.order_by("end_at", "id")
+                    .select_for_update(skip_locked=True)
+                    .values_list("id", "status", "end_at")[:size]
+                )
+                if not rows:
+                    break
+
+                by_target: dict[str, list[int]] = {}
+                for pk, status, _ in rows:
+                    by_target.setdefault(EXPIRED_STATUS[status], []).append(pk)
+                for target, ids in by_target.items():
+                    result = bulk_transition(ids, target, audit_type="appointment_expired")
+                    totals[target] += len(result["updated"])
+                    skipped += len(result["rejected"])
+
+            cursor = (rows[-1][2], rows[-1][0])
+            chunks += 1
+            self.stdout.write(
+                f"  chunk {chunks}: {len(rows)} rows, up to {timezone.localtime(cursor[0]):%Y-%m-%d %H:%M}, "
+                + ", ".join(f"{target}={count}" for target, count in totals.items())
+            )
+            if opts["sleep"]:
+                pytime.sleep(opts["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {sum(totals.values())} appointments ended before {cutoff:%Y-%m-%d %H:%M} "
+            f"(" + ", ".join(f"{target}={count}" for target, count in totals.items()) + f", skipped={skipped})"
+        ))
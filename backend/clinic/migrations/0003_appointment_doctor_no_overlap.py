@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:52
+
+import clinic.models
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0002_appointment_clinic_appo_doctor__9d7356_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ('SCHEDULED', 'CONFIRMED'))), expressions=[('doctor', '='), (clinic.models.TsTzRange('start_at', 'end_at', django.contrib.postgres.fields.ranges.RangeBoundary()), '&&')], name='appointment_doctor_no_overlap', violation_error_message='Appointment overlaps with another active appointment for this doctor.'),
+        ),
+    ]
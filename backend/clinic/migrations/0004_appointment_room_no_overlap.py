@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:53
+
+import clinic.models
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0003_appointment_doctor_no_overlap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('room__isnull', False), ('status__in', ('SCHEDULED', 'CONFIRMED'))), expressions=[('room', '='), (clinic.models.TsTzRange('start_at', 'end_at', django.contrib.postgres.fields.ranges.RangeBoundary()), '&&')], name='appointment_room_no_overlap', violation_error_message='Room is already booked for this time.'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:02
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('clinic', '0005_doctordaybitmap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status__in', ('SCHEDULED', 'CONFIRMED'))), fields=['end_at', 'id'], name='appointment_active_end_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:32
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # индексы строятся CONCURRENTLY; заполнение существующих строк — manage.py backfill_phone_digits
+    atomic = False
+
+    dependencies = [
+        ('clinic', '0007_patient_search_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='phone_digits',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        AddIndexConcurrently(
+            model_name='patient',
+            index=models.Index(django.contrib.postgres.indexes.OpClass('phone_digits', name='text_pattern_ops'), name='patient_phone_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='patient',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Reverse('phone_digits'), name='text_pattern_ops'), name='patient_phone_suffix'),
+        ),
+    ]
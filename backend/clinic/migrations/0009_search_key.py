@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:41
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+from clinic.translit import search_key
+
+
+def fill_service_keys(apps, schema_editor):
+    # услуг мало — заполняем сразу; пациентов — manage.py backfill_search_keys
+    Service = apps.get_model("clinic", "Service")
+    services = list(Service.objects.all())
+    for s in services:
+        s.search_key = search_key(s.code, s.name_en, s.name_ru, s.name_kk)
+    Service.objects.bulk_update(services, ["search_key"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('clinic', '0008_patient_phone_digits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='search_key',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='search_key',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        AddIndexConcurrently(
+            model_name='patient',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('search_key', name='gin_trgm_ops'), name='patient_search_key_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('search_key', name='gin_trgm_ops'), name='service_search_key_trgm'),
+        ),
+        migrations.RunPython(fill_service_keys, migrations.RunPython.noop, atomic=True),
+    ]
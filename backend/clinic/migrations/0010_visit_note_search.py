@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:59
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently, BtreeGinExtension
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # GIN строится CONCURRENTLY: заметки пишутся весь день
+    atomic = False
+
+    dependencies = [
+        ('clinic', '0009_search_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        migrations.AddField(
+            model_name='visitnote',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('note_text', config='russian'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        AddIndexConcurrently(
+            model_name='visitnote',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['doctor', 'search_vector'], name='visit_note_search_gin'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_stats(apps, schema_editor):
+    # то же, что appointment_rollups rebuild, но сразу по всей таблице приёмов
+    schema_editor.execute(
+        """
+        INSERT INTO clinic_appointmentdailystat (day, doctor_id, service_id, status, count, minutes, revenue)
+        SELECT (a.start_at AT TIME ZONE %s)::date, a.doctor_id, a.service_id, a.status,
+               count(*), sum(floor(extract(epoch FROM a.end_at - a.start_at) / 60))::int, count(*) * s.price
+        FROM clinic_appointment a
+        JOIN clinic_service s ON s.id = a.service_id
+        GROUP BY 1, 2, 3, 4, s.price
+        """,
+        [settings.TIME_ZONE],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0010_visit_note_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('SCHEDULED', 'Scheduled'), ('CONFIRMED', 'Confirmed'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled'), ('NO_SHOW', 'No-show')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('minutes', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clinic.service')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'doctor', 'service', 'status'), name='appointment_daily_stat_key')],
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0011_appointmentdailystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorBitmapStamp',
+            fields=[
+                ('doctor_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeBoundary, RangeOperators
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
+from django.db.models.functions import Concat, Lower, Reverse
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
+from .phones import normalize_phone
+from .translit import search_key
+
 
 class Gender(models.TextChoices):
     MALE = "M", _("Male")
@@ -27,6 +35,19 @@ ACTIVE_APPOINTMENT_STATUSES = (
     AppointmentStatus.CONFIRMED,
 )
 
+APPOINTMENT_OVERLAP_MESSAGE = "Appointment overlaps with another active appointment for this doctor."
+ROOM_OVERLAP_MESSAGE = "Room is already booked for this time."
+
+
+class TsTzRange(models.Func):
+    function = "TSTZRANGE"
+    output_field = DateTimeRangeField()
+
+
+def _violated_constraint(error: IntegrityError) -> str:
+    diag = getattr(error.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None) or ""
+
 
 class Patient(models.Model):
     first_name = models.CharField(max_length=100)
@@ -37,18 +58,53 @@ class Patient(models.Model):
     gender = models.CharField(max_length=1, choices=Gender.choices, default=Gender.UNKNOWN)
 
     phone = models.CharField(max_length=32, blank=True, db_index=True)
+    # только цифры, 7XXXXXXXXXX — для определителя номера и поиска по началу/концу номера
+    phone_digits = models.CharField(max_length=32, blank=True, editable=False)
     email = models.EmailField(blank=True, db_index=True)
     address = models.CharField(max_length=255, blank=True)
 
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # ФИО + телефон + email одной строкой в нижнем регистре — под trigram GIN индекс (глобальный поиск)
+    search_text = models.GeneratedField(
+        expression=Lower(Concat(
+            "last_name", models.Value(" "), "first_name", models.Value(" "), "middle_name",
+            models.Value(" "), "phone", models.Value(" "), "email",
+            output_field=models.TextField(),
+        )),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
+    # ФИО в общей латинской форме (Иванов / Ivanov -> ivanov) — поиск независимо от раскладки
+    search_key = models.TextField(blank=True, editable=False)
+
+    DERIVED_FIELDS = ("phone_digits", "search_key")
+
     class Meta:
-        indexes = [models.Index(fields=["last_name", "first_name"])]
+        indexes = [
+            models.Index(fields=["last_name", "first_name"]),
+            GinIndex(OpClass("search_text", name="gin_trgm_ops"), name="patient_search_trgm"),
+            GinIndex(OpClass("search_key", name="gin_trgm_ops"), name="patient_search_key_trgm"),
+            models.Index(OpClass("phone_digits", name="text_pattern_ops"), name="patient_phone_prefix"),
+            models.Index(OpClass(Reverse("phone_digits"), name="text_pattern_ops"), name="patient_phone_suffix"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.last_name} {self.first_name} {self.middle_name}".strip()
 
+    def refresh_derived(self):
+        """Lookup columns computed from the editable fields (DERIVED_FIELDS)."""
+        self.phone_digits = normalize_phone(self.phone)
+        self.search_key = search_key(self.last_name, self.first_name, self.middle_name)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *self.DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+
 
 class Service(models.Model):
     code = models.CharField(max_length=50, unique=True)
@@ -65,9 +121,29 @@ class Service(models.Model):
     price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     is_active = models.BooleanField(default=True)
 
+    # код + названия на всех языках в общей латинской форме (см. clinic.translit)
+    search_key = models.TextField(blank=True, editable=False)
+
+    DERIVED_FIELDS = ("search_key",)
+
+    class Meta:
+        indexes = [
+            GinIndex(OpClass("search_key", name="gin_trgm_ops"), name="service_search_key_trgm"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.code}: {self.name_en}"
 
+    def refresh_derived(self):
+        self.search_key = search_key(self.code, self.name_en, self.name_ru, self.name_kk)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *self.DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+
 
 class Room(models.Model):
     name = models.CharField(max_length=64, unique=True)  # "101"
@@ -139,12 +215,37 @@ class Appointment(models.Model):
             models.Index(fields=["doctor", "start_at"]),
             models.Index(fields=["patient", "start_at"]),
             models.Index(fields=["doctor", "status", "start_at"]),
+            # только активные записи — для expire_appointments (keyset по end_at, id)
+            models.Index(
+                fields=["end_at", "id"],
+                name="appointment_active_end_idx",
+                condition=models.Q(status__in=ACTIVE_APPOINTMENT_STATUSES),
+            ),
         ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(start_at__lt=models.F("end_at")),
                 name="appointment_start_before_end",
-            )
+            ),
+            # двойная запись к врачу невозможна даже при параллельных запросах
+            ExclusionConstraint(
+                name="appointment_doctor_no_overlap",
+                expressions=[
+                    ("doctor", RangeOperators.EQUAL),
+                    (TsTzRange("start_at", "end_at", RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status__in=ACTIVE_APPOINTMENT_STATUSES),
+                violation_error_message=APPOINTMENT_OVERLAP_MESSAGE,
+            ),
+            ExclusionConstraint(
+                name="appointment_room_no_overlap",
+                expressions=[
+                    ("room", RangeOperators.EQUAL),
+                    (TsTzRange("start_at", "end_at", RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status__in=ACTIVE_APPOINTMENT_STATUSES, room__isnull=False),
+                violation_error_message=ROOM_OVERLAP_MESSAGE,
+            ),
         ]
 
     STATUS_TRANSITIONS = {
@@ -155,56 +256,113 @@ class Appointment(models.Model):
         AppointmentStatus.NO_SHOW: {AppointmentStatus.NO_SHOW},
     }
 
-    def clean(self):
-        if self.start_at >= self.end_at:
-            raise ValidationError({"end_at": "end_at must be after start_at"})
+    RELATION_FIELDS = ("patient", "doctor", "service", "room")
+    TRACKED_FIELDS = ("status", "patient_id", "doctor_id", "service_id", "room_id", "start_at", "end_at")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # значения из БД — для проверки переходов статуса и FK без повторных SELECT
+        instance._loaded_values = {name: instance.__dict__.get(name) for name in cls.TRACKED_FIELDS}
+        return instance
+
+    def _old_status(self):
+        loaded = getattr(self, "_loaded_values", {}).get("status")
+        if loaded is not None:
+            return loaded
+        return Appointment.objects.only("status").get(pk=self.pk).status
+
+    def _known_relations(self) -> list[str]:
+        """FK fields that need no existence check: unchanged since load or holding an object fetched from DB."""
+        loaded = getattr(self, "_loaded_values", {})
+        names = []
+        for name in self.RELATION_FIELDS:
+            field = self._meta.get_field(name)
+            value = getattr(self, field.attname)
+            if value is not None and loaded.get(field.attname) == value:
+                names.append(name)
+                continue
+            if not field.is_cached(self):
+                continue
+            obj = field.get_cached_value(self)
+            if obj is not None and not obj._state.adding and obj.pk == value:
+                names.append(name)
+        return names
+
+    def _validation_flags(self) -> dict:
+        """
+        Working hours and time off checks as EXISTS subqueries of a single SELECT.
+        Doctor overlap is enforced by the appointment_doctor_no_overlap exclusion constraint.
+        """
+        start_local = timezone.localtime(self.start_at)
+        end_local = timezone.localtime(self.end_at)
 
-        qs = Appointment.objects.filter(
-            doctor=self.doctor,
-            status__in=ACTIVE_APPOINTMENT_STATUSES,
+        schedules = DoctorSchedule.objects.filter(doctor_id=self.doctor_id, weekday=start_local.weekday())
+        offs = DoctorTimeOff.objects.filter(
+            doctor_id=self.doctor_id,
             start_at__lt=self.end_at,
             end_at__gt=self.start_at,
         )
-        if self.pk:
-            qs = qs.exclude(pk=self.pk)
-        if qs.exists():
-            raise ValidationError("Appointment overlaps with another active appointment for this doctor.")
 
-        start_local = timezone.localtime(self.start_at)
-        end_local = timezone.localtime(self.end_at)
+        doctor_model = self._meta.get_field("doctor").related_model
+        flags = (
+            doctor_model.objects.filter(pk=self.doctor_id)
+            .annotate(
+                has_schedule=models.Exists(schedules),
+                in_schedule=models.Exists(
+                    schedules.filter(start_time__lte=start_local.time(), end_time__gte=end_local.time())
+                ),
+                time_off=models.Exists(offs),
+            )
+            .values("has_schedule", "in_schedule", "time_off")
+            .first()
+        )
+        return flags or {"has_schedule": False, "in_schedule": False, "time_off": False}
 
-        weekday = start_local.weekday()  # 0..6
-        schedules = DoctorSchedule.objects.filter(doctor=self.doctor, weekday=weekday)
+    def clean(self):
+        if self.start_at >= self.end_at:
+            raise ValidationError({"end_at": "end_at must be after start_at"})
 
-        if schedules.exists():
-            st = start_local.time()
-            en = end_local.time()
+        flags = self._validation_flags()
 
-            ok = schedules.filter(start_time__lte=st, end_time__gte=en).exists()
-            if not ok:
-                raise ValidationError("Appointment is outside doctor's working hours (schedule).")
+        if flags["has_schedule"] and not flags["in_schedule"]:
+            raise ValidationError("Appointment is outside doctor's working hours (schedule).")
 
-        offs = DoctorTimeOff.objects.filter(
-            doctor=self.doctor,
-            start_at__lt=self.end_at,
-            end_at__gt=self.start_at,
-        )
-        if offs.exists():
+        if flags["time_off"]:
             raise ValidationError("Appointment intersects doctor's time off.")
 
     def save(self, *args, **kwargs):
         if self.pk:
-            old = Appointment.objects.only("status").get(pk=self.pk)
-            allowed = self.STATUS_TRANSITIONS.get(old.status, {old.status})
+            old_status = self._old_status()
+            allowed = self.STATUS_TRANSITIONS.get(old_status, {old_status})
             if self.status not in allowed:
-                raise ValidationError(f"Status transition {old.status} -> {self.status} is not allowed.")
-
-        self.full_clean()
-        super().save(*args, **kwargs)
+                raise ValidationError(f"Status transition {old_status} -> {self.status} is not allowed.")
+
+        # единственная валидация за save(): уникальность pk, CHECK и пересечения (врач/кабинет) проверяет сама БД
+        self.full_clean(exclude=self._known_relations(), validate_unique=False, validate_constraints=False)
+
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        try:
+            # вместе с post_save (сводка по дням) одной транзакцией; во внешней — savepoint,
+            # чтобы нарушение ограничения не ломало её
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+        except IntegrityError as e:
+            constraint = _violated_constraint(e)
+            if constraint == "appointment_doctor_no_overlap":
+                raise ValidationError(APPOINTMENT_OVERLAP_MESSAGE) from e
+            if constraint == "appointment_room_no_overlap":
+                raise ValidationError({"room": ROOM_OVERLAP_MESSAGE}) from e
+            raise
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
 
     def __str__(self) -> str:
         return f"Appointment({self.patient_id} with {self.doctor.email} at {self.start_at})"
 
+# встроенная конфигурация russian: кириллица -> russian_stem, латиница -> english_stem (+ стоп-слова обоих языков)
+NOTE_SEARCH_CONFIG = "russian"
+
+
 class VisitNote(models.Model):
     appointment = models.OneToOneField(Appointment, on_delete=models.CASCADE, related_name="visit_note")
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="visit_notes")
@@ -214,6 +372,19 @@ class VisitNote(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # полнотекстовый индекс заметки, пересчитывается базой при каждой записи note_text
+    search_vector = models.GeneratedField(
+        expression=SearchVector("note_text", config=NOTE_SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # doctor_id внутри GIN (btree_gin): поиск сразу по заметкам одного врача
+            GinIndex(fields=["doctor", "search_vector"], name="visit_note_search_gin"),
+        ]
+
     def save(self, *args, **kwargs):
         if self.appointment_id:
             self.patient_id = self.appointment.patient_id
@@ -230,3 +401,52 @@ class Attachment(models.Model):
     file = models.FileField(upload_to=attachment_upload_path)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+
+
+class DoctorDayBitmap(models.Model):
+    """
+    Precomputed occupancy of one doctor-day in 5-minute cells (bit i = minutes 5*i .. 5*i+5, local time).
+    working: cells fully inside schedule intervals; busy: cells touched by active appointments or time off.
+    Rows are built on demand by clinic.bitmaps and dropped when the source rows change.
+    """
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="day_bitmaps")
+    day = models.DateField()
+    working = models.BinaryField()
+    busy = models.BinaryField()
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["doctor", "day"], name="doctor_day_bitmap_unique"),
+        ]
+
+
+class DoctorBitmapStamp(models.Model):
+    """
+    Change counter of a doctor's bitmap sources (appointments, schedule, time off). Writers bump it inside
+    their transaction; clinic.bitmaps stores a computed bitmap only if the stamp read before computing is unchanged.
+    No foreign key: appointments deleted with their doctor bump the stamp after the cascade.
+    """
+    doctor_id = models.BigIntegerField(primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+
+class AppointmentDailyStat(models.Model):
+    """
+    Appointments per (local day of start_at, doctor, service, status): count, booked minutes and
+    revenue (count * current Service.price). Kept current by clinic.rollups on every write,
+    rebuilt by `manage.py appointment_rollups rebuild`.
+    """
+    day = models.DateField()
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="+")
+    status = models.CharField(max_length=20, choices=AppointmentStatus.choices)
+
+    count = models.IntegerField(default=0)
+    minutes = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "doctor", "service", "status"], name="appointment_daily_stat_key"),
+        ]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import re
+
+
+_NON_DIGITS = re.compile(r"\D+")
+
+# 10 цифр без кода страны (701 111 22 33) / 11 цифр с 8 вместо +7 (8 701 ...) — приводим к 7XXXXXXXXXX
+LOCAL_DIGITS = 10
+COUNTRY_CODE = "7"
+TRUNK_PREFIX = "8"
+# первая цифра номера после кода страны (3/4/8/9 — Россия, 6/7 — Казахстан)
+LOCAL_FIRST_DIGITS = "346789"
+
+
+def digits_only(raw: str | None) -> str:
+    return _NON_DIGITS.sub("", raw or "")
+
+
+def normalize_phone(raw: str | None) -> str:
+    """Digits only, +7 / 8 / no country code unified to 7XXXXXXXXXX."""
+    digits = digits_only(raw)
+    if len(digits) == LOCAL_DIGITS:
+        return COUNTRY_CODE + digits
+    if len(digits) == LOCAL_DIGITS + 1 and digits.startswith(TRUNK_PREFIX):
+        return COUNTRY_CODE + digits[1:]
+    return digits
+
+
+def phone_prefixes(raw: str | None) -> list[str]:
+    """
+    Prefixes of a stored 7XXXXXXXXXX a partially typed number can stand for: the digits as typed, plus
+    8 -> 7 (trunk prefix: "8 701") or 7 + digits (no country code: "701 111"). "+..." is taken as typed.
+    """
+    digits = digits_only(raw)
+    if len(digits) >= LOCAL_DIGITS:
+        return [normalize_phone(raw)]
+    if (raw or "").lstrip().startswith("+") or not digits:
+        return [digits]
+    if digits.startswith(TRUNK_PREFIX):
+        return [digits, COUNTRY_CODE + digits[1:]]
+    if digits[0] in LOCAL_FIRST_DIGITS:
+        return [digits, COUNTRY_CODE + digits]
+    return [digits]
+
+
+def looks_like_phone(raw: str, min_digits: int = 4) -> bool:
+    """Only digits and phone punctuation, at least min_digits digits."""
+    return bool(re.fullmatch(r"[\d\s()+\-.]+", raw or "")) and len(digits_only(raw)) >= min_digits
@@ -0,0 +1,160 @@
+"""
+In-process LRU cache of report results keyed by the normalized filter set.
+
+Every entry remembers the generations of the months its date range covers (or of "all" for an open range).
+Appointment writes bump the generations of the months they touch (clinic.rollups.apply is on every write
+path), so an entry is served only while none of its months changed. Generations live in the "reports"
+cache: locmem per process by default, Redis (REPORTS_CACHE_URL) to see writes of other processes at once;
+REPORT_CACHE_TTL bounds the staleness otherwise. Every entry also depends on the "epoch" generation, bumped to
+drop everything at once: the backend itself is never cleared, it may hold other data (FLUSHDB on Redis).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+REPORTS_CACHE = "reports"
+ALL = "all"
+EPOCH = "epoch"
+# длиннее диапазон — зависим от общего счётчика, а не от каждого месяца
+MAX_MONTH_KEYS = 24
+
+
+def _cache():
+    return caches[REPORTS_CACHE]
+
+
+def _month(day: date) -> str:
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def months(date_from: date | None, date_to: date | None) -> tuple[str, ...]:
+    """Generation names an entry for date_from..date_to depends on."""
+    if date_from is None or date_to is None or date_from > date_to:
+        return (ALL,)
+    names = []
+    year, month = date_from.year, date_from.month
+    while (year, month) <= (date_to.year, date_to.month):
+        names.append(_month(date(year, month, 1)))
+        if len(names) > MAX_MONTH_KEYS:
+            return (ALL,)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return tuple(names)
+
+
+def _seed(key: str):
+    # пропавший счётчик (очистка, вытеснение, рестарт Redis) начинается с нового значения, а не с 1,
+    # иначе записи, сохранённые до пропажи, снова совпали бы с ним
+    _cache().add(key, time.time_ns(), timeout=None)
+
+
+def generations(names) -> tuple[int, ...]:
+    keys = [f"gen:{name}" for name in (EPOCH, *names)]
+    found = _cache().get_many(keys)
+    for key in keys:
+        if key not in found:
+            _seed(key)
+            found[key] = _cache().get(key)
+    return tuple(found[key] for key in keys)
+
+
+def _bump(names):
+    for name in names:
+        key = f"gen:{name}"
+        try:
+            _cache().incr(key)
+        except ValueError:
+            _seed(key)
+
+
+def invalidate_days(days):
+    """Appointments on these local days changed. Bumps now and after commit (as core.refdata.invalidate)."""
+    names = {_month(day) for day in days}
+    if not names:
+        return
+    names.add(ALL)
+    _bump(names)
+    transaction.on_commit(lambda: _bump(names))
+
+
+def invalidate_all():
+    """Every entry is stale (after a rollup rebuild): bumps the epoch now and after commit."""
+    _bump([EPOCH])
+    transaction.on_commit(lambda: _bump([EPOCH]))
+
+
+class ResultCache:
+    """Thread-safe LRU: key -> (generations, stored_at, value), with hit / miss / eviction counters."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, gens):
+        ttl = settings.REPORT_CACHE_TTL
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == gens and time.monotonic() - entry[1] < ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, gens, value):
+        with self._lock:
+            self._entries[key] = (gens, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+results = ResultCache(settings.REPORT_CACHE_SIZE)
+
+
+def cached(key, names, compute):
+    """
+    (value, hit). Generations are read before computing, and writers bump again after commit:
+    a result computed next to an uncommitted write is stored under a generation that is already stale.
+    """
+    gens = generations(names)
+    value = results.get(key, gens)
+    if value is not None:
+        return value, True
+    value = compute()
+    results.set(key, gens, value)
+    return value, False
+
+
+def clear():
+    results.clear()
+    _bump([EPOCH])
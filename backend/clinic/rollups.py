@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import report_cache
+from .availability import local_bounds
+from .models import AppointmentDailyStat
+
+
+STAT_TABLE = AppointmentDailyStat._meta.db_table
+
+# (doctor_id, service_id, status, start_at, end_at) — вклад одного приёма
+ROLLUP_FIELDS = ("doctor_id", "service_id", "status", "start_at", "end_at")
+
+
+def row(values: dict) -> tuple:
+    """ROLLUP_FIELDS from a dict: instance.__dict__, Appointment._loaded_values or a .values() row."""
+    return tuple(values.get(name) for name in ROLLUP_FIELDS)
+
+
+def _key(row) -> tuple:
+    doctor_id, service_id, status, start, end = row
+    return timezone.localtime(start).date(), doctor_id, service_id, status
+
+
+def _minutes(row) -> int:
+    return int((row[4] - row[3]).total_seconds() // 60)
+
+
+def apply(added=(), removed=()):
+    """
+    Add / subtract appointments (rows of ROLLUP_FIELDS) in one upsert. Call inside the writing transaction.
+    Keys are locked in sorted order, so concurrent writers can not deadlock on the stat rows.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for sign, rows in ((1, added), (-1, removed)):
+        for values in rows:
+            if None in values:
+                continue
+            delta = deltas[_key(values)]
+            delta[0] += sign
+            delta[1] += sign * _minutes(values)
+    deltas = {key: d for key, d in deltas.items() if d != [0, 0]}
+    if not deltas:
+        return
+
+    keys = sorted(deltas)
+    report_cache.invalidate_days({key[0] for key in keys})
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {STAT_TABLE} AS t (day, doctor_id, service_id, status, count, minutes, revenue)
+            SELECT d.day, d.doctor_id, d.service_id, d.status, d.count, d.minutes, d.count * s.price
+            FROM unnest(%s::date[], %s::bigint[], %s::bigint[], %s::text[], %s::int[], %s::int[])
+                AS d(day, doctor_id, service_id, status, count, minutes)
+            JOIN clinic_service s ON s.id = d.service_id
+            ORDER BY d.day, d.doctor_id, d.service_id, d.status
+            ON CONFLICT (day, doctor_id, service_id, status) DO UPDATE SET
+                count = t.count + EXCLUDED.count,
+                minutes = t.minutes + EXCLUDED.minutes,
+                revenue = t.revenue + EXCLUDED.revenue
+            """,
+            [
+                [k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys], [k[3] for k in keys],
+                [deltas[k][0] for k in keys], [deltas[k][1] for k in keys],
+            ],
+        )
+
+
+def reprice(service_id: int):
+    """revenue = count * price after the service price changed."""
+    with connection.cursor() as cur:
+        cur.execute(
+            f"UPDATE {STAT_TABLE} t SET revenue = t.count * s.price FROM clinic_service s "
+            f"WHERE s.id = %s AND t.service_id = s.id AND t.revenue <> t.count * s.price",
+            [service_id],
+        )
+
+
+# одна и та же агрегация для перестройки и для проверки
+_SOURCE_SQL = """
+    SELECT (a.start_at AT TIME ZONE %(tz)s)::date AS day, a.doctor_id, a.service_id, a.status,
+           count(*) AS count,
+           sum(floor(extract(epoch FROM a.end_at - a.start_at) / 60))::int AS minutes,
+           count(*) * s.price AS revenue
+    FROM clinic_appointment a
+    JOIN clinic_service s ON s.id = a.service_id
+    WHERE a.start_at >= %(start)s AND a.start_at < %(end)s
+    GROUP BY 1, 2, 3, 4, s.price
+"""
+
+
+def _bounds(date_from: date, date_to: date) -> dict:
+    start, end = local_bounds(date_from, date_to)
+    return {"tz": settings.TIME_ZONE, "start": start, "end": end, "date_from": date_from, "date_to": date_to}
+
+
+def rebuild(date_from: date, date_to: date) -> int:
+    """
+    Recompute the days date_from..date_to from appointments. Run inside a transaction: the stat table is locked
+    against writers until commit, so a booking can not slip between the recount and the swap.
+    """
+    params = _bounds(date_from, date_to)
+    report_cache.invalidate_all()
+    with connection.cursor() as cur:
+        cur.execute(f"LOCK TABLE {STAT_TABLE} IN EXCLUSIVE MODE")
+        cur.execute(f"DELETE FROM {STAT_TABLE} WHERE day >= %(date_from)s AND day <= %(date_to)s", params)
+        cur.execute(
+            f"INSERT INTO {STAT_TABLE} (day, doctor_id, service_id, status, count, minutes, revenue) {_SOURCE_SQL}",
+            params,
+        )
+        return cur.rowcount
+
+
+def mismatches(date_from: date, date_to: date) -> list[tuple]:
+    """Keys (day, doctor_id, service_id, status) whose stored row differs from the appointments."""
+    params = _bounds(date_from, date_to)
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT coalesce(src.day, t.day), coalesce(src.doctor_id, t.doctor_id),
+                   coalesce(src.service_id, t.service_id), coalesce(src.status, t.status)
+            FROM ({_SOURCE_SQL}) src
+            FULL JOIN (
+                SELECT * FROM {STAT_TABLE} WHERE day >= %(date_from)s AND day <= %(date_to)s AND count <> 0
+            ) t USING (day, doctor_id, service_id, status)
+            WHERE src.count IS DISTINCT FROM t.count
+               OR src.minutes IS DISTINCT FROM t.minutes
+               OR src.revenue IS DISTINCT FROM t.revenue
+            ORDER BY 1, 2, 3, 4
+            """,
+            params,
+        )
+        return cur.fetchall()
@@ -1,12 +1,18 @@
+from datetime import timedelta
+from html import escape
+
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 
 from accounts.models import User, UserRole
+from core.refdata import request_lang
 from .models import (
     Patient, Service, Room,
     DoctorSchedule, DoctorTimeOff,
-    Appointment, VisitNote, Attachment
+    Appointment, AppointmentStatus, VisitNote, Attachment
 )
+from .series import Frequency, MAX_OCCURRENCES, expand
+from .transitions import BULK_STATUS_MAX_IDS
 
 
 def _raise_drf_validation(e: DjangoValidationError):
@@ -19,13 +25,23 @@ def _raise_drf_validation(e: DjangoValidationError):
 class PatientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Patient
-        fields = "__all__"
+        exclude = ("search_text", "phone_digits", "search_key")
 
 
 class ServiceSerializer(serializers.ModelSerializer):
+    # название на языке запроса (Accept-Language) или context["lang"]; пустой перевод -> name_en
+    name = serializers.SerializerMethodField()
+
     class Meta:
         model = Service
-        fields = "__all__"
+        exclude = ("search_key",)
+
+    def get_name(self, obj: Service) -> str:
+        lang = self.context.get("lang")
+        if not lang:
+            request = self.context.get("request")
+            lang = request_lang(request) if request else "en"
+        return getattr(obj, f"name_{lang}") or obj.name_en
 
 
 class RoomSerializer(serializers.ModelSerializer):
@@ -74,23 +90,70 @@ class AppointmentAdminSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         instance = Appointment(**validated_data)
         try:
-            instance.full_clean()
+            instance.save()  # save() валидирует сам, один раз
         except DjangoValidationError as e:
             _raise_drf_validation(e)
-        instance.save()
         return instance
 
     def update(self, instance, validated_data):
         for k, v in validated_data.items():
             setattr(instance, k, v)
         try:
-            instance.full_clean()
+            instance.save()
         except DjangoValidationError as e:
             _raise_drf_validation(e)
-        instance.save()
         return instance
 
 
+class AppointmentSeriesSerializer(serializers.Serializer):
+    patient = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all())
+    doctor = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(role=UserRole.DOCTOR))
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all())
+    room = serializers.PrimaryKeyRelatedField(queryset=Room.objects.all(), required=False, allow_null=True)
+
+    start_at = serializers.DateTimeField()
+    end_at = serializers.DateTimeField(required=False, help_text="Default: start_at + service.duration_minutes")
+
+    frequency = serializers.ChoiceField(choices=Frequency.CHOICES)
+    count = serializers.IntegerField(required=False, min_value=1, max_value=MAX_OCCURRENCES)
+    until = serializers.DateField(required=False)
+
+    status = serializers.ChoiceField(
+        choices=[AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED],
+        default=AppointmentStatus.SCHEDULED,
+    )
+    reason = serializers.CharField(required=False, allow_blank=True, max_length=255, default="")
+    comment = serializers.CharField(required=False, allow_blank=True, default="")
+
+    def validate(self, attrs):
+        if ("count" in attrs) == ("until" in attrs):
+            raise serializers.ValidationError("Provide exactly one of 'count' or 'until'.")
+
+        if "end_at" not in attrs:
+            attrs["end_at"] = attrs["start_at"] + timedelta(minutes=attrs["service"].duration_minutes)
+        if attrs["start_at"] >= attrs["end_at"]:
+            raise serializers.ValidationError({"end_at": "end_at must be after start_at"})
+        if "until" in attrs:
+            # молча обрезать серию нельзя: хвост просто не был бы записан
+            occurrences = expand(
+                attrs["start_at"], attrs["end_at"], attrs["frequency"], MAX_OCCURRENCES + 1, attrs["until"],
+            )
+            if len(occurrences) > MAX_OCCURRENCES:
+                raise serializers.ValidationError(
+                    {"until": f"The series would have more than {MAX_OCCURRENCES} occurrences."}
+                )
+        return attrs
+
+
+class AppointmentBulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_STATUS_MAX_IDS,
+    )
+    status = serializers.ChoiceField(choices=AppointmentStatus.choices)
+
+
 class AppointmentDoctorSerializer(serializers.ModelSerializer):
     patient_name = serializers.SerializerMethodField()
     service_code = serializers.CharField(source="service.code", read_only=True)
@@ -138,6 +201,28 @@ class VisitNoteSerializer(serializers.ModelSerializer):
         return appointment
 
 
+# границы совпадений в ts_headline: управляющие символы, чтобы экранировать сам текст заметки, а не разметку
+SNIPPET_START = "\x02"
+SNIPPET_STOP = "\x03"
+
+
+class VisitNoteSearchSerializer(serializers.ModelSerializer):
+    """Search hit: snippet is HTML-escaped note text with matches wrapped in <mark>."""
+    patient_name = serializers.SerializerMethodField()
+    rank = serializers.FloatField(read_only=True)
+    snippet = serializers.SerializerMethodField()
+
+    class Meta:
+        model = VisitNote
+        fields = ("id", "appointment", "patient", "patient_name", "created_at", "updated_at", "rank", "snippet")
+
+    def get_patient_name(self, obj):
+        return str(obj.patient)
+
+    def get_snippet(self, obj):
+        return escape(obj.snippet).replace(SNIPPET_START, "<mark>").replace(SNIPPET_STOP, "</mark>")
+
+
 class AttachmentSerializer(serializers.ModelSerializer):
     visit_note = serializers.IntegerField(source="visit_note_id", read_only=True)
     file_url = serializers.SerializerMethodField()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+from django.utils import timezone
+
+from .availability import (
+    fits_schedule,
+    intersects,
+    load_appointments,
+    load_room_bookings,
+    load_schedules,
+    load_time_off,
+)
+
+
+class Frequency:
+    WEEKLY = "WEEKLY"
+    BIWEEKLY = "BIWEEKLY"
+
+    CHOICES = (WEEKLY, BIWEEKLY)
+    STEP_DAYS = {WEEKLY: 7, BIWEEKLY: 14}
+
+
+MAX_OCCURRENCES = 104
+
+CONFLICT_MESSAGES = {
+    "doctor_busy": "Overlaps with another active appointment for this doctor.",
+    "room_busy": "Room is already booked for this time.",
+    "time_off": "Intersects doctor's time off.",
+    "outside_schedule": "Outside doctor's working hours (schedule).",
+}
+
+
+def expand(start_at: datetime, end_at: datetime, frequency: str, count: int | None = None, until: date | None = None):
+    """
+    Occurrences as (start, end). Steps are taken in local wall-clock time,
+    so a 10:00 visit stays at 10:00 across DST changes.
+    """
+    step = timedelta(days=Frequency.STEP_DAYS[frequency])
+    duration = end_at - start_at
+    local_start = timezone.localtime(start_at).replace(tzinfo=None)
+
+    out = []
+    while len(out) < (count or MAX_OCCURRENCES):
+        start = timezone.make_aware(local_start)
+        if until and start.date() > until:
+            break
+        out.append((start, start + duration))
+        local_start += step
+    return out
+
+
+def find_conflicts(doctor_id: int, room_id: int | None, occurrences) -> list[str | None]:
+    """
+    Conflict code per occurrence (None = bookable).
+    Four queries for the whole series: schedules, appointments, time off, room bookings.
+    """
+    if not occurrences:
+        return []
+
+    start = min(s for s, _ in occurrences)
+    end = max(e for _, e in occurrences)
+
+    schedules = load_schedules([doctor_id]).get(doctor_id, {})
+    appts = load_appointments([doctor_id], start, end).get(doctor_id, [])
+    offs = load_time_off([doctor_id], start, end).get(doctor_id, [])
+    room_busy = load_room_bookings([room_id], start, end).get(room_id, []) if room_id else []
+
+    out = []
+    for s, e in occurrences:
+        day_schedule = schedules.get(timezone.localtime(s).weekday())
+        if not fits_schedule(day_schedule, s, e):
+            out.append("outside_schedule")
+        elif intersects(offs, s, e):
+            out.append("time_off")
+        elif intersects(appts, s, e):
+            out.append("doctor_busy")
+        elif intersects(room_busy, s, e):
+            out.append("room_busy")
+        else:
+            out.append(None)
+    return out
@@ -0,0 +1,73 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import refdata
+from . import rollups
+from .bitmaps import invalidate, invalidate_intervals
+from .models import Appointment, DoctorSchedule, DoctorTimeOff, Room, Service
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_changed(sender, instance: Appointment, **kwargs):
+    rows = [(instance.doctor_id, instance.start_at, instance.end_at)]
+    # прежний интервал/врач, если запись перенесли (post_save идёт до обновления _loaded_values)
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded:
+        rows.append((loaded.get("doctor_id"), loaded.get("start_at"), loaded.get("end_at")))
+    invalidate_intervals(rows)
+
+
+@receiver(pre_save, sender=Appointment)
+def appointment_load_old(sender, instance: Appointment, **kwargs):
+    # объект не из БД (Appointment(pk=...)) или загружен через only(): прежний вклад в сводку берём из строки
+    loaded = getattr(instance, "_loaded_values", None)
+    if not instance._state.adding and (loaded is None or None in rollups.row(loaded)):
+        instance._loaded_values = (
+            Appointment.objects.filter(pk=instance.pk).values(*Appointment.TRACKED_FIELDS).first() or {}
+        )
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_rollup_saved(sender, instance: Appointment, created: bool, **kwargs):
+    loaded = getattr(instance, "_loaded_values", None) or {}
+    rollups.apply(
+        added=[rollups.row(instance.__dict__)],
+        removed=[] if created else [rollups.row(loaded)],
+    )
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_rollup_deleted(sender, instance: Appointment, **kwargs):
+    loaded = getattr(instance, "_loaded_values", None) or instance.__dict__
+    rollups.apply(removed=[rollups.row(loaded)])
+
+
+@receiver(post_save, sender=DoctorSchedule)
+@receiver(post_delete, sender=DoctorSchedule)
+def schedule_changed(sender, instance: DoctorSchedule, **kwargs):
+    invalidate(instance.doctor_id)
+
+
+@receiver(post_save, sender=DoctorTimeOff)
+@receiver(post_delete, sender=DoctorTimeOff)
+def time_off_changed(sender, instance: DoctorTimeOff, **kwargs):
+    invalidate(instance.doctor_id)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def service_changed(sender, instance: Service, **kwargs):
+    refdata.invalidate("services")
+
+
+@receiver(post_save, sender=Service)
+def service_repriced(sender, instance: Service, created: bool, **kwargs):
+    if not created:
+        rollups.reprice(instance.pk)
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def room_changed(sender, instance: Room, **kwargs):
+    refdata.invalidate("rooms")
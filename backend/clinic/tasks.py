@@ -0,0 +1,70 @@
+"""Background job kinds of the clinic app (see jobs.registry), for reports and exports too big for a request."""
+from __future__ import annotations
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from core.refdata import LANGS
+from jobs.registry import register
+from .exports import EXPORT_TYPES, XLSX_MAX_ROWS, export_rows
+from .filters import AppointmentFilter
+from .models import Appointment
+from .utilization import MAX_REPORT_DAYS, utilization_report
+
+
+def _appointments(params: dict):
+    return AppointmentFilter(params, queryset=Appointment.objects.order_by("-start_at")).qs
+
+
+def check_export_params(params: dict) -> dict:
+    """AppointmentFilter params + type (csv / xlsx) + lang."""
+    params = dict(params)
+    params.setdefault("type", "csv")
+    params.setdefault("lang", "en")
+    if params["type"] not in EXPORT_TYPES:
+        raise ValidationError({"params": {"type": "Must be 'csv' or 'xlsx'."}})
+    if params["lang"] not in LANGS:
+        raise ValidationError({"params": {"lang": f"Must be one of: {', '.join(LANGS)}."}})
+    form = AppointmentFilter(params, queryset=Appointment.objects.none()).form
+    if not form.is_valid():
+        raise ValidationError({"params": form.errors})
+    return params
+
+
+@register("appointments_export", validate=check_export_params)
+def appointments_export(params: dict, out) -> dict:
+    qs = _appointments(params)
+    kind = params.get("type", "csv")
+    if kind == "xlsx" and qs.count() > XLSX_MAX_ROWS:
+        raise ValueError(f"More than {XLSX_MAX_ROWS} rows do not fit an XLSX sheet, use CSV.")
+
+    stream, content_type = EXPORT_TYPES[kind]
+    for chunk in stream(export_rows(qs, params.get("lang", "en"))):
+        out.write(chunk)
+    return {"name": f"appointments-{timezone.localtime():%Y%m%d-%H%M}.{kind}", "content_type": content_type}
+
+
+def check_utilization_params(params: dict) -> dict:
+    """date_from, date_to (YYYY-MM-DD, up to MAX_REPORT_DAYS), optional doctor ids."""
+    date_from = parse_date(str(params.get("date_from") or ""))
+    date_to = parse_date(str(params.get("date_to") or params.get("date_from") or ""))
+    if not date_from or not date_to:
+        raise ValidationError({"params": "date_from / date_to must be in YYYY-MM-DD format."})
+    if date_to < date_from or (date_to - date_from).days >= MAX_REPORT_DAYS:
+        raise ValidationError({"params": f"date_to must be within {MAX_REPORT_DAYS} days after date_from."})
+    doctors = params.get("doctor") or []
+    if not isinstance(doctors, list) or not all(isinstance(d, int) for d in doctors):
+        raise ValidationError({"params": {"doctor": "Must be a list of ids."}})
+    return {"date_from": date_from.isoformat(), "date_to": date_to.isoformat(), "doctor": doctors}
+
+
+@register("utilization_report", validate=check_utilization_params)
+def utilization_report_job(params: dict, out) -> dict:
+    date_from, date_to = parse_date(params["date_from"]), parse_date(params["date_to"])
+    payload = {"date_from": date_from, "date_to": date_to, **utilization_report(date_from, date_to, params["doctor"])}
+    out.write(json.dumps(payload, cls=DjangoJSONEncoder).encode())
+    return {"name": f"utilization-{date_from}-{date_to}.json", "content_type": "application/json"}
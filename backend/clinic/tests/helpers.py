@@ -0,0 +1,10 @@
+from datetime import date, datetime, time
+
+from django.utils import timezone
+
+
+MONDAY = date(2030, 1, 7)
+
+
+def at(day: date, hh: int, mm: int = 0):
+    return timezone.make_aware(datetime.combine(day, time(hh, mm)))
@@ -0,0 +1,118 @@
+from datetime import time, timedelta
+
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic.availability import free_slots
+from clinic.models import Patient, Service, Room, DoctorSchedule, DoctorTimeOff, Appointment, AppointmentStatus
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class AvailabilityTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(9, 0), end_time=time(11, 0), slot_minutes=30)
+
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=at(MONDAY, 9, 30), end_at=at(MONDAY, 10, 0),
+        )
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=at(MONDAY, 9, 0), end_at=at(MONDAY, 9, 30),
+            status=AppointmentStatus.CANCELLED,
+        )
+        DoctorTimeOff.objects.create(doctor=self.doctor, start_at=at(MONDAY, 10, 30), end_at=at(MONDAY, 11, 0))
+
+    def test_free_slots_skip_bookings_and_time_off(self):
+        # schedules + bitmaps, then stamps + appointments + time off + upsert for the missing days
+        with self.assertNumQueries(6):
+            free_slots([self.doctor.id], MONDAY, MONDAY + timedelta(days=7))
+        with self.assertNumQueries(2):
+            slots = free_slots([self.doctor.id], MONDAY, MONDAY + timedelta(days=7))
+
+        self.assertEqual(
+            slots[self.doctor.id],
+            [
+                (at(MONDAY, 9, 0), at(MONDAY, 9, 30)),
+                (at(MONDAY, 10, 0), at(MONDAY, 10, 30)),
+                (at(MONDAY + timedelta(days=7), 9, 0), at(MONDAY + timedelta(days=7), 9, 30)),
+                (at(MONDAY + timedelta(days=7), 9, 30), at(MONDAY + timedelta(days=7), 10, 0)),
+                (at(MONDAY + timedelta(days=7), 10, 0), at(MONDAY + timedelta(days=7), 10, 30)),
+                (at(MONDAY + timedelta(days=7), 10, 30), at(MONDAY + timedelta(days=7), 11, 0)),
+            ],
+        )
+
+    def test_admin_availability_endpoint(self):
+        auth(self.client, self.admin)
+        r = self.client.get("/api/admin/availability/", {"doctor": f"{self.doctor.id}", "date_from": "2030-01-07"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["doctors"][0]["doctor_id"], self.doctor.id)
+        self.assertEqual(len(r.data["doctors"][0]["slots"]), 2)
+
+    def test_doctor_availability_requires_date(self):
+        auth(self.client, self.doctor)
+        r = self.client.get("/api/doctor/availability/")
+        self.assertEqual(r.status_code, 400)
+
+
+class FirstAvailableTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="ECG", name_en="ECG", duration_minutes=30)
+        self.room1 = Room.objects.create(name="101")
+        self.room2 = Room.objects.create(name="102")
+
+        self.cardio1 = self.make_doctor("cardio1@test.local", "Cardiologist", room="101")
+        self.cardio2 = self.make_doctor("cardio2@test.local", "Cardiologist")
+        self.dentist = self.make_doctor("dentist@test.local", "Dentist")
+
+        self.book(self.cardio1, self.room1, 9, 0, 9, 30)
+        self.book(self.dentist, self.room2, 9, 0, 10, 0)
+
+    def make_doctor(self, email, specialization, room=""):
+        doctor = User.objects.create_user(email=email, role=UserRole.DOCTOR)
+        doctor.doctor_profile.specialization = specialization
+        doctor.doctor_profile.room = room
+        doctor.doctor_profile.save()
+        DoctorSchedule.objects.create(doctor=doctor, weekday=0, start_time=time(9, 0), end_time=time(13, 0))
+        return doctor
+
+    def book(self, doctor, room, h1, m1, h2, m2):
+        Appointment.objects.create(
+            patient=self.patient, doctor=doctor, service=self.service, room=room,
+            start_at=at(MONDAY, h1, m1), end_at=at(MONDAY, h2, m2),
+        )
+
+    def test_earliest_doctor_and_room(self):
+        auth(self.client, self.admin)
+        params = {
+            "service": self.service.id,
+            "specialization": "cardiologist",
+            "date_from": "2030-01-07T08:00:00Z",
+            "date_to": "2030-01-07T12:00:00Z",
+            "k": 2,
+        }
+        # auth, service, doctors, rooms, schedules, bitmaps (+ stamps, appointments, time off, upsert), room bookings
+        with self.assertNumQueries(11):
+            r = self.client.get("/api/admin/availability/first/", params)
+        self.assertEqual(r.status_code, 200)
+
+        results = [(x["start_at"], x["doctor_id"], x["room_id"]) for x in r.data["results"]]
+        # 09:00 — doctor 2 is free but both rooms are taken
+        self.assertEqual(results, [
+            (at(MONDAY, 9, 30), self.cardio1.id, self.room1.id),
+            (at(MONDAY, 9, 30), self.cardio2.id, self.room1.id),
+        ])
+
+    def test_service_required(self):
+        auth(self.client, self.admin)
+        r = self.client.get("/api/admin/availability/first/", {"specialization": "Cardiologist"})
+        self.assertEqual(r.status_code, 400)
@@ -0,0 +1,153 @@
+import threading
+from datetime import date, time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from accounts.models import User, UserRole
+from clinic import bitmaps
+from clinic.availability import free_slots
+from clinic.bitmaps import cell_span, get_bitmaps, span_mask
+from clinic.models import (
+    Patient, Service, DoctorSchedule, DoctorTimeOff, DoctorDayBitmap, DoctorBitmapStamp, Appointment, AppointmentStatus,
+)
+
+from .helpers import MONDAY, at
+
+
+class DayBitmapTests(TestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(9, 0), end_time=time(10, 0))
+
+    def book(self, hh, mm=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor, service=self.service,
+                start_at=at(MONDAY, hh, mm), end_at=at(MONDAY, hh, mm + 30),
+            )
+
+    def free_starts(self):
+        return [s for s, _ in free_slots([self.doctor.id], MONDAY, MONDAY)[self.doctor.id]]
+
+    def test_cells(self):
+        self.assertEqual(cell_span(at(MONDAY, 9), at(MONDAY, 9, 30), MONDAY), (108, 114))
+        bits = get_bitmaps([self.doctor.id], MONDAY, MONDAY)[(self.doctor.id, MONDAY)]
+        self.assertEqual(bits.working, span_mask(108, 120))
+        self.assertEqual(bits.busy, 0)
+
+    def test_writes_invalidate_bitmaps(self):
+        self.assertEqual(self.free_starts(), [at(MONDAY, 9), at(MONDAY, 9, 30)])
+        self.assertTrue(DoctorDayBitmap.objects.filter(doctor=self.doctor, day=MONDAY).exists())
+
+        appt = self.book(9)
+        self.assertEqual(self.free_starts(), [at(MONDAY, 9, 30)])
+
+        appt.status = AppointmentStatus.CANCELLED
+        with self.captureOnCommitCallbacks(execute=True):
+            appt.save()
+        self.assertEqual(self.free_starts(), [at(MONDAY, 9), at(MONDAY, 9, 30)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DoctorTimeOff.objects.create(doctor=self.doctor, start_at=at(MONDAY, 9, 30), end_at=at(MONDAY, 10))
+        self.assertEqual(self.free_starts(), [at(MONDAY, 9)])
+
+    def test_verify_and_rebuild_command(self):
+        self.free_starts()
+        appt = self.book(9)
+        self.free_starts()
+
+        # bypasses signals -> stored bitmap is stale
+        Appointment.objects.filter(pk=appt.pk).update(status=AppointmentStatus.CANCELLED)
+        with self.assertRaises(CommandError):
+            call_command("availability_bitmaps", "verify", "--date-from", "2030-01-07", "--days", "1", stdout=StringIO())
+
+        call_command("availability_bitmaps", "rebuild", "--date-from", "2030-01-07", "--days", "7", stdout=StringIO())
+        call_command("availability_bitmaps", "verify", "--date-from", "2030-01-07", "--days", "7", stdout=StringIO())
+        self.assertEqual(DoctorDayBitmap.objects.filter(doctor=self.doctor).count(), 7)
+        self.assertEqual(self.free_starts(), [at(MONDAY, 9), at(MONDAY, 9, 30)])
+
+    def test_prune_drops_past_days_and_unused_stamps(self):
+        other = User.objects.create_user(email="doctor2@test.local", role=UserRole.DOCTOR)
+        next_monday = date(2030, 1, 14)
+        get_bitmaps([self.doctor.id], MONDAY, next_monday)
+        with transaction.atomic():
+            bitmaps.bump([other.id])
+        get_bitmaps([other.id], MONDAY, MONDAY)
+        old = bitmaps.stamps([other.id])[other.id]
+
+        call_command("availability_bitmaps", "prune", "--date-from", "2030-01-14", stdout=StringIO())
+        self.assertEqual(
+            list(DoctorDayBitmap.objects.values_list("doctor_id", "day")), [(self.doctor.id, next_monday)],
+        )
+        self.assertEqual(list(DoctorBitmapStamp.objects.values_list("doctor_id", flat=True)), [self.doctor.id])
+
+        # пересозданный счётчик не совпадает с прочитанным до удаления
+        with transaction.atomic():
+            bitmaps.invalidate(other.id)
+        self.assertNotEqual(bitmaps.stamps([other.id])[other.id], old)
+
+    def test_read_through_racing_a_write_is_not_stored(self):
+        real_compute = bitmaps.compute
+
+        def compute_then_book(*args, **kwargs):
+            # запись фиксируется между расчётом и сохранением
+            built = real_compute(*args, **kwargs)
+            self.book(9)
+            return built
+
+        with mock.patch("clinic.bitmaps.compute", side_effect=compute_then_book):
+            stale = get_bitmaps([self.doctor.id], MONDAY, MONDAY)[(self.doctor.id, MONDAY)]
+        self.assertEqual(stale.busy, 0)
+        self.assertFalse(DoctorDayBitmap.objects.filter(doctor=self.doctor).exists())
+        self.assertEqual(self.free_starts(), [at(MONDAY, 9, 30)])
+
+
+class DayBitmapConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(9, 0), end_time=time(10, 0))
+
+    def test_store_waits_for_an_uncommitted_writer(self):
+        bumped, commit = threading.Event(), threading.Event()
+
+        def writer():
+            try:
+                with transaction.atomic():
+                    Appointment.objects.create(
+                        patient=self.patient, doctor=self.doctor, service=self.service,
+                        start_at=at(MONDAY, 9), end_at=at(MONDAY, 9, 30),
+                    )
+                    bumped.set()
+                    commit.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=writer)
+        real_compute = bitmaps.compute
+
+        def compute_then_write(*args, **kwargs):
+            # писатель обновил штамп, но ещё не зафиксировал: сохранение ждёт его блокировку
+            built = real_compute(*args, **kwargs)
+            thread.start()
+            self.assertTrue(bumped.wait(5))
+            threading.Timer(0.3, commit.set).start()
+            return built
+
+        with mock.patch("clinic.bitmaps.compute", side_effect=compute_then_write):
+            stale = get_bitmaps([self.doctor.id], MONDAY, MONDAY)[(self.doctor.id, MONDAY)]
+        thread.join(5)
+
+        self.assertEqual(stale.busy, 0)
+        self.assertFalse(DoctorDayBitmap.objects.filter(doctor=self.doctor).exists())
+        self.assertEqual(
+            [s for s, _ in free_slots([self.doctor.id], MONDAY, MONDAY)[self.doctor.id]], [at(MONDAY, 9, 30)],
+        )
@@ -0,0 +1,109 @@
+import threading
+from datetime import time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service, DoctorSchedule, DoctorTimeOff, Appointment, AppointmentStatus
+
+from .helpers import MONDAY, at
+
+
+class AppointmentValidationTests(TestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(9, 0), end_time=time(13, 0))
+
+    def book(self, start, minutes=30, **extra):
+        appt = Appointment(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=start, end_at=start + timedelta(minutes=minutes), **extra,
+        )
+        appt.save()
+        return appt
+
+    def test_create_runs_one_validation_query(self):
+        appt = Appointment(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=at(MONDAY, 9), end_at=at(MONDAY, 9, 30),
+        )
+        # validation SELECT + INSERT + bitmap stamp bump and delete + rollup upsert
+        # (+ SAVEPOINT/RELEASE: the test itself runs inside a transaction)
+        with self.assertNumQueries(7):
+            appt.save()
+
+    def test_status_change_reuses_loaded_state(self):
+        pk = self.book(at(MONDAY, 9)).pk
+        appt = Appointment.objects.get(pk=pk)
+        appt.status = AppointmentStatus.CONFIRMED
+        with self.assertNumQueries(7):
+            appt.save()
+
+        appt.status = AppointmentStatus.SCHEDULED
+        with self.assertRaises(ValidationError):
+            appt.save()
+
+    def test_rules_still_enforced(self):
+        self.book(at(MONDAY, 9))
+        DoctorTimeOff.objects.create(doctor=self.doctor, start_at=at(MONDAY, 11), end_at=at(MONDAY, 12))
+
+        with self.assertRaisesMessage(ValidationError, "overlaps"):
+            self.book(at(MONDAY, 9, 15))
+        with self.assertRaisesMessage(ValidationError, "working hours"):
+            self.book(at(MONDAY, 12, 45))
+        with self.assertRaisesMessage(ValidationError, "time off"):
+            self.book(at(MONDAY, 11, 30))
+
+        # no schedule on Tuesday -> hours are not restricted
+        self.book(at(MONDAY + timedelta(days=1), 20))
+
+    def test_cancelled_slot_can_be_rebooked(self):
+        first = self.book(at(MONDAY, 9))
+        first.status = AppointmentStatus.CANCELLED
+        first.save()
+        self.book(at(MONDAY, 9))
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    THREADS = 12
+
+    def setUp(self):
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+
+    def test_same_slot_booked_once(self):
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        lock = threading.Lock()
+
+        def book(i):
+            try:
+                appt = Appointment(
+                    patient_id=self.patient.id, doctor_id=self.doctor.id, service_id=self.service.id,
+                    start_at=at(MONDAY, 10, i % 3 * 10), end_at=at(MONDAY, 10, 30 + i % 3 * 10),
+                )
+                barrier.wait()
+                try:
+                    appt.save()
+                    outcome = "ok"
+                except ValidationError:
+                    outcome = "rejected"
+                with lock:
+                    results.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(i,)) for i in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results.count("ok"), 1)
+        self.assertEqual(results.count("rejected"), self.THREADS - 1)
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 1)
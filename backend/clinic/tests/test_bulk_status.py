@@ -0,0 +1,65 @@
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from audit.models import AuditLog
+from clinic.models import Patient, Service, Appointment, AppointmentStatus
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class BulkStatusTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.other = User.objects.create_user(email="doctor2@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+
+        self.confirmed = [self.book(self.doctor, 9 + i, AppointmentStatus.CONFIRMED) for i in range(3)]
+        self.cancelled = self.book(self.doctor, 13, AppointmentStatus.CANCELLED)
+        self.completed = self.book(self.doctor, 14, AppointmentStatus.COMPLETED)
+        self.foreign = self.book(self.other, 9, AppointmentStatus.CONFIRMED)
+
+    def book(self, doctor, hh, status):
+        return Appointment.objects.create(
+            patient=self.patient, doctor=doctor, service=self.service,
+            start_at=at(MONDAY, hh), end_at=at(MONDAY, hh, 30), status=status,
+        )
+
+    def test_admin_bulk_completed(self):
+        auth(self.client, self.admin)
+        ids = [a.id for a in self.confirmed] + [self.cancelled.id, self.completed.id, 999999]
+        # auth, locking select, update, audit insert, rollup upsert, bitmap stamp bump and delete (+ savepoint pair)
+        with self.assertNumQueries(9):
+            r = self.client.post("/api/admin/appointments/bulk_status/", {"ids": ids, "status": "COMPLETED"}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["updated"], [a.id for a in self.confirmed])
+        self.assertEqual(r.data["unchanged"], [self.completed.id])
+        self.assertEqual(
+            [(x["id"], x["reason"]) for x in r.data["rejected"]],
+            [(self.cancelled.id, "invalid_transition"), (999999, "not_found")],
+        )
+
+        self.assertEqual(Appointment.objects.filter(status=AppointmentStatus.COMPLETED).count(), 4)
+        logs = AuditLog.objects.filter(meta__type="appointment_bulk_status")
+        self.assertEqual(logs.count(), 3)
+        self.assertEqual(logs.first().meta["from"], AppointmentStatus.CONFIRMED)
+
+    def test_doctor_bulk_only_own(self):
+        auth(self.client, self.doctor)
+        ids = [self.confirmed[0].id, self.foreign.id]
+        r = self.client.post("/api/doctor/appointments/bulk_status/", {"ids": ids, "status": "NO_SHOW"}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["updated"], [self.confirmed[0].id])
+        self.assertEqual(r.data["rejected"][0]["reason"], "not_found")
+
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.status, AppointmentStatus.CONFIRMED)
+
+    def test_validation(self):
+        auth(self.client, self.admin)
+        r = self.client.post("/api/admin/appointments/bulk_status/", {"ids": [], "status": "COMPLETED"}, format="json")
+        self.assertEqual(r.status_code, 400)
+        r = self.client.post("/api/admin/appointments/bulk_status/", {"ids": [1], "status": "DONE"}, format="json")
+        self.assertEqual(r.status_code, 400)
@@ -0,0 +1,65 @@
+from datetime import time, timedelta
+
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service, Room, DoctorSchedule, DoctorTimeOff, Appointment
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class DoctorWeekCalendarTests(APITestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.other = User.objects.create_user(email="doctor2@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        self.room = Room.objects.create(name="101")
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(9, 0), end_time=time(13, 0))
+
+        for i in range(3):
+            Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor, service=self.service, room=self.room,
+                start_at=at(MONDAY + timedelta(days=i), 9), end_at=at(MONDAY + timedelta(days=i), 9, 30),
+            )
+        # next week and another doctor: not included
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=at(MONDAY + timedelta(days=7), 9), end_at=at(MONDAY + timedelta(days=7), 9, 30),
+        )
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.other, service=self.service,
+            start_at=at(MONDAY, 9), end_at=at(MONDAY, 9, 30),
+        )
+        DoctorTimeOff.objects.create(doctor=self.doctor, start_at=at(MONDAY + timedelta(days=4), 0), end_at=at(MONDAY + timedelta(days=5), 0))
+
+    def test_week_payload(self):
+        auth(self.client, self.doctor)
+        with self.assertNumQueries(4):  # auth user + appointments + schedule + time off
+            r = self.client.get("/api/doctor/calendar/week/", {"date": "2030-01-09"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["week_start"], MONDAY)
+        self.assertEqual(len(r.data["appointments"]), 3)
+
+        row = dict(zip(r.data["appointment_fields"], r.data["appointments"][0]))
+        self.assertEqual(row["patient_name"], "Doe John")
+        self.assertEqual(row["service_code"], "CONSULT")
+        self.assertEqual(row["room"], "101")
+        self.assertEqual(len(r.data["schedule"]), 1)
+        self.assertEqual(len(r.data["time_off"]), 1)
+
+    def test_etag_not_modified(self):
+        auth(self.client, self.doctor)
+        r = self.client.get("/api/doctor/calendar/week/", {"date": "2030-01-07"})
+        etag = r["ETag"]
+
+        r = self.client.get("/api/doctor/calendar/week/", {"date": "2030-01-07"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 304)
+
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=at(MONDAY, 11), end_at=at(MONDAY, 11, 30),
+        )
+        r = self.client.get("/api/doctor/calendar/week/", {"date": "2030-01-07"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User, UserRole
+from audit.models import AuditLog
+from clinic.models import Patient, Service, Appointment, AppointmentStatus
+
+
+class ExpireAppointmentsTests(TestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        self.now = timezone.now().replace(microsecond=0)
+
+    def book(self, hours_ago, status):
+        start = self.now - timedelta(hours=hours_ago)
+        return Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=start, end_at=start + timedelta(minutes=30), status=status,
+        )
+
+    def test_expires_past_active_in_chunks(self):
+        confirmed = [self.book(100 - i, AppointmentStatus.CONFIRMED) for i in range(3)]
+        scheduled = [self.book(50 - i, AppointmentStatus.SCHEDULED) for i in range(2)]
+        done = self.book(10, AppointmentStatus.COMPLETED)
+        recent = self.book(0.75, AppointmentStatus.CONFIRMED)  # закончился 15 минут назад — в пределах grace
+        future = self.book(-24, AppointmentStatus.SCHEDULED)
+
+        out = StringIO()
+        call_command("expire_appointments", "--chunk", "2", stdout=out)
+        self.assertIn("chunk 3:", out.getvalue())
+
+        statuses = dict(Appointment.objects.values_list("id", "status"))
+        for a in confirmed:
+            self.assertEqual(statuses[a.id], AppointmentStatus.NO_SHOW)
+        for a in scheduled:
+            self.assertEqual(statuses[a.id], AppointmentStatus.CANCELLED)
+        self.assertEqual(statuses[done.id], AppointmentStatus.COMPLETED)
+        self.assertEqual(statuses[recent.id], AppointmentStatus.CONFIRMED)
+        self.assertEqual(statuses[future.id], AppointmentStatus.SCHEDULED)
+        self.assertEqual(AuditLog.objects.filter(meta__type="appointment_expired").count(), 5)
+
+        # повторный запуск — ничего не делает
+        out = StringIO()
+        call_command("expire_appointments", stdout=out)
+        self.assertIn("Expired 0 appointments", out.getvalue())
+
+    def test_dry_run_and_limit(self):
+        for i in range(3):
+            self.book(100 - i, AppointmentStatus.CONFIRMED)
+
+        out = StringIO()
+        call_command("expire_appointments", "--dry-run", stdout=out)
+        self.assertIn("3 appointments", out.getvalue())
+        self.assertEqual(Appointment.objects.filter(status=AppointmentStatus.CONFIRMED).count(), 3)
+
+        call_command("expire_appointments", "--limit", "2", stdout=StringIO())
+        self.assertEqual(Appointment.objects.filter(status=AppointmentStatus.CONFIRMED).count(), 1)
@@ -0,0 +1,86 @@
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from audit.models import AuditLog
+from clinic.models import Patient, Service, Room, Appointment, AppointmentStatus
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+class AppointmentExportTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.other = User.objects.create_user(email="doctor2@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="Иван", last_name="Петров")
+        self.service = Service.objects.create(
+            code="CONSULT", name_en="Consultation", name_ru="Консультация", duration_minutes=30, price=100,
+        )
+        room = Room.objects.create(name="101")
+        self.first = self.book(self.doctor, 9, reason="=HYPERLINK(\"x\")", room=room)
+        self.second = self.book(self.doctor, 10, status=AppointmentStatus.COMPLETED, reason="a < b & c")
+        self.book(self.other, 9)
+        auth(self.client, self.admin)
+
+    def book(self, doctor, hh, status=AppointmentStatus.SCHEDULED, **extra):
+        return Appointment.objects.create(
+            patient=self.patient, doctor=doctor, service=self.service,
+            start_at=at(MONDAY, hh), end_at=at(MONDAY, hh, 30), status=status, **extra,
+        )
+
+    def export(self, **params):
+        return self.client.get("/api/admin/appointments/export/", params)
+
+    def test_csv_uses_list_filters(self):
+        r = self.export(doctor=self.doctor.id, ordering="start_at")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.streaming)
+        self.assertEqual(r["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment;", r["Content-Disposition"])
+
+        content = b"".join(r.streaming_content).decode()
+        self.assertTrue(content.startswith("\ufeff"))
+        rows = list(csv.reader(io.StringIO(content[1:])))
+        self.assertEqual(rows[0][:4], ["id", "start_at", "end_at", "status"])
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.first.id), str(self.second.id)])
+        self.assertEqual(rows[1][1:3], ["2030-01-07 09:00", "2030-01-07 09:30"])
+        self.assertEqual(rows[1][7], "Петров Иван")
+        self.assertEqual(rows[1][10:12], ["100.00", "101"])
+        self.assertEqual(rows[1][12], "'=HYPERLINK(\"x\")")  # не формула
+
+        log = AuditLog.objects.latest("id")
+        self.assertEqual(log.meta["type"], "appointment_export")
+        self.assertEqual(log.meta["params"]["doctor"], str(self.doctor.id))
+
+    def test_xlsx_is_a_valid_workbook(self):
+        r = self.client.get(
+            "/api/admin/appointments/export/", {"type": "xlsx", "status": "COMPLETED"}, HTTP_ACCEPT_LANGUAGE="ru",
+        )
+        self.assertEqual(r.status_code, 200)
+        book = zipfile.ZipFile(io.BytesIO(b"".join(r.streaming_content)))
+        self.assertIsNone(book.testzip())
+
+        sheet = ElementTree.fromstring(book.read("xl/worksheets/sheet1.xml"))
+        rows = [
+            [
+                "".join(c.itertext()) if c.get("t") == "inlineStr" else (c.findtext("x:v", namespaces=NS) or "")
+                for c in row.findall("x:c", NS)
+            ]
+            for row in sheet.iterfind(".//x:row", NS)
+        ]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], str(self.second.id))
+        self.assertEqual(rows[1][9], "Консультация")
+        self.assertEqual(rows[1][12], "a < b & c")
+
+    def test_bad_type(self):
+        self.assertEqual(self.export(type="pdf").status_code, 400)
@@ -0,0 +1,71 @@
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from audit.models import AuditLog
+from clinic.models import Patient, Service, Appointment, VisitNote
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class VisitNoteSearchTests(APITestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.other = User.objects.create_user(email="doctor2@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+
+        self.hyper = self.note(self.doctor, 9, "Hypertension stage 2, BP > 180 & ECG changes, hypertensive crisis last week.")
+        self.mention = self.note(self.doctor, 10, "Headache, no signs of hypertension.")
+        self.russian = self.note(self.doctor, 11, "Жалобы на головные боли, гипертония с 2020 года.")
+        self.note(self.doctor, 12, "Routine checkup, healthy.")
+        self.note(self.other, 9, "Hypertension, other doctor's patient.")
+
+    def note(self, doctor, hh, text):
+        appt = Appointment.objects.create(
+            patient=self.patient, doctor=doctor, service=self.service,
+            start_at=at(MONDAY, hh), end_at=at(MONDAY, hh, 30),
+        )
+        return VisitNote.objects.create(appointment=appt, note_text=text)
+
+    def search(self, q):
+        return self.client.get("/api/doctor/visit-notes/search/", {"q": q})
+
+    def test_ranked_own_notes_with_snippets(self):
+        auth(self.client, self.doctor)
+        with self.assertNumQueries(4):  # auth user + count + page + audit
+            r = self.search("hypertension")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["count"], 2)
+
+        ids = [x["id"] for x in r.data["results"]]
+        self.assertEqual(ids, [self.hyper.id, self.mention.id])  # stemmed: hypertension + hypertensive
+
+        hit = r.data["results"][0]
+        self.assertEqual(hit["patient_name"], "Doe John")
+        self.assertIn("<mark>Hypertension</mark>", hit["snippet"])
+        self.assertIn("BP &gt; 180 &amp; ECG", hit["snippet"])  # note text is escaped
+
+        log = AuditLog.objects.latest("id")
+        self.assertEqual(log.meta, {"type": "visit_note_search", "ids": ids})
+
+    def test_russian_stemming_and_web_syntax(self):
+        auth(self.client, self.doctor)
+        r = self.search("гипертонии")
+        self.assertEqual([x["id"] for x in r.data["results"]], [self.russian.id])
+        self.assertIn("<mark>гипертония</mark>", r.data["results"][0]["snippet"])
+
+        r = self.search("hypertension -headache")
+        self.assertEqual([x["id"] for x in r.data["results"]], [self.hyper.id])
+
+    def test_note_update_reindexes(self):
+        self.mention.note_text = "Headache only."
+        self.mention.save()
+
+        auth(self.client, self.doctor)
+        r = self.search("hypertension")
+        self.assertEqual([x["id"] for x in r.data["results"]], [self.hyper.id])
+
+    def test_q_required(self):
+        auth(self.client, self.doctor)
+        self.assertEqual(self.search(" ").status_code, 400)
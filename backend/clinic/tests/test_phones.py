@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service
+from clinic.phones import normalize_phone, phone_prefixes
+from core import refdata
+
+from .test_api import auth
+
+
+class NormalizePhoneTests(SimpleTestCase):
+    def test_formats(self):
+        self.assertEqual(normalize_phone("+7 (701) 111-22-33"), "77011112233")
+        self.assertEqual(normalize_phone("8 701 111 22 33"), "77011112233")
+        self.assertEqual(normalize_phone("701 111 22 33"), "77011112233")
+        self.assertEqual(normalize_phone("+49 30 1234567"), "49301234567")
+        self.assertEqual(normalize_phone(""), "")
+
+    def test_partial_prefixes(self):
+        self.assertEqual(phone_prefixes("8 701"), ["8701", "7701"])
+        self.assertEqual(phone_prefixes("701 111"), ["701111", "7701111"])
+        self.assertEqual(phone_prefixes("+7 702"), ["7702"])
+        self.assertEqual(phone_prefixes("8 701 111 22 33"), ["77011112233"])
+
+
+class CallerIdTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.ivanov = Patient.objects.create(first_name="Ivan", last_name="Ivanov", phone="+7 701 111 22 33")
+        self.ivanova = Patient.objects.create(first_name="Anna", last_name="Ivanova", phone="87011112233")
+        self.petrov = Patient.objects.create(first_name="Petr", last_name="Petrov", phone="+7 702 555 00 00")
+
+    def test_maintained_on_save(self):
+        self.assertEqual(self.ivanov.phone_digits, "77011112233")
+        self.petrov.phone = "8 (705) 000-11-22"
+        self.petrov.save(update_fields=["phone"])
+        self.petrov.refresh_from_db()
+        self.assertEqual(self.petrov.phone_digits, "77050001122")
+
+    def test_caller_id_lookup(self):
+        auth(self.client, self.admin)
+        with self.assertNumQueries(2):  # auth user + lookup
+            r = self.client.get("/api/admin/patients/caller_id/", {"phone": "8-701-111-22-33"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["phone"], "77011112233")
+        self.assertEqual([p["id"] for p in r.data["patients"]], [self.ivanov.id, self.ivanova.id])
+
+        r = self.client.get("/api/admin/patients/caller_id/", {"phone": "12"})
+        self.assertEqual(r.status_code, 400)
+
+    def test_search_by_prefix_and_suffix(self):
+        auth(self.client, self.admin)
+        r = self.client.get("/api/search/", {"q": "+7 702"})
+        self.assertEqual([p["id"] for p in r.data["patients"]], [self.petrov.id])
+        r = self.client.get("/api/search/", {"q": "22-33"})
+        self.assertEqual([p["id"] for p in r.data["patients"]], [self.ivanov.id, self.ivanova.id])
+
+    def test_search_by_partial_local_number(self):
+        auth(self.client, self.admin)
+        for q in ("8 701", "8701111", "701 111", "(702) 555"):
+            r = self.client.get("/api/search/", {"q": q})
+            expected = [self.petrov.id] if "702" in q else [self.ivanov.id, self.ivanova.id]
+            self.assertEqual([p["id"] for p in r.data["patients"]], expected, q)
+
+    def test_backfill_command(self):
+        Patient.objects.filter(pk=self.ivanov.pk).update(phone_digits="")
+        out = StringIO()
+        call_command("backfill_search_keys", "--model", "patient", "--chunk", "2", stdout=out)
+        self.assertIn("updated 1", out.getvalue())
+        self.ivanov.refresh_from_db()
+        self.assertEqual(self.ivanov.phone_digits, "77011112233")
+
+    def test_backfill_invalidates_cached_services(self):
+        service = Service.objects.create(code="CONSULT", name_en="Consultation")
+        Service.objects.filter(pk=service.pk).update(search_key="")
+        self.assertEqual(refdata.get("services")["keys"], [""])
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("backfill_search_keys", "--model", "service", stdout=StringIO())
+        self.assertEqual(refdata.get("services")["keys"], [Service.objects.get().search_key])
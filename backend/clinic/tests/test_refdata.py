@@ -0,0 +1,98 @@
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic.models import Service, Room
+from core import refdata
+from core.views import _service_rows
+
+from .test_api import auth
+
+
+class RefdataCacheTests(APITestCase):
+    def setUp(self):
+        refdata.clear()
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.consult = Service.objects.create(code="CONSULT", name_en="Consultation", name_ru="Консультация")
+        self.ecg = Service.objects.create(code="ECG", name_en="ECG", is_active=False)
+        Room.objects.create(name="101")
+        auth(self.client, self.admin)
+
+    def test_list_served_from_cache_until_write(self):
+        with self.assertNumQueries(2):  # auth user + services
+            r = self.client.get("/api/admin/services/")
+        self.assertEqual([s["code"] for s in r.data["results"]], ["CONSULT", "ECG"])
+        with self.assertNumQueries(1):
+            r = self.client.get("/api/admin/services/", {"page": 1})
+        self.assertEqual(r.data["count"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post("/api/admin/services/", {"code": "XRAY", "name_en": "X-ray"})
+        self.assertEqual(r.status_code, 201)
+        r = self.client.get("/api/admin/services/")
+        self.assertEqual([s["code"] for s in r.data["results"]], ["CONSULT", "ECG", "XRAY"])
+
+    def test_localized_names_per_language(self):
+        r = self.client.get("/api/admin/services/", HTTP_ACCEPT_LANGUAGE="ru")
+        self.assertEqual(r.data["results"][0]["name"], "Консультация")
+        r = self.client.get("/api/admin/services/", HTTP_ACCEPT_LANGUAGE="kk")
+        self.assertEqual(r.data["results"][0]["name"], "Consultation")  # name_kk пустое -> en
+
+    def test_cached_list_matches_serializer(self):
+        cached = self.client.get("/api/admin/services/", HTTP_ACCEPT_LANGUAGE="ru").data["results"]
+        filtered = self.client.get("/api/admin/services/", {"ordering": "code"}, HTTP_ACCEPT_LANGUAGE="ru").data["results"]
+        self.assertEqual(cached, filtered)
+        one = self.client.get(f"/api/admin/services/{self.consult.id}/", HTTP_ACCEPT_LANGUAGE="ru").data
+        self.assertEqual(cached[0], one)
+        self.assertEqual(one["name"], "Консультация")
+
+    def test_filtered_list_reads_db(self):
+        self.client.get("/api/admin/services/")
+        with self.assertNumQueries(3):  # auth user + count + page
+            r = self.client.get("/api/admin/services/", {"search": "ecg"})
+        self.assertEqual([s["code"] for s in r.data["results"]], ["ECG"])
+
+    def test_doctors_and_rooms_invalidated_on_write(self):
+        r = self.client.get("/api/admin/doctors/")
+        self.assertEqual(r.data["results"][0]["doctor_profile"]["specialization"], "")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f"/api/admin/doctors/{self.doctor.id}/", {"doctor_profile": {"specialization": "Cardiologist"}}, format="json",
+            )
+        r = self.client.get("/api/admin/doctors/")
+        self.assertEqual(r.data["results"][0]["doctor_profile"]["specialization"], "Cardiologist")
+
+        # врач стал администратором -> пропадает из списка
+        user = User.objects.get(pk=self.doctor.pk)
+        user.role = UserRole.ADMIN
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(self.client.get("/api/admin/doctors/").data["results"], [])
+
+        self.client.get("/api/admin/rooms/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/admin/rooms/", {"name": "102"})
+        r = self.client.get("/api/admin/rooms/")
+        self.assertEqual([x["name"] for x in r.data["results"]], ["101", "102"])
+
+    def test_lost_version_does_not_revive_old_payloads(self):
+        refdata.rows("rooms")
+        refdata._cache().set("other:key", 1)
+        refdata.clear()
+        self.assertEqual(refdata._cache().get("other:key"), 1)
+
+        old = refdata._version("rooms")
+        refdata._cache().set(f"rooms:{old}:", {"rows": []})
+        refdata._cache().delete("v:rooms")  # вытеснен или Redis перезапущен
+        self.assertNotEqual(refdata._version("rooms"), old)
+        self.assertEqual([r["name"] for r in refdata.rows("rooms")], ["101"])
+
+    def test_search_services_without_queries(self):
+        _service_rows("consult", "ru", 10)
+        with self.assertNumQueries(0):
+            found = _service_rows("консультац", "ru", 10)
+        self.assertEqual(found, [{
+            "id": self.consult.id, "code": "CONSULT", "name": "Консультация",
+            "duration_minutes": 30, "price": "0.00",
+        }])
+        self.assertEqual(_service_rows("ecg", "en", 10), [])  # неактивная
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic import report_cache
+from clinic.models import Patient, Service, Appointment, AppointmentStatus
+from clinic.report_cache import ResultCache
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+URL = "/api/admin/reports/appointments/"
+
+
+class ReportCacheTests(APITestCase):
+    def setUp(self):
+        report_cache.clear()
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        self.appt = self.book(MONDAY, 9)
+        auth(self.client, self.admin)
+
+    def book(self, day, hh):
+        return Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=at(day, hh), end_at=at(day, hh, 30),
+        )
+
+    def test_repeated_filters_served_from_memory(self):
+        params = {"date_from": "2030-01-01", "date_to": "2030-01-31", "doctor": str(self.doctor.id)}
+        r = self.client.get(URL, params)
+        self.assertEqual((r["X-Cache"], r.data["total"]), ("MISS", 1))
+
+        with self.assertNumQueries(1):  # auth user only
+            r = self.client.get(URL, dict(params, doctor=f"0{self.doctor.id}"))  # тот же набор фильтров
+        self.assertEqual((r["X-Cache"], r.data["total"]), ("HIT", 1))
+        self.assertEqual(r.data["filters"]["doctor"], f"0{self.doctor.id}")
+
+        stats = self.client.get("/api/admin/reports/cache/").data
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+
+    def test_write_invalidates_only_covered_months(self):
+        january = {"date_from": "2030-01-01", "date_to": "2030-01-31"}
+        march = {"date_from": "2030-03-01", "date_to": "2030-03-31"}
+        self.client.get(URL, january)
+        self.client.get(URL, march)
+        self.client.get(URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(MONDAY + timedelta(days=1), 9)
+
+        r = self.client.get(URL, january)
+        self.assertEqual((r["X-Cache"], r.data["total"]), ("MISS", 2))
+        self.assertEqual(self.client.get(URL, march)["X-Cache"], "HIT")
+        self.assertEqual(self.client.get(URL)["X-Cache"], "MISS")  # открытый диапазон зависит от всех записей
+
+        # массовая смена статуса идёт мимо сигналов, но через ту же сводку
+        self.client.post("/api/admin/appointments/bulk_status/", {"ids": [self.appt.id], "status": "CONFIRMED"}, format="json")
+        r = self.client.get(URL, january)
+        self.assertEqual(r["X-Cache"], "MISS")
+        self.assertEqual(
+            r.data["by_status"], [{"status": AppointmentStatus.CONFIRMED, "total": 1}, {"status": "SCHEDULED", "total": 1}],
+        )
+
+    def test_invalidate_all_keeps_other_keys(self):
+        self.client.get(URL)
+        report_cache._cache().set("other:key", 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            report_cache.invalidate_all()
+        self.assertEqual(self.client.get(URL)["X-Cache"], "MISS")
+        self.assertEqual(report_cache._cache().get("other:key"), 1)
+
+    def test_bad_filters(self):
+        self.assertEqual(self.client.get(URL, {"doctor": "x"}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {"date_from": "yesterday"}).status_code, 400)
+
+    def test_lru_bound(self):
+        cache = ResultCache(max_size=2)
+        cache.set("a", (1,), {"total": 1})
+        cache.set("b", (1,), {"total": 2})
+        self.assertEqual(cache.get("a", (1,)), {"total": 1})
+        cache.set("c", (1,), {"total": 3})  # вытесняет b: a читали позже
+        self.assertIsNone(cache.get("b", (1,)))
+        self.assertIsNone(cache.get("a", (2,)))  # поколение сменилось
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.stats()["size"], 1)
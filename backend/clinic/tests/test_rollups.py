@@ -0,0 +1,132 @@
+from datetime import time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic import report_cache, rollups
+from clinic.models import Patient, Service, Appointment, AppointmentStatus, AppointmentDailyStat, DoctorSchedule
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class AppointmentRollupTests(APITestCase):
+    def setUp(self):
+        report_cache.clear()
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.other = User.objects.create_user(email="doctor2@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.consult = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30, price=100)
+        self.ecg = Service.objects.create(code="ECG", name_en="ECG", duration_minutes=15, price=40)
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(9, 0), end_time=time(13, 0))
+
+    def book(self, doctor, day, hh, service=None, minutes=30, status=AppointmentStatus.SCHEDULED):
+        return Appointment.objects.create(
+            patient=self.patient, doctor=doctor, service=service or self.consult,
+            start_at=at(day, hh), end_at=at(day, hh) + timedelta(minutes=minutes), status=status,
+        )
+
+    def stats(self):
+        return {
+            (s.day, s.doctor_id, s.service_id, s.status): (s.count, s.minutes, s.revenue)
+            for s in AppointmentDailyStat.objects.exclude(count=0)
+        }
+
+    def assertConsistent(self):
+        self.assertEqual(rollups.mismatches(MONDAY - timedelta(days=7), MONDAY + timedelta(days=60)), [])
+
+    def test_create_update_delete_keep_rollup_current(self):
+        first = self.book(self.doctor, MONDAY, 9)
+        self.book(self.doctor, MONDAY, 10)
+        self.book(self.doctor, MONDAY, 11, service=self.ecg, minutes=15)
+        self.assertEqual(self.stats(), {
+            (MONDAY, self.doctor.id, self.consult.id, "SCHEDULED"): (2, 60, Decimal("200.00")),
+            (MONDAY, self.doctor.id, self.ecg.id, "SCHEDULED"): (1, 15, Decimal("40.00")),
+        })
+
+        first.status = AppointmentStatus.CONFIRMED
+        first.save()
+        # перенос на другой день и другую услугу
+        moved = Appointment.objects.get(pk=first.pk)
+        moved.start_at, moved.end_at = at(MONDAY + timedelta(days=7), 9), at(MONDAY + timedelta(days=7), 9, 15)
+        moved.service = self.ecg
+        moved.save()
+        self.assertEqual(self.stats(), {
+            (MONDAY, self.doctor.id, self.consult.id, "SCHEDULED"): (1, 30, Decimal("100.00")),
+            (MONDAY, self.doctor.id, self.ecg.id, "SCHEDULED"): (1, 15, Decimal("40.00")),
+            (MONDAY + timedelta(days=7), self.doctor.id, self.ecg.id, "CONFIRMED"): (1, 15, Decimal("40.00")),
+        })
+
+        moved.delete()
+        self.assertEqual(len(self.stats()), 2)
+        self.assertConsistent()
+
+    def test_bulk_paths_and_reprice(self):
+        appts = [self.book(self.doctor, MONDAY, 9 + i, status=AppointmentStatus.CONFIRMED) for i in range(3)]
+        auth(self.client, self.admin)
+        r = self.client.post(
+            "/api/admin/appointments/bulk_status/",
+            {"ids": [a.id for a in appts], "status": "COMPLETED"}, format="json",
+        )
+        self.assertEqual(r.status_code, 200)
+        r = self.client.post("/api/admin/appointments/series/", {
+            "patient": self.patient.id, "doctor": self.doctor.id, "service": self.consult.id,
+            "start_at": at(MONDAY + timedelta(days=7), 12).isoformat(), "frequency": "WEEKLY", "count": 3,
+        }, format="json")
+        self.assertEqual(r.status_code, 201)
+        self.assertConsistent()
+        self.assertEqual(
+            self.stats()[(MONDAY, self.doctor.id, self.consult.id, "COMPLETED")], (3, 90, Decimal("300.00")),
+        )
+
+        self.consult.price = 120
+        self.consult.save()
+        self.assertEqual(
+            self.stats()[(MONDAY, self.doctor.id, self.consult.id, "COMPLETED")], (3, 90, Decimal("360.00")),
+        )
+        self.assertConsistent()
+
+    def test_report_reads_rollup_for_whole_days(self):
+        self.book(self.doctor, MONDAY, 9)
+        self.book(self.doctor, MONDAY, 10, status=AppointmentStatus.CONFIRMED)
+        self.book(self.other, MONDAY, 9)
+        self.book(self.doctor, MONDAY + timedelta(days=1), 9)
+
+        auth(self.client, self.admin)
+        params = {"date_from": str(MONDAY), "date_to": str(MONDAY)}
+        with self.assertNumQueries(3):  # auth user + by_status + by_doctor, no appointment scan
+            r = self.client.get("/api/admin/reports/appointments/", params)
+        self.assertEqual(r.data["total"], 3)
+        self.assertEqual(r.data["by_status"], [{"status": "CONFIRMED", "total": 1}, {"status": "SCHEDULED", "total": 2}])
+        self.assertEqual(r.data["by_doctor"], [
+            {"doctor_id": self.doctor.id, "doctor__email": "doctor1@test.local", "total": 2},
+            {"doctor_id": self.other.id, "doctor__email": "doctor2@test.local", "total": 1},
+        ])
+
+        # datetime bound -> по самим приёмам, тот же ответ
+        raw = self.client.get("/api/admin/reports/appointments/", {
+            "date_from": at(MONDAY, 0).isoformat(), "date_to": str(MONDAY),
+        })
+        self.assertEqual(
+            (raw.data["total"], raw.data["by_status"], raw.data["by_doctor"]),
+            (r.data["total"], r.data["by_status"], r.data["by_doctor"]),
+        )
+
+        r = self.client.get("/api/admin/reports/appointments/", {"doctor": self.doctor.id, "status": "SCHEDULED"})
+        self.assertEqual(r.data["total"], 2)
+
+    def test_rebuild_and_verify_command(self):
+        self.book(self.doctor, MONDAY, 9)
+        self.book(self.doctor, MONDAY + timedelta(days=40), 9)
+        AppointmentDailyStat.objects.filter(day=MONDAY).update(count=5)
+
+        with self.assertRaises(CommandError):
+            call_command("appointment_rollups", "verify", stdout=StringIO())
+        call_command("appointment_rollups", "rebuild", "--chunk", "7", stdout=StringIO())
+        call_command("appointment_rollups", "verify", stdout=StringIO())
+        self.assertEqual(len(self.stats()), 2)
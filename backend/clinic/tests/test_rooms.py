@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service, Room, Appointment
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class RoomOccupancyTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor1 = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.doctor2 = User.objects.create_user(email="doctor2@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        self.room = Room.objects.create(name="101", floor=1)
+        self.other_room = Room.objects.create(name="102", floor=1)
+
+        self.appt = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor1, service=self.service, room=self.room,
+            start_at=at(MONDAY, 9), end_at=at(MONDAY, 9, 30),
+        )
+
+    def payload(self, start, room):
+        return {
+            "patient": self.patient.id,
+            "doctor": self.doctor2.id,
+            "service": self.service.id,
+            "room": room.id,
+            "start_at": start.isoformat(),
+            "end_at": (start + timedelta(minutes=30)).isoformat(),
+            "status": "SCHEDULED",
+        }
+
+    def test_room_double_booking_rejected(self):
+        auth(self.client, self.admin)
+        r = self.client.post("/api/admin/appointments/", self.payload(at(MONDAY, 9, 15), self.room), format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("room", r.data)
+
+        r = self.client.post("/api/admin/appointments/", self.payload(at(MONDAY, 9, 15), self.other_room), format="json")
+        self.assertEqual(r.status_code, 201)
+
+    def test_occupancy_for_day(self):
+        auth(self.client, self.admin)
+        with self.assertNumQueries(2):  # auth user + rooms with bookings
+            r = self.client.get("/api/admin/rooms/occupancy/", {"date": "2030-01-07"})
+        self.assertEqual(r.status_code, 200)
+
+        rooms = {room["name"]: room for room in r.data["rooms"]}
+        self.assertEqual([b["appointment_id"] for b in rooms["101"]["bookings"]], [self.appt.id])
+        self.assertEqual(rooms["101"]["bookings"][0]["doctor_email"], "doctor1@test.local")
+        self.assertEqual(rooms["102"]["bookings"], [])
+
+    def test_occupancy_ignores_other_days(self):
+        auth(self.client, self.admin)
+        before = self.client.get("/api/admin/rooms/occupancy/", {"date": "2030-01-07"}).data
+        for days in range(1, 40):
+            Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor2, service=self.service, room=self.room,
+                start_at=at(MONDAY + timedelta(days=days), 9), end_at=at(MONDAY + timedelta(days=days), 9, 30),
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            after = self.client.get("/api/admin/rooms/occupancy/", {"date": "2030-01-07"}).data
+        self.assertEqual(after, before)
+
+        sql = queries[-1]["sql"]
+        self.assertNotIn("LEFT OUTER JOIN", sql)  # записи не соединяются со всеми комнатами
+        with connection.cursor() as cursor:
+            # на маленькой таблице планировщик выбрал бы seq scan: проверяем, что индекс вообще применим
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn("appointment_room_no_overlap", plan)
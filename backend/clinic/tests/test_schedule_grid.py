@@ -0,0 +1,57 @@
+from datetime import time
+
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service, DoctorSchedule, DoctorTimeOff, Appointment
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class AdminScheduleGridTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+
+        self.doctors = []
+        for i in range(5):
+            doctor = User.objects.create_user(email=f"doctor{i}@test.local", role=UserRole.DOCTOR)
+            DoctorSchedule.objects.create(doctor=doctor, weekday=0, start_time=time(9, 0), end_time=time(10, 0), slot_minutes=30)
+            self.doctors.append(doctor)
+
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctors[0], service=self.service,
+            start_at=at(MONDAY, 9), end_at=at(MONDAY, 9, 30),
+        )
+        DoctorTimeOff.objects.create(doctor=self.doctors[1], start_at=at(MONDAY, 9, 30), end_at=at(MONDAY, 10))
+
+    def test_grid_columns(self):
+        auth(self.client, self.admin)
+        r = self.client.get("/api/admin/schedule/grid/", {"date": "2030-01-07"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["doctors"]["id"], [d.id for d in self.doctors])
+        self.assertEqual(len(r.data["schedule"]["doctor_id"]), 5)
+        self.assertEqual(r.data["bookings"]["patient_name"], ["Doe John"])
+        self.assertEqual(r.data["time_off"]["doctor_id"], [self.doctors[1].id])
+
+        free = list(zip(r.data["free"]["doctor_id"], r.data["free"]["start_at"]))
+        self.assertNotIn((self.doctors[0].id, at(MONDAY, 9)), free)
+        self.assertNotIn((self.doctors[1].id, at(MONDAY, 9, 30)), free)
+        self.assertEqual(len(free), 8)
+
+    def test_query_count_does_not_grow_with_doctors(self):
+        auth(self.client, self.admin)
+        self.client.get("/api/admin/schedule/grid/", {"date": "2030-01-07"})  # materialize bitmaps
+        # auth, doctors, schedules, bitmaps, bookings, time off
+        with self.assertNumQueries(6):
+            r = self.client.get("/api/admin/schedule/grid/", {"date": "2030-01-07", "doctor": f"{self.doctors[0].id},{self.doctors[1].id}"})
+        self.assertEqual(r.data["doctors"]["id"], [self.doctors[0].id, self.doctors[1].id])
+        with self.assertNumQueries(6):
+            self.client.get("/api/admin/schedule/grid/", {"date": "2030-01-07"})
+
+    def test_date_required(self):
+        auth(self.client, self.admin)
+        r = self.client.get("/api/admin/schedule/grid/")
+        self.assertEqual(r.status_code, 400)
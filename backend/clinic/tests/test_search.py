@@ -0,0 +1,165 @@
+import threading
+import time
+from unittest import mock
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service, Appointment
+
+from clinic.translit import search_key
+from core import views as search_views
+from core.views import close_search_connections
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class PatientSearchTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+
+        self.ivanov = Patient.objects.create(first_name="Ivan", last_name="Ivanov", phone="+7 701 111 22 33")
+        self.ivanova = Patient.objects.create(first_name="Anna", last_name="Ivanovskaya", email="anna@mail.local")
+        self.petrov = Patient.objects.create(first_name="Petr", last_name="Petrov")
+
+        # два приёма у одного пациента — в выдаче доктора он должен быть один раз
+        for hh in (9, 10):
+            Appointment.objects.create(
+                patient=self.ivanov, doctor=self.doctor, service=self.service,
+                start_at=at(MONDAY, hh), end_at=at(MONDAY, hh, 30),
+            )
+
+    def search(self, user, q):
+        auth(self.client, user)
+        r = self.client.get("/api/search/", {"q": q})
+        self.assertEqual(r.status_code, 200)
+        return [p["id"] for p in r.data["patients"]]
+
+    def test_substring_ranked_by_similarity(self):
+        self.assertEqual(self.search(self.admin, "ivanov"), [self.ivanov.id, self.ivanova.id])
+        self.assertEqual(self.search(self.admin, "701 111"), [self.ivanov.id])
+        self.assertEqual(self.search(self.admin, "ANNA@mail"), [self.ivanova.id])
+
+    def test_exact_match_among_many_substring_matches(self):
+        Patient.objects.bulk_create([
+            Patient(first_name="Ivan", last_name=f"Ivanovskiy{i}", search_key=search_key(f"Ivanovskiy{i}", "Ivan"))
+            for i in range(600)
+        ])
+        # создан последним: при обрезке совпадений до ранжирования (500 первых попавшихся) терялся
+        exact = Patient.objects.create(first_name="Olga", last_name="Ivanovs")
+        self.assertEqual(self.search(self.admin, "ivanovs")[0], exact.id)
+
+    def test_typo_falls_back_to_fuzzy(self):
+        self.assertEqual(self.search(self.admin, "Petrovv"), [self.petrov.id])
+
+    def test_doctor_sees_only_own_patients(self):
+        self.assertEqual(self.search(self.doctor, "ivanov"), [self.ivanov.id])
+
+
+class TranslitSearchTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.ivanov = Patient.objects.create(first_name="Иван", last_name="Иванов")
+        self.akhmetova = Patient.objects.create(first_name="Aigerim", last_name="Akhmetova")
+        self.nursultan = Patient.objects.create(first_name="Нұрсұлтан", last_name="Әбенов")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", name_ru="Консультация", name_kk="Кеңес")
+
+    def test_keys_maintained_on_save(self):
+        self.assertEqual(self.ivanov.search_key, "ivanov ivan")
+        self.assertEqual(self.service.search_key, "consult consultation konsultatsia kenes")
+        self.service.name_kk = "Кеңес беру"
+        self.service.save(update_fields=["name_kk"])
+        self.service.refresh_from_db()
+        self.assertTrue(self.service.search_key.endswith("kenes beru"))
+
+    def test_search_across_scripts(self):
+        auth(self.client, self.admin)
+        for q, expected in [("Ivanov", self.ivanov), ("Ахметова", self.akhmetova), ("Nursultan", self.nursultan)]:
+            r = self.client.get("/api/search/", {"q": q})
+            self.assertEqual([p["id"] for p in r.data["patients"]], [expected.id], q)
+
+        r = self.client.get("/api/search/", {"q": "кеңес"})
+        self.assertEqual([s["id"] for s in r.data["services"]], [self.service.id])
+
+    def test_admin_patient_search_filter(self):
+        auth(self.client, self.admin)
+        r = self.client.get("/api/admin/patients/", {"search": "ivanov ivan"})
+        self.assertEqual([p["id"] for p in r.data["results"]], [self.ivanov.id])
+        r = self.client.get("/api/admin/patients/", {"search": "aigerim"})
+        self.assertEqual([p["id"] for p in r.data["results"]], [self.akhmetova.id])
+
+
+def slow_section(user, q, limit):
+    with connection.cursor() as cur:
+        cur.execute("SELECT pg_sleep(5)")
+    return []
+
+
+class ConcurrentSearchTests(APITransactionTestCase):
+    """Outside a transaction the sections run in the pool, each on its own connection."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        self.patient = Patient.objects.create(first_name="Ivan", last_name="Ivanov")
+        self.appt = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=at(MONDAY, 9), end_at=at(MONDAY, 9, 30),
+        )
+        auth(self.client, self.admin)
+        # соединения потоков живут между поисками; тестовую базу с ними не удалить
+        self.addCleanup(close_search_connections)
+
+    def test_sections_in_pool(self):
+        r = self.client.get("/api/search/", {"q": "ivanov"})
+        self.assertEqual([p["id"] for p in r.data["patients"]], [self.patient.id])
+        self.assertEqual([a["id"] for a in r.data["appointments"]], [self.appt.id])
+        self.assertEqual(r.data["incomplete"], [])
+
+    def test_pool_threads_keep_connections(self):
+        created = []
+        connection_created.connect(
+            lambda **kwargs: created.append(threading.current_thread().name), weak=False, dispatch_uid="search-test",
+        )
+        self.addCleanup(connection_created.disconnect, dispatch_uid="search-test")
+        for _ in range(10):
+            r = self.client.get("/api/search/", {"q": "ivanov"})
+            self.assertEqual([p["id"] for p in r.data["patients"]], [self.patient.id])
+        # каждый поток подключается не больше одного раза, запрос — ни разу
+        self.assertTrue(created)
+        self.assertEqual(len(created), len(set(created)))
+        self.assertTrue(all(name.startswith("search") for name in created))
+
+    def test_busy_pool_runs_sections_inline(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        # все потоки пула заняты другими поисками
+        busy = [search_views._submit(lambda: release.wait(5) and [], 10) for _ in range(search_views.SEARCH_WORKERS)]
+        self.assertIsNone(search_views._submit(list, 1))
+
+        r = self.client.get("/api/search/", {"q": "ivanov"})
+        self.assertEqual(r.data["incomplete"], [])
+        self.assertEqual([p["id"] for p in r.data["patients"]], [self.patient.id])
+        self.assertEqual([a["id"] for a in r.data["appointments"]], [self.appt.id])
+
+        release.set()
+        for future in busy:
+            future.result(5)
+
+    def test_slow_section_returns_partial_results(self):
+        with mock.patch("core.views._appointment_rows", slow_section), \
+                mock.patch("core.views.SEARCH_SECTION_TIMEOUT", 0.3):
+            started = time.monotonic()
+            r = self.client.get("/api/search/", {"q": "ivanov"})
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 2)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([p["id"] for p in r.data["patients"]], [self.patient.id])
+        self.assertEqual(r.data["appointments"], [])
+        self.assertEqual(r.data["incomplete"], ["appointments"])
@@ -0,0 +1,80 @@
+from datetime import time, timedelta
+
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from audit.models import AuditLog
+from clinic.models import Patient, Service, Room, DoctorSchedule, DoctorTimeOff, Appointment
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class AppointmentSeriesTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        self.room = Room.objects.create(name="101", floor=1)
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(9, 0), end_time=time(13, 0))
+
+        # week 2 is taken, week 3 is time off
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, service=self.service,
+            start_at=at(MONDAY + timedelta(days=7), 10), end_at=at(MONDAY + timedelta(days=7), 10, 30),
+        )
+        DoctorTimeOff.objects.create(
+            doctor=self.doctor,
+            start_at=at(MONDAY + timedelta(days=14), 0), end_at=at(MONDAY + timedelta(days=15), 0),
+        )
+
+    def payload(self, **extra):
+        data = {
+            "patient": self.patient.id,
+            "doctor": self.doctor.id,
+            "service": self.service.id,
+            "room": self.room.id,
+            "start_at": at(MONDAY, 10).isoformat(),
+            "frequency": "WEEKLY",
+        }
+        data.update(extra)
+        return data
+
+    def test_weekly_series_returns_conflicts(self):
+        auth(self.client, self.admin)
+        r = self.client.post("/api/admin/appointments/series/", self.payload(count=4), format="json")
+        self.assertEqual(r.status_code, 201)
+
+        self.assertEqual(len(r.data["created"]), 2)
+        self.assertEqual([c["reason"] for c in r.data["conflicts"]], ["doctor_busy", "time_off"])
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 3)
+        self.assertEqual(AuditLog.objects.filter(meta__type="appointment_series").count(), 2)
+
+    def test_biweekly_until(self):
+        auth(self.client, self.admin)
+        r = self.client.post(
+            "/api/admin/appointments/series/",
+            self.payload(frequency="BIWEEKLY", until="2030-02-04"),
+            format="json",
+        )
+        self.assertEqual(r.status_code, 201)
+        # 01-07, 01-21 (time off), 02-04
+        self.assertEqual(len(r.data["created"]), 2)
+        self.assertEqual(r.data["conflicts"][0]["reason"], "time_off")
+
+    def test_until_beyond_the_cap_is_rejected(self):
+        auth(self.client, self.admin)
+        # 104 недели с 2030-01-07: последнее занятие 2031-12-29
+        r = self.client.post("/api/admin/appointments/series/", self.payload(until="2031-12-29"), format="json")
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(len(r.data["created"]) + len(r.data["conflicts"]), 104)
+
+        r = self.client.post("/api/admin/appointments/series/", self.payload(until="2032-01-05"), format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("until", r.data)
+
+    def test_count_and_until_are_exclusive(self):
+        auth(self.client, self.admin)
+        r = self.client.post("/api/admin/appointments/series/", self.payload(count=2, until="2030-02-04"), format="json")
+        self.assertEqual(r.status_code, 400)
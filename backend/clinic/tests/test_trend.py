@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic import report_cache
+from clinic.models import Patient, Service, Appointment, AppointmentStatus
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+URL = "/api/admin/reports/appointments/trend/"
+
+
+class AppointmentTrendTests(APITestCase):
+    def setUp(self):
+        report_cache.clear()
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.other = User.objects.create_user(email="doctor2@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+
+        self.book(self.doctor, MONDAY, 9)
+        self.book(self.doctor, MONDAY, 10)
+        self.book(self.doctor, MONDAY + timedelta(days=2), 9, AppointmentStatus.COMPLETED)
+        self.book(self.doctor, MONDAY + timedelta(days=14), 9)
+        self.book(self.other, MONDAY + timedelta(days=30), 9)  # 6 февраля
+        auth(self.client, self.admin)
+
+    def book(self, doctor, day, hh, status=AppointmentStatus.SCHEDULED):
+        Appointment.objects.create(
+            patient=self.patient, doctor=doctor, service=self.service,
+            start_at=at(day, hh), end_at=at(day, hh, 30), status=status,
+        )
+
+    def test_weekly_zero_filled_in_one_query(self):
+        with self.assertNumQueries(2):  # auth user + trend
+            r = self.client.get(URL, {"bucket": "week", "date_from": "2030-01-09", "date_to": "2030-01-27"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([str(d) for d in r.data["buckets"]], ["2030-01-07", "2030-01-14", "2030-01-21"])
+        self.assertEqual(r.data["totals"], [1, 0, 1])  # 7 января вне диапазона
+        self.assertEqual(
+            [(s["doctor_id"], s["status"], s["counts"]) for s in r.data["series"]],
+            [(self.doctor.id, "COMPLETED", [1, 0, 0]), (self.doctor.id, "SCHEDULED", [0, 0, 1])],
+        )
+
+    def test_daily_and_monthly_buckets(self):
+        r = self.client.get(URL, {"date_from": "2030-01-07", "date_to": "2030-01-09"})
+        self.assertEqual(r.data["bucket"], "day")
+        self.assertEqual(r.data["totals"], [2, 0, 1])
+
+        r = self.client.get(URL, {"bucket": "month", "date_from": "2030-01-01", "date_to": "2030-03-31", "status": "SCHEDULED"})
+        self.assertEqual([str(d) for d in r.data["buckets"]], ["2030-01-01", "2030-02-01", "2030-03-01"])
+        self.assertEqual(r.data["totals"], [3, 1, 0])
+
+        r = self.client.get(URL, {"bucket": "month", "date_from": "2030-01-01", "date_to": "2030-03-31", "doctor": self.other.id})
+        self.assertEqual(r.data["series"], [{
+            "doctor_id": self.other.id, "doctor_email": "doctor2@test.local", "status": "SCHEDULED", "counts": [0, 1, 0],
+        }])
+
+    def test_validation(self):
+        self.assertEqual(self.client.get(URL, {"date_from": "2030-01-01", "bucket": "year"}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {"date_from": "2030-01-01", "status": "LOST"}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {"bucket": "day"}).status_code, 400)
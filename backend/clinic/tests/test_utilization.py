@@ -0,0 +1,53 @@
+from datetime import time, timedelta
+from decimal import Decimal
+
+from rest_framework.test import APITestCase
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service, Appointment, DoctorSchedule, DoctorTimeOff
+
+from .helpers import MONDAY, at
+from .test_api import auth
+
+
+class UtilizationReportTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        self.other = User.objects.create_user(email="doctor2@test.local", role=UserRole.DOCTOR)
+        self.patient = Patient.objects.create(first_name="John", last_name="Doe")
+        self.service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30, price=100)
+        # окна 9-13 и 12-14 пересекаются: 300 минут в понедельник, не 360
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(9, 0), end_time=time(13, 0))
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(12, 0), end_time=time(14, 0))
+        DoctorTimeOff.objects.create(
+            doctor=self.doctor, start_at=at(MONDAY + timedelta(days=7), 10), end_at=at(MONDAY + timedelta(days=7), 11),
+        )
+        for hh, status in ((9, "COMPLETED"), (10, "SCHEDULED"), (11, "CANCELLED"), (12, "NO_SHOW")):
+            Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor, service=self.service,
+                start_at=at(MONDAY, hh), end_at=at(MONDAY, hh, 30), status=status,
+            )
+        auth(self.client, self.admin)
+
+    def test_weekly_capacity_bookings_and_revenue(self):
+        with self.assertNumQueries(2):  # auth user + report
+            r = self.client.get("/api/admin/reports/utilization/", {"date_from": "2030-01-07", "date_to": "2030-01-20"})
+        self.assertEqual(r.status_code, 200)
+        rows = [
+            (x["doctor_id"], str(x["week"]), x["capacity_minutes"], x["booked_minutes"], x["completed_minutes"],
+             x["revenue"], x["booked_revenue"], x["utilization"])
+            for x in r.data["results"]
+        ]
+        self.assertEqual(rows, [
+            (self.doctor.id, "2030-01-07", 300, 90, 30, Decimal("100.00"), Decimal("300.00"), Decimal("0.3000")),
+            (self.doctor.id, "2030-01-14", 240, 0, 0, 0, 0, Decimal("0.0000")),
+        ])
+        self.assertEqual(r.data["totals"]["capacity_minutes"], 540)
+        self.assertEqual(r.data["totals"]["utilization"], round(90 / 540, 4))
+
+    def test_doctor_filter_and_range_limit(self):
+        r = self.client.get("/api/admin/reports/utilization/", {"date_from": "2030-01-07", "doctor": self.other.id})
+        self.assertEqual(r.data["results"], [])
+        r = self.client.get("/api/admin/reports/utilization/", {"date_from": "2030-01-01", "date_to": "2031-01-02"})
+        self.assertEqual(r.status_code, 400)
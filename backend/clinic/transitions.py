@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.utils import timezone
+
+from audit.models import AuditAction
+from audit.utils import log_actions_bulk
+from . import rollups
+from .bitmaps import invalidate_intervals
+from .models import Appointment, ACTIVE_APPOINTMENT_STATUSES
+
+
+BULK_STATUS_MAX_IDS = 500
+
+REJECT_MESSAGES = {
+    "not_found": "Appointment not found.",
+    "invalid_transition": "Invalid status transition.",
+}
+
+
+def allowed_sources(new_status: str) -> list[str]:
+    """Statuses that may move to new_status (without the no-op new_status -> new_status)."""
+    return [
+        old for old, targets in Appointment.STATUS_TRANSITIONS.items()
+        if new_status in targets and old != new_status
+    ]
+
+
+def bulk_transition(ids, new_status: str, *, request=None, queryset=None, audit_type: str = "appointment_bulk_status") -> dict:
+    """
+    Move many appointments to new_status in one pass:
+    one locking SELECT, one UPDATE, one bulk audit INSERT, one upsert of the daily rollup.
+    queryset limits the visible appointments (e.g. the doctor's own); ids outside it are "not_found".
+
+    Returns {"updated": [ids], "unchanged": [ids], "rejected": [{"id", "reason", "detail"}]}.
+    """
+    if queryset is None:
+        queryset = Appointment.objects.all()
+    ids = list(dict.fromkeys(ids))
+    sources = set(allowed_sources(new_status))
+
+    with transaction.atomic():
+        rows = {
+            row[0]: row
+            for row in queryset.filter(pk__in=ids)
+            .select_for_update()
+            .values_list("id", "status", "doctor_id", "start_at", "end_at", "service_id")
+        }
+
+        updated, unchanged, rejected = [], [], []
+        for pk in ids:
+            row = rows.get(pk)
+            if row is None:
+                reason = "not_found"
+            elif row[1] == new_status:
+                unchanged.append(pk)
+                continue
+            elif row[1] not in sources:
+                reason = "invalid_transition"
+            else:
+                updated.append(pk)
+                continue
+            rejected.append({"id": pk, "reason": reason, "detail": REJECT_MESSAGES[reason]})
+
+        if updated:
+            # update() не шлёт сигналы и не трогает auto_now — всё делаем сами
+            Appointment.objects.filter(pk__in=updated).update(status=new_status, updated_at=timezone.now())
+            log_actions_bulk(
+                request=request,
+                action=AuditAction.UPDATE,
+                objs=[Appointment(pk=pk) for pk in updated],
+                meta=lambda obj: {"type": audit_type, "from": rows[obj.pk][1], "to": new_status},
+            )
+            rollups.apply(
+                added=[(rows[pk][2], rows[pk][5], new_status, rows[pk][3], rows[pk][4]) for pk in updated],
+                removed=[(rows[pk][2], rows[pk][5], rows[pk][1], rows[pk][3], rows[pk][4]) for pk in updated],
+            )
+            if new_status not in ACTIVE_APPOINTMENT_STATUSES:
+                invalidate_intervals(rows[pk][2:5] for pk in updated)
+
+    return {"updated": updated, "unchanged": unchanged, "rejected": rejected}
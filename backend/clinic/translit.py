@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+
+
+# русская и казахская кириллица -> латиница (ГОСТ-подобно, без диакритики)
+CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    "ә": "a", "ғ": "g", "қ": "k", "ң": "n", "ө": "o", "ұ": "u", "ү": "u", "һ": "h", "і": "i",
+}
+_CYRILLIC_TABLE = str.maketrans(CYRILLIC)
+
+# разные латинские написания одного звука -> одна форма (порядок важен)
+FOLDS = (
+    (re.compile(r"\bye"), "e"),    # Yelena / Елена
+    (re.compile(r"shch|sch"), "sh"),
+    (re.compile(r"dzh|zh|dj"), "j"),
+    (re.compile(r"kh"), "h"),
+    (re.compile(r"tz"), "ts"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"y"), "i"),       # Sergey / Сергей, Yulia / Юлия
+    (re.compile(r"(.)\1+"), r"\1"),  # Anna / Ана, Dmitrii / Dmitri
+)
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def search_key(*parts: str | None) -> str:
+    """
+    Script-independent search form of names: Latin / Russian / Kazakh Cyrillic spellings of the same
+    name give the same key ("Ivanov", "Иванов" -> "ivanov"; "Akhmetov", "Ахметов" -> "ahmetov").
+    """
+    text = " ".join(p for p in parts if p).lower().translate(_CYRILLIC_TABLE)
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    text = _NON_WORD.sub(" ", text)
+    for pattern, repl in FOLDS:
+        text = pattern.sub(repl, text)
+    return " ".join(text.split())
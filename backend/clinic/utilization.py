@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.conf import settings
+from django.db import connection
+
+from accounts.models import UserRole
+from .availability import local_bounds
+from .models import AppointmentStatus
+from .rollups import STAT_TABLE
+
+
+MAX_REPORT_DAYS = 366
+
+UTILIZATION_FIELDS = (
+    "doctor_id", "doctor_email", "week", "capacity_minutes", "booked_minutes", "completed_minutes",
+    "booked_revenue", "revenue", "utilization",
+)
+
+# Весь расчёт — один запрос:
+#  - рабочие окна DoctorSchedule раскладываются по дням диапазона и склеиваются в tstzmultirange на врача-день
+#    (пересекающиеся окна не считаются дважды), из него вычитается multirange отгулов врача;
+#  - занятость и выручка берутся из дневной сводки (AppointmentDailyStat), а не из самих приёмов.
+_SQL = f"""
+    WITH doctors AS (
+        SELECT id, email FROM accounts_user
+        WHERE role = %(role)s AND (%(all_doctors)s OR id = ANY(%(doctor_ids)s::bigint[]))
+    ),
+    work AS (
+        SELECT s.doctor_id, d.day,
+               range_agg(tstzrange(
+                   (d.day + s.start_time) AT TIME ZONE %(tz)s, (d.day + s.end_time) AT TIME ZONE %(tz)s
+               )) AS spans
+        FROM generate_series(%(date_from)s::date, %(date_to)s::date, interval '1 day') AS g
+        CROSS JOIN LATERAL (SELECT g::date AS day) d
+        JOIN clinic_doctorschedule s ON s.weekday = extract(isodow FROM d.day)::int - 1
+        WHERE s.doctor_id IN (SELECT id FROM doctors)
+        GROUP BY 1, 2
+    ),
+    offs AS (
+        SELECT doctor_id, range_agg(tstzrange(start_at, end_at)) AS spans
+        FROM clinic_doctortimeoff
+        WHERE start_at < %(end)s AND end_at > %(start)s AND doctor_id IN (SELECT id FROM doctors)
+        GROUP BY 1
+    ),
+    capacity AS (
+        SELECT w.doctor_id, date_trunc('week', w.day)::date AS week,
+               sum(extract(epoch FROM upper(r) - lower(r)))::bigint / 60 AS minutes
+        FROM work w
+        LEFT JOIN offs o USING (doctor_id)
+        CROSS JOIN LATERAL unnest(w.spans - coalesce(o.spans, '{{}}'::tstzmultirange)) AS r
+        GROUP BY 1, 2
+    ),
+    booked AS (
+        SELECT doctor_id, date_trunc('week', day)::date AS week,
+               sum(minutes) FILTER (WHERE status <> %(cancelled)s) AS booked_minutes,
+               sum(minutes) FILTER (WHERE status = %(completed)s) AS completed_minutes,
+               sum(revenue) FILTER (WHERE status <> %(cancelled)s) AS booked_revenue,
+               sum(revenue) FILTER (WHERE status = %(completed)s) AS revenue
+        FROM {STAT_TABLE}
+        WHERE day >= %(date_from)s AND day <= %(date_to)s AND doctor_id IN (SELECT id FROM doctors)
+        GROUP BY 1, 2
+    )
+    SELECT d.id, d.email, x.week,
+           coalesce(c.minutes, 0),
+           coalesce(b.booked_minutes, 0),
+           coalesce(b.completed_minutes, 0),
+           coalesce(b.booked_revenue, 0),
+           coalesce(b.revenue, 0),
+           round(coalesce(b.booked_minutes, 0)::numeric / nullif(c.minutes, 0), 4)
+    FROM (SELECT doctor_id, week FROM capacity UNION SELECT doctor_id, week FROM booked) x
+    JOIN doctors d ON d.id = x.doctor_id
+    LEFT JOIN capacity c USING (doctor_id, week)
+    LEFT JOIN booked b USING (doctor_id, week)
+    WHERE coalesce(c.minutes, 0) > 0 OR coalesce(b.booked_minutes, 0) <> 0 OR coalesce(b.booked_revenue, 0) <> 0
+    ORDER BY d.id, x.week
+"""
+
+
+def weekly_utilization(date_from: date, date_to: date, doctor_ids=None) -> list[tuple]:
+    """
+    Rows of UTILIZATION_FIELDS per doctor and ISO week (week = its Monday; edge weeks are clipped to the range).
+    Booked = every status except CANCELLED (a no-show still held the slot); revenue = COMPLETED only.
+    """
+    start, end = local_bounds(date_from, date_to)
+    with connection.cursor() as cur:
+        cur.execute(_SQL, {
+            "role": UserRole.DOCTOR,
+            "all_doctors": not doctor_ids,
+            "doctor_ids": list(doctor_ids or []),
+            "tz": settings.TIME_ZONE,
+            "date_from": date_from,
+            "date_to": date_to,
+            "start": start,
+            "end": end,
+            "cancelled": AppointmentStatus.CANCELLED,
+            "completed": AppointmentStatus.COMPLETED,
+        })
+        return cur.fetchall()
+
+
+def utilization_report(date_from: date, date_to: date, doctor_ids=None) -> dict:
+    """{"results": [row dicts], "totals": {...}} — the payload of the utilization endpoint."""
+    rows = [dict(zip(UTILIZATION_FIELDS, row)) for row in weekly_utilization(date_from, date_to, doctor_ids)]
+    totals = {
+        name: sum(row[name] for row in rows)
+        for name in ("capacity_minutes", "booked_minutes", "completed_minutes", "booked_revenue", "revenue")
+    }
+    capacity = totals["capacity_minutes"]
+    totals["utilization"] = round(totals["booked_minutes"] / capacity, 4) if capacity else None
+    return {"results": rows, "totals": totals}
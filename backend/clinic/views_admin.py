@@ -1,16 +1,47 @@
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.contrib.postgres.fields import RangeBoundary
+from django.db import IntegrityError, transaction
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.db.models import JSONField, OuterRef, Subquery
+from django.db.models.functions import JSONObject
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.response import Response
+
 from core.permissions import IsAdminRole
-from .models import Patient, Service, Room, Appointment
-from .serializers import PatientSerializer, ServiceSerializer, RoomSerializer, AppointmentAdminSerializer
-from audit.utils import log_action
+from core.refdata import CachedListMixin, request_lang
+from .availability import local_bounds
+from . import rollups
+from .bitmaps import invalidate_intervals
+from .exports import EXPORT_TYPES, XLSX_MAX_ROWS, export_rows
+from .phones import normalize_phone
+from .models import Patient, Service, Room, Appointment, ACTIVE_APPOINTMENT_STATUSES, TsTzRange
+from .serializers import (
+    PatientSerializer, ServiceSerializer, RoomSerializer,
+    AppointmentAdminSerializer, AppointmentSeriesSerializer, AppointmentBulkStatusSerializer,
+    PatientShortSerializer,
+)
+from .series import CONFLICT_MESSAGES, expand, find_conflicts
+from .transitions import bulk_transition
+from audit.utils import log_action, log_actions_bulk
 from audit.models import AuditAction
-from .filters import AppointmentFilter
+from .filters import AppointmentFilter, PatientSearchFilter
+
+
+CALLER_ID_MIN_DIGITS = 5
+CALLER_ID_LIMIT = 10
 
 
 class AdminPatientViewSet(viewsets.ModelViewSet):
     queryset = Patient.objects.all().order_by("-id")
     serializer_class = PatientSerializer
     permission_classes = [IsAdminRole]
+    filter_backends = [DjangoFilterBackend, PatientSearchFilter, OrderingFilter]
     search_fields = ("first_name", "last_name", "middle_name", "phone", "email")
 
     def perform_create(self, serializer):
@@ -25,7 +56,18 @@ class AdminPatientViewSet(viewsets.ModelViewSet):
         log_action(request=self.request, action=AuditAction.DELETE, obj=instance)
         instance.delete()
 
-class AdminServiceViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get"])
+    def caller_id(self, request):
+        """Patients with exactly this phone number (any format: +7 / 8 / spaces / dashes). One indexed query."""
+        digits = normalize_phone(request.query_params.get("phone"))
+        if len(digits) < CALLER_ID_MIN_DIGITS:
+            return Response({"detail": "Query param 'phone' is required."}, status=400)
+
+        patients = Patient.objects.filter(phone_digits=digits).order_by("last_name", "first_name", "id")[:CALLER_ID_LIMIT]
+        return Response({"phone": digits, "patients": PatientShortSerializer(patients, many=True).data})
+
+class AdminServiceViewSet(CachedListMixin, viewsets.ModelViewSet):
+    refdata_name = "services"
     queryset = Service.objects.all().order_by("code")
     serializer_class = ServiceSerializer
     permission_classes = [IsAdminRole]
@@ -43,7 +85,8 @@ class AdminServiceViewSet(viewsets.ModelViewSet):
         log_action(request=self.request, action=AuditAction.DELETE, obj=instance)
         instance.delete()
 
-class AdminRoomViewSet(viewsets.ModelViewSet):
+class AdminRoomViewSet(CachedListMixin, viewsets.ModelViewSet):
+    refdata_name = "rooms"
     queryset = Room.objects.all().order_by("name")
     serializer_class = RoomSerializer
     permission_classes = [IsAdminRole]
@@ -61,6 +104,52 @@ class AdminRoomViewSet(viewsets.ModelViewSet):
         log_action(request=self.request, action=AuditAction.DELETE, obj=instance)
         instance.delete()
 
+    @action(detail=False, methods=["get"])
+    def occupancy(self, request):
+        """All rooms with their active bookings for ?date=YYYY-MM-DD, aggregated in one query."""
+        day = parse_date(request.query_params.get("date") or "")
+        if not day:
+            return Response({"detail": "Query param 'date' (YYYY-MM-DD) is required."}, status=400)
+
+        start, end = local_bounds(day, day)
+        # подзапрос по комнате и диапазону дня: тот же вид условия, что у appointment_room_no_overlap,
+        # поэтому он идёт по её GiST-индексу, а не по всей истории записей
+        bookings = (
+            Appointment.objects.annotate(span=TsTzRange("start_at", "end_at", RangeBoundary()))
+            .filter(
+                room=OuterRef("pk"),
+                status__in=ACTIVE_APPOINTMENT_STATUSES,
+                span__overlap=DateTimeTZRange(start, end),
+            )
+            .order_by()
+            .values("room")
+            .annotate(
+                bookings=JSONBAgg(
+                    JSONObject(
+                        appointment_id="id",
+                        start_at="start_at",
+                        end_at="end_at",
+                        status="status",
+                        doctor_id="doctor_id",
+                        doctor_email="doctor__email",
+                        patient_id="patient_id",
+                    ),
+                    ordering="start_at",
+                )
+            )
+            .values("bookings")
+        )
+        rooms = (
+            Room.objects.order_by("name")
+            .annotate(bookings=Subquery(bookings, output_field=JSONField()))
+            .values("id", "name", "floor", "bookings")
+        )
+
+        return Response({
+            "date": day,
+            "rooms": [{**room, "bookings": room["bookings"] or []} for room in rooms],
+        })
+
 class AdminAppointmentViewSet(viewsets.ModelViewSet):
     queryset = Appointment.objects.select_related("patient", "doctor", "service", "room").all().order_by("-start_at")
     serializer_class = AppointmentAdminSerializer
@@ -88,4 +177,91 @@ class AdminAppointmentViewSet(viewsets.ModelViewSet):
 
     def perform_destroy(self, instance):
         log_action(request=self.request, action=AuditAction.DELETE, obj=instance)
-        instance.delete()
\ No newline at end of file
+        instance.delete()
+
+    @action(detail=False, methods=["post"])
+    def series(self, request):
+        """
+        Recurring appointments (weekly/biweekly, count or until).
+        All occurrences are checked with a few set-based queries; free ones are bulk inserted,
+        the rest come back as conflicts.
+        """
+        ser = AppointmentSeriesSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        data = ser.validated_data
+
+        doctor = data["doctor"]
+        room = data.get("room")
+        occurrences = expand(data["start_at"], data["end_at"], data["frequency"], data.get("count"), data.get("until"))
+        codes = find_conflicts(doctor.id, room.id if room else None, occurrences)
+
+        rows = []
+        conflicts = []
+        for (start, end), code in zip(occurrences, codes):
+            if code:
+                conflicts.append({"start_at": start, "end_at": end, "reason": code, "detail": CONFLICT_MESSAGES[code]})
+                continue
+            rows.append(Appointment(
+                patient=data["patient"],
+                doctor=doctor,
+                service=data["service"],
+                room=room,
+                start_at=start,
+                end_at=end,
+                status=data["status"],
+                created_by=request.user,
+                reason=data["reason"],
+                comment=data["comment"],
+            ))
+
+        if not rows:
+            return Response({"detail": "No occurrence could be booked.", "conflicts": conflicts}, status=400)
+
+        try:
+            with transaction.atomic():
+                created = Appointment.objects.bulk_create(rows)
+                log_actions_bulk(request=request, action=AuditAction.CREATE, objs=created, meta={"type": "appointment_series"})
+                # bulk_create не шлёт сигналы — битмапы занятости и сводку по дням обновляем вручную
+                invalidate_intervals((a.doctor_id, a.start_at, a.end_at) for a in created)
+                rollups.apply(added=[rollups.row(a.__dict__) for a in created])
+        except IntegrityError:
+            # кто-то занял слот между проверкой и вставкой — ограничения БД отклонили серию целиком
+            return Response({"detail": "Schedule changed while booking the series, please retry."}, status=409)
+
+        return Response(
+            {"created": AppointmentAdminSerializer(created, many=True).data, "conflicts": conflicts},
+            status=201,
+        )
+
+    @action(detail=False, methods=["post"])
+    def bulk_status(self, request):
+        """Move many appointments to one status: transitions checked in one pass, single UPDATE."""
+        ser = AppointmentBulkStatusSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        result = bulk_transition(ser.validated_data["ids"], ser.validated_data["status"], request=request)
+        return Response(result)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        The filtered list (same filters / search / ordering as list()) as a streamed file: ?type=csv (default) or xlsx.
+        Rows are read through a server-side cursor while the response is being sent.
+        """
+        kind = request.query_params.get("type", "csv")
+        if kind not in EXPORT_TYPES:
+            return Response({"detail": "Query param 'type' must be 'csv' or 'xlsx'."}, status=400)
+
+        qs = self.filter_queryset(self.get_queryset())
+        if kind == "xlsx" and qs.count() > XLSX_MAX_ROWS:
+            return Response({"detail": f"More than {XLSX_MAX_ROWS} rows do not fit an XLSX sheet, use CSV."}, status=400)
+
+        log_action(
+            request=request, action=AuditAction.READ,
+            meta={"type": "appointment_export", "format": kind, "params": request.query_params.dict()},
+        )
+
+        stream, content_type = EXPORT_TYPES[kind]
+        response = StreamingHttpResponse(stream(export_rows(qs, request_lang(request))), content_type=content_type)
+        filename = f"appointments-{timezone.localtime():%Y%m%d-%H%M}.{kind}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,276 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.models import User, UserRole
+from core.permissions import IsAdminRole, IsDoctorRole
+from .availability import MAX_RANGE_DAYS, first_available, free_slots, load_schedules, local_bounds
+from .models import Appointment, DoctorTimeOff, Room, Service
+
+
+FIRST_AVAILABLE_MAX_DAYS = 14
+FIRST_AVAILABLE_MAX_K = 50
+GRID_MAX_DOCTORS = 150
+
+
+class BadParams(Exception):
+    pass
+
+
+def parse_date_range(request, max_days: int = MAX_RANGE_DAYS):
+    """date_from/date_to (YYYY-MM-DD, inclusive). date_to defaults to date_from."""
+    raw_from = request.query_params.get("date_from")
+    raw_to = request.query_params.get("date_to") or raw_from
+    if not raw_from:
+        raise BadParams("Query param 'date_from' is required.")
+
+    date_from = parse_date(raw_from)
+    date_to = parse_date(raw_to)
+    if not date_from or not date_to:
+        raise BadParams("Dates must be in YYYY-MM-DD format.")
+    if date_to < date_from:
+        raise BadParams("date_to must not be before date_from.")
+    if (date_to - date_from).days >= max_days:
+        raise BadParams(f"Date range must not exceed {max_days} days.")
+    return date_from, date_to
+
+
+def parse_id_list(request, name: str) -> list[int]:
+    """Accepts ?doctor=1&doctor=2 and ?doctor=1,2."""
+    ids = []
+    for raw in request.query_params.getlist(name):
+        for part in raw.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                raise BadParams(f"Query param '{name}' must be a list of ids.")
+            ids.append(int(part))
+    return list(dict.fromkeys(ids))
+
+
+def parse_moment(raw: str | None, name: str):
+    """ISO datetime, or a date meaning local midnight. Naive values are taken in the current timezone."""
+    if not raw:
+        return None
+    value = parse_datetime(raw)
+    if value is None:
+        day = parse_date(raw)
+        if day is None:
+            raise BadParams(f"Query param '{name}' must be an ISO date or datetime.")
+        value = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def columns(fields, rows) -> dict[str, list]:
+    """Row tuples -> {field: [values...]} (columnar payload)."""
+    out = {name: [] for name in fields}
+    for row in rows:
+        for name, value in zip(fields, row):
+            out[name].append(value)
+    return out
+
+
+def _slots_payload(slots):
+    return [{"start_at": s, "end_at": e} for s, e in slots]
+
+
+class AdminAvailabilityView(APIView):
+    """
+    Free slots for one or many doctors over a date range.
+    Built from schedules, time off and active appointments with a fixed number of queries.
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        try:
+            date_from, date_to = parse_date_range(request)
+            doctor_ids = parse_id_list(request, "doctor")
+        except BadParams as e:
+            return Response({"detail": str(e)}, status=400)
+
+        if not doctor_ids:
+            return Response({"detail": "Query param 'doctor' is required."}, status=400)
+
+        doctor_ids = list(
+            User.objects.filter(pk__in=doctor_ids, role=UserRole.DOCTOR)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        slots = free_slots(doctor_ids, date_from, date_to)
+
+        return Response({
+            "date_from": date_from,
+            "date_to": date_to,
+            "doctors": [
+                {"doctor_id": doctor_id, "slots": _slots_payload(slots[doctor_id])}
+                for doctor_id in doctor_ids
+            ],
+        })
+
+
+class DoctorAvailabilityView(APIView):
+    permission_classes = [IsDoctorRole]
+
+    def get(self, request):
+        try:
+            date_from, date_to = parse_date_range(request)
+        except BadParams as e:
+            return Response({"detail": str(e)}, status=400)
+
+        slots = free_slots([request.user.id], date_from, date_to)
+
+        return Response({
+            "date_from": date_from,
+            "date_to": date_to,
+            "slots": _slots_payload(slots[request.user.id]),
+        })
+
+
+class AdminFirstAvailableView(APIView):
+    """
+    Earliest feasible (doctor, room, start) for a service, across all doctors of a specialization.
+
+    Query params: service (required), specialization, date_from/date_to (window, default now .. +7 days),
+    room (restrict to rooms), k (default 5).
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        try:
+            start = parse_moment(request.query_params.get("date_from"), "date_from") or timezone.now()
+            end = parse_moment(request.query_params.get("date_to"), "date_to") or start + timedelta(days=7)
+            room_ids = parse_id_list(request, "room") or None
+            k = max(1, min(int(request.query_params.get("k", 5)), FIRST_AVAILABLE_MAX_K))
+        except ValueError:
+            return Response({"detail": "Query param 'k' must be an integer."}, status=400)
+        except BadParams as e:
+            return Response({"detail": str(e)}, status=400)
+
+        if end <= start:
+            return Response({"detail": "date_to must be after date_from."}, status=400)
+        if end - start > timedelta(days=FIRST_AVAILABLE_MAX_DAYS):
+            return Response({"detail": f"Window must not exceed {FIRST_AVAILABLE_MAX_DAYS} days."}, status=400)
+
+        service_id = request.query_params.get("service")
+        service = Service.objects.filter(pk=service_id, is_active=True).first() if (service_id or "").isdigit() else None
+        if not service:
+            return Response({"detail": "Query param 'service' must be an active service id."}, status=400)
+
+        doctors = User.objects.filter(role=UserRole.DOCTOR, is_active=True)
+        specialization = (request.query_params.get("specialization") or "").strip()
+        if specialization:
+            doctors = doctors.filter(doctor_profile__specialization__iexact=specialization)
+        doctors = {
+            row[0]: row
+            for row in doctors.order_by("id").values_list("id", "email", "doctor_profile__full_name", "doctor_profile__room")
+        }
+
+        # кабинет из профиля врача — предпочтительный
+        rooms = dict(Room.objects.values_list("name", "id"))
+        preferred_room = {doctor_id: rooms.get(row[3]) for doctor_id, row in doctors.items() if row[3]}
+        if room_ids is None:
+            room_ids = sorted(rooms.values())
+
+        found = first_available(
+            doctors.keys(),
+            timedelta(minutes=service.duration_minutes),
+            start,
+            end,
+            k,
+            room_ids=room_ids,
+            preferred_room=preferred_room,
+        )
+
+        return Response({
+            "service": {"id": service.id, "code": service.code, "duration_minutes": service.duration_minutes},
+            "date_from": start,
+            "date_to": end,
+            "results": [
+                {
+                    "start_at": s,
+                    "end_at": e,
+                    "doctor_id": doctor_id,
+                    "doctor_email": doctors[doctor_id][1],
+                    "doctor_name": doctors[doctor_id][2],
+                    "room_id": room_id,
+                }
+                for s, e, doctor_id, room_id in found
+            ],
+        })
+
+
+class AdminScheduleGridView(APIView):
+    """
+    Doctor x time grid for one day (?date=, ?doctor= ids, default all active doctors), in columnar form:
+    schedule intervals, bookings, time off and free slots. Fixed number of queries for any number of doctors.
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        day = parse_date(request.query_params.get("date") or "")
+        if not day:
+            return Response({"detail": "Query param 'date' (YYYY-MM-DD) is required."}, status=400)
+        try:
+            doctor_ids = parse_id_list(request, "doctor")
+        except BadParams as e:
+            return Response({"detail": str(e)}, status=400)
+        if len(doctor_ids) > GRID_MAX_DOCTORS:
+            return Response({"detail": f"At most {GRID_MAX_DOCTORS} doctors per request."}, status=400)
+
+        doctors = User.objects.filter(role=UserRole.DOCTOR)
+        doctors = doctors.filter(pk__in=doctor_ids) if doctor_ids else doctors.filter(is_active=True)
+        doctor_rows = list(
+            doctors.order_by("id")
+            .values_list("id", "email", "doctor_profile__full_name", "doctor_profile__specialization")[:GRID_MAX_DOCTORS]
+        )
+        doctor_ids = [row[0] for row in doctor_rows]
+
+        start, end = local_bounds(day, day)
+        schedules = load_schedules(doctor_ids)
+        free = free_slots(doctor_ids, day, day, schedules=schedules)
+
+        bookings = (
+            Appointment.objects.filter(doctor_id__in=doctor_ids, start_at__lt=end, end_at__gt=start)
+            .order_by("doctor_id", "start_at")
+            .values_list(
+                "id", "doctor_id", "start_at", "end_at", "status", "patient_id",
+                "patient__last_name", "patient__first_name", "service__code", "room_id",
+            )
+        )
+        time_off = (
+            DoctorTimeOff.objects.filter(doctor_id__in=doctor_ids, start_at__lt=end, end_at__gt=start)
+            .order_by("doctor_id", "start_at")
+            .values_list("doctor_id", "start_at", "end_at", "reason")
+        )
+
+        weekday = day.weekday()
+        return Response({
+            "date": day,
+            "doctors": columns(("id", "email", "full_name", "specialization"), doctor_rows),
+            "schedule": columns(
+                ("doctor_id", "start_time", "end_time", "slot_minutes"),
+                (
+                    (doctor_id, *row)
+                    for doctor_id in doctor_ids
+                    for row in schedules.get(doctor_id, {}).get(weekday, [])
+                ),
+            ),
+            "bookings": columns(
+                ("id", "doctor_id", "start_at", "end_at", "status", "patient_id", "patient_name", "service_code", "room_id"),
+                (
+                    (appt_id, doctor_id, s, e, st, patient_id, f"{last} {first}".strip(), code, room_id)
+                    for appt_id, doctor_id, s, e, st, patient_id, last, first, code, room_id in bookings
+                ),
+            ),
+            "time_off": columns(("doctor_id", "start_at", "end_at", "reason"), time_off),
+            "free": columns(
+                ("doctor_id", "start_at", "end_at"),
+                ((doctor_id, s, e) for doctor_id in doctor_ids for s, e in free[doctor_id]),
+            ),
+        })
@@ -1,14 +1,29 @@
+import hashlib
+import json
+from datetime import timedelta
+
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import BigIntegerField, F, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
 from rest_framework import viewsets, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 
 from core.permissions import IsDoctorRole
-from .models import Appointment, VisitNote, DoctorSchedule, DoctorTimeOff
+from .models import Appointment, VisitNote, DoctorSchedule, DoctorTimeOff, NOTE_SEARCH_CONFIG
 from .serializers import (
     AppointmentDoctorSerializer,
+    AppointmentBulkStatusSerializer,
     VisitNoteSerializer,
+    VisitNoteSearchSerializer,
+    SNIPPET_START,
+    SNIPPET_STOP,
     DoctorScheduleSerializer,
     DoctorTimeOffSerializer,
 )
@@ -27,6 +42,8 @@ from django.shortcuts import get_object_or_404
 
 from clinic.models import Patient
 from clinic.serializers import PatientShortSerializer, AppointmentHistorySerializer, VisitNoteHistorySerializer
+from clinic.availability import local_bounds
+from clinic.transitions import bulk_transition
 
 
 
@@ -68,6 +85,46 @@ class DoctorAppointmentViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin,
 
         return Response(AppointmentDoctorSerializer(appt).data)
 
+    @action(detail=False, methods=["post"])
+    def bulk_status(self, request):
+        """set_status for many own appointments at once (e.g. end-of-day COMPLETED / NO_SHOW)."""
+        ser = AppointmentBulkStatusSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        result = bulk_transition(
+            ser.validated_data["ids"],
+            ser.validated_data["status"],
+            request=request,
+            queryset=Appointment.objects.filter(doctor=request.user),
+        )
+        return Response(result)
+
+
+def search_notes(doctor, q: str):
+    """
+    Doctor's own notes matching q (web search syntax: words, "phrase", -exclude, or), best rank first.
+    Uses the (doctor, search_vector) GIN index; ts_headline runs only for the fetched rows.
+    """
+    query = SearchQuery(q, config=NOTE_SEARCH_CONFIG, search_type="websearch")
+    # btree_gin знает только bigint = bigint: без явного приведения doctor_id не попадает в условие GIN
+    doctor_id = Cast(Value(doctor.pk), BigIntegerField())
+    return (
+        VisitNote.objects.filter(doctor_id=doctor_id, search_vector=query)
+        .select_related("patient")
+        .only(
+            "id", "appointment_id", "patient_id", "created_at", "updated_at",
+            "patient__first_name", "patient__last_name", "patient__middle_name",
+        )
+        .annotate(
+            rank=SearchRank(F("search_vector"), query),
+            snippet=SearchHeadline(
+                "note_text", query, config=NOTE_SEARCH_CONFIG,
+                start_sel=SNIPPET_START, stop_sel=SNIPPET_STOP,
+                max_fragments=2, min_words=5, max_words=20, fragment_delimiter=" … ",
+            ),
+        )
+        .order_by("-rank", "-created_at", "-id")
+    )
+
 
 class DoctorVisitNoteViewSet(viewsets.ModelViewSet):
     serializer_class = VisitNoteSerializer
@@ -93,6 +150,21 @@ class DoctorVisitNoteViewSet(viewsets.ModelViewSet):
         log_action(request=request, action=AuditAction.READ, obj=obj, meta={"type": "visit_note"})
         return super().retrieve(request, *args, **kwargs)
 
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """Paginated search_notes(?q=) with highlighted snippets."""
+        q = (request.query_params.get("q") or "").strip()
+        if not q:
+            return Response({"detail": "Query param 'q' is required."}, status=400)
+
+        page = self.paginate_queryset(search_notes(request.user, q))
+        log_action(
+            request=request,
+            action=AuditAction.READ,
+            meta={"type": "visit_note_search", "ids": [note.id for note in page]},
+        )
+        return self.get_paginated_response(VisitNoteSearchSerializer(page, many=True).data)
+
     @action(detail=True, methods=["get", "post"], parser_classes=[MultiPartParser, FormParser])
     def attachments(self, request, pk=None):
 
@@ -193,3 +265,67 @@ class DoctorPatientViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, vie
             "appointments": AppointmentHistorySerializer(appointments, many=True).data,
             "visit_notes": VisitNoteHistorySerializer(notes, many=True).data,
         })
+
+
+WEEK_APPOINTMENT_FIELDS = ("id", "start_at", "end_at", "status", "patient_id", "patient_name", "service_code", "room")
+
+
+class DoctorWeekCalendarView(APIView):
+    """
+    Whole week (Mon..Sun containing ?date=) for the current doctor in one compact payload:
+    appointments as rows of WEEK_APPOINTMENT_FIELDS, working hours and time off.
+    Three queries; responds 304 when If-None-Match matches the ETag.
+    """
+    permission_classes = [IsDoctorRole]
+
+    def get(self, request):
+        raw = request.query_params.get("date")
+        day = parse_date(raw) if raw else timezone.localdate()
+        if not day:
+            return Response({"detail": "Query param 'date' must be YYYY-MM-DD."}, status=400)
+
+        week_start = day - timedelta(days=day.weekday())
+        week_end = week_start + timedelta(days=6)
+        start, end = local_bounds(week_start, week_end)
+
+        appointments = (
+            Appointment.objects.filter(doctor=request.user, start_at__lt=end, end_at__gt=start)
+            .order_by("start_at")
+            .values_list(
+                "id", "start_at", "end_at", "status", "patient_id",
+                "patient__last_name", "patient__first_name", "patient__middle_name",
+                "service__code", "room__name",
+            )
+        )
+        schedule = (
+            DoctorSchedule.objects.filter(doctor=request.user)
+            .order_by("weekday", "start_time")
+            .values("weekday", "start_time", "end_time", "slot_minutes")
+        )
+        time_off = (
+            DoctorTimeOff.objects.filter(doctor=request.user, start_at__lt=end, end_at__gt=start)
+            .order_by("start_at")
+            .values("id", "start_at", "end_at", "reason")
+        )
+
+        data = {
+            "week_start": week_start,
+            "week_end": week_end,
+            "appointment_fields": WEEK_APPOINTMENT_FIELDS,
+            "appointments": [
+                [appt_id, s, e, st, patient_id, f"{last} {first} {middle}".strip(), service_code, room]
+                for appt_id, s, e, st, patient_id, last, first, middle, service_code, room in appointments
+            ],
+            "schedule": list(schedule),
+            "time_off": list(time_off),
+        }
+
+        body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        etag = quote_etag(hashlib.sha1(body.encode()).hexdigest())
+        if etag in request.headers.get("If-None-Match", ""):
+            response = Response(status=304)
+        else:
+            response = Response(data)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
@@ -1,12 +1,88 @@
-from django.db.models import Count
+from datetime import date, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from core.permissions import IsAdminRole
-from clinic.models import Appointment
+from clinic import report_cache
+from clinic.availability import local_bounds
+from clinic.models import Appointment, AppointmentDailyStat, AppointmentStatus
+from clinic.utilization import MAX_REPORT_DAYS, utilization_report
+from clinic.views_availability import BadParams, parse_date_range, parse_id_list, parse_moment
+
+
+def _day(value):
+    """date for a YYYY-MM-DD param (whole local day), None for a datetime or anything else."""
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
+
+
+def _bound(value, name):
+    """(day, moment): a YYYY-MM-DD param is a whole local day, anything else an ISO datetime."""
+    day = _day(value)
+    if day or not value:
+        return day, None
+    return None, parse_moment(value, name)
+
+
+def appointments_report(day_from, moment_from, day_to, moment_to, doctor_id, status) -> dict:
+    """
+    total / by_status / by_doctor. Whole-day (or missing) bounds are answered from the daily rollup
+    (AppointmentDailyStat); a datetime bound needs the appointments themselves.
+    """
+    if moment_from is None and moment_to is None:
+        qs = AppointmentDailyStat.objects.all()
+        if day_from:
+            qs = qs.filter(day__gte=day_from)
+        if day_to:
+            qs = qs.filter(day__lte=day_to)
+        total_expr = Sum("count")
+    else:
+        qs = Appointment.objects.all()
+        if day_from:
+            qs = qs.filter(start_at__gte=local_bounds(day_from, day_from)[0])
+        elif moment_from:
+            qs = qs.filter(start_at__gte=moment_from)
+        # дата без времени — весь день включительно, как в сводке
+        if day_to:
+            qs = qs.filter(start_at__lt=local_bounds(day_to, day_to)[1])
+        elif moment_to:
+            qs = qs.filter(start_at__lte=moment_to)
+        total_expr = Count("id")
+
+    if doctor_id:
+        qs = qs.filter(doctor_id=doctor_id)
+    if status:
+        qs = qs.filter(status=status)
+
+    # в сводке остаются строки с нулевым count после переноса / удаления
+    by_status = list(
+        qs.values("status").annotate(total=total_expr).filter(total__gt=0).order_by("status")
+    )
+    by_doctor = list(
+        qs.values("doctor_id", "doctor__email")
+          .annotate(total=total_expr)
+          .filter(total__gt=0)
+          .order_by("-total", "doctor_id")
+    )
+    return {
+        "total": sum(row["total"] for row in by_status),
+        "by_status": by_status,
+        "by_doctor": by_doctor,
+    }
 
 
 class AdminAppointmentsReportView(APIView):
+    """
+    Counts by status and by doctor, cached per normalized filter set (clinic.report_cache)
+    until an appointment in the covered months changes. X-Cache: HIT / MISS.
+    """
     permission_classes = [IsAdminRole]
 
     def get(self, request):
@@ -15,36 +91,163 @@ class AdminAppointmentsReportView(APIView):
         doctor_id = request.query_params.get("doctor")
         status = request.query_params.get("status")
 
-        qs = Appointment.objects.select_related("doctor", "patient", "service").all()
+        try:
+            day_from, moment_from = _bound(date_from, "date_from")
+            day_to, moment_to = _bound(date_to, "date_to")
+        except BadParams as e:
+            return Response({"detail": str(e)}, status=400)
+        if doctor_id and not doctor_id.isdigit():
+            return Response({"detail": "Query param 'doctor' must be an id."}, status=400)
 
-        if date_from:
-            qs = qs.filter(start_at__gte=date_from)
-        if date_to:
-            qs = qs.filter(start_at__lte=date_to)
-        if doctor_id:
-            qs = qs.filter(doctor_id=doctor_id)
-        if status:
-            qs = qs.filter(status=status)
-
-        by_status = list(
-            qs.values("status").annotate(total=Count("id")).order_by("status")
+        # один ключ для "2030-01-07" и "2030-01-07T00:00+05:00" не делаем: это разные границы
+        key = (
+            "appointments",
+            day_from or (moment_from and moment_from.isoformat()),
+            day_to or (moment_to and moment_to.isoformat()),
+            int(doctor_id) if doctor_id else None,
+            status or None,
         )
-        by_doctor = list(
-            qs.values("doctor_id", "doctor__email")
-              .annotate(total=Count("id"))
-              .order_by("-total")
+        months = report_cache.months(
+            day_from or (moment_from and timezone.localdate(moment_from)),
+            day_to or (moment_to and timezone.localdate(moment_to)),
+        )
+        data, hit = report_cache.cached(
+            key, months,
+            lambda: appointments_report(day_from, moment_from, day_to, moment_to, doctor_id, status),
         )
 
-        total = qs.count()
-
-        return Response({
+        response = Response({
             "filters": {
                 "date_from": date_from,
                 "date_to": date_to,
                 "doctor": doctor_id,
                 "status": status,
             },
-            "total": total,
-            "by_status": by_status,
-            "by_doctor": by_doctor,
+            **data,
         })
+        response["X-Cache"] = "HIT" if hit else "MISS"
+        return response
+
+
+class AdminReportCacheStatsView(APIView):
+    """Hit / miss / eviction counters of this process's report cache."""
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        return Response(report_cache.results.stats())
+
+
+class AdminUtilizationReportView(APIView):
+    """
+    Per doctor and week: scheduled capacity (schedule minus time off), booked / completed minutes,
+    revenue and utilization = booked / capacity. One set-based query over the range.
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        try:
+            date_from, date_to = parse_date_range(request, max_days=MAX_REPORT_DAYS)
+            doctor_ids = parse_id_list(request, "doctor")
+        except BadParams as e:
+            return Response({"detail": str(e)}, status=400)
+
+        return Response({
+            "date_from": date_from,
+            "date_to": date_to,
+            **utilization_report(date_from, date_to, doctor_ids),
+        })
+
+
+TREND_BUCKETS = ("day", "week", "month")
+
+
+def bucket_starts(kind: str, date_from: date, date_to: date) -> list[date]:
+    """Starts of every bucket touching date_from..date_to (a week starts on Monday, as date_trunc)."""
+    if kind == "week":
+        day = date_from - timedelta(days=date_from.weekday())
+    elif kind == "month":
+        day = date_from.replace(day=1)
+    else:
+        day = date_from
+    out = []
+    while day <= date_to:
+        out.append(day)
+        if kind == "month":
+            day = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+        else:
+            day += timedelta(days=7 if kind == "week" else 1)
+    return out
+
+
+def appointments_trend(kind: str, date_from: date, date_to: date, doctor_ids, statuses) -> dict:
+    """
+    One grouped query over the daily rollup (its days are already local): date_trunc(bucket, day)
+    x doctor x status. Every series is zero-filled to the full bucket list.
+    """
+    qs = AppointmentDailyStat.objects.filter(day__gte=date_from, day__lte=date_to)
+    if doctor_ids:
+        qs = qs.filter(doctor_id__in=doctor_ids)
+    if statuses:
+        qs = qs.filter(status__in=statuses)
+    rows = (
+        qs.annotate(bucket=Trunc("day", kind))
+          .values("bucket", "doctor_id", "doctor__email", "status")
+          .annotate(total=Sum("count"))
+          .filter(total__gt=0)
+          .order_by("doctor_id", "status", "bucket")
+    )
+
+    buckets = bucket_starts(kind, date_from, date_to)
+    index = {day: i for i, day in enumerate(buckets)}
+    totals = [0] * len(buckets)
+    series = {}
+    for row in rows:
+        key = (row["doctor_id"], row["status"])
+        if key not in series:
+            series[key] = {
+                "doctor_id": row["doctor_id"],
+                "doctor_email": row["doctor__email"],
+                "status": row["status"],
+                "counts": [0] * len(buckets),
+            }
+        i = index[row["bucket"]]
+        series[key]["counts"][i] = row["total"]
+        totals[i] += row["total"]
+    return {"buckets": buckets, "totals": totals, "series": list(series.values())}
+
+
+class AdminAppointmentsTrendView(APIView):
+    """
+    Appointment counts per bucket (day / week / month) x status x doctor for trend charts:
+    one request and one query for a whole year. Cached like the appointments report.
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        kind = request.query_params.get("bucket", "day")
+        if kind not in TREND_BUCKETS:
+            return Response({"detail": "Query param 'bucket' must be one of: day, week, month."}, status=400)
+        try:
+            date_from, date_to = parse_date_range(request, max_days=MAX_REPORT_DAYS)
+            doctor_ids = parse_id_list(request, "doctor")
+        except BadParams as e:
+            return Response({"detail": str(e)}, status=400)
+
+        statuses = sorted({
+            part.strip()
+            for raw in request.query_params.getlist("status")
+            for part in raw.split(",")
+            if part.strip()
+        })
+        if set(statuses) - set(AppointmentStatus.values):
+            return Response({"detail": "Unknown status in query param 'status'."}, status=400)
+
+        key = ("trend", kind, date_from, date_to, tuple(sorted(doctor_ids)), tuple(statuses))
+        data, hit = report_cache.cached(
+            key, report_cache.months(date_from, date_to),
+            lambda: appointments_trend(kind, date_from, date_to, doctor_ids, statuses),
+        )
+
+        response = Response({"bucket": kind, "date_from": date_from, "date_to": date_to, **data})
+        response["X-Cache"] = "HIT" if hit else "MISS"
+        return response
@@ -7,9 +7,15 @@ from clinic.views_admin import AdminPatientViewSet, AdminServiceViewSet, AdminRo
 from clinic.views_doctor import DoctorAppointmentViewSet, DoctorVisitNoteViewSet, DoctorScheduleViewSet, DoctorTimeOffViewSet
 from core.views import SearchView
 from audit.views import AdminAuditLogViewSet
+from jobs.views import AdminJobViewSet
 
-from clinic.views_doctor import DoctorPatientViewSet
-from clinic.views_reports import AdminAppointmentsReportView
+from clinic.views_doctor import DoctorPatientViewSet, DoctorWeekCalendarView
+from clinic.views_reports import (
+    AdminAppointmentsReportView, AdminAppointmentsTrendView, AdminReportCacheStatsView, AdminUtilizationReportView,
+)
+from clinic.views_availability import (
+    AdminAvailabilityView, AdminFirstAvailableView, AdminScheduleGridView, DoctorAvailabilityView,
+)
 from accounts.auth_views import LogoutView
 
 
@@ -27,6 +33,7 @@ doctor_router.register("schedule", DoctorScheduleViewSet, basename="doctor-sched
 doctor_router.register("time-off", DoctorTimeOffViewSet, basename="doctor-timeoff")
 
 admin_router.register("audit-logs", AdminAuditLogViewSet, basename="admin-audit-logs")
+admin_router.register("jobs", AdminJobViewSet, basename="admin-jobs")
 
 doctor_router.register("patients", DoctorPatientViewSet, basename="doctor-patients")
 
@@ -48,6 +55,14 @@ urlpatterns = [
     path("ai/", include("ai_assistant.urls")),
 
     path("admin/reports/appointments/", AdminAppointmentsReportView.as_view(), name="admin-reports-appointments"),
+    path("admin/reports/appointments/trend/", AdminAppointmentsTrendView.as_view(), name="admin-reports-appointments-trend"),
+    path("admin/reports/cache/", AdminReportCacheStatsView.as_view(), name="admin-reports-cache"),
+    path("admin/reports/utilization/", AdminUtilizationReportView.as_view(), name="admin-reports-utilization"),
+    path("admin/availability/", AdminAvailabilityView.as_view(), name="admin-availability"),
+    path("admin/availability/first/", AdminFirstAvailableView.as_view(), name="admin-availability-first"),
+    path("admin/schedule/grid/", AdminScheduleGridView.as_view(), name="admin-schedule-grid"),
+    path("doctor/availability/", DoctorAvailabilityView.as_view(), name="doctor-availability"),
+    path("doctor/calendar/week/", DoctorWeekCalendarView.as_view(), name="doctor-calendar-week"),
     path("auth/logout/", LogoutView.as_view(), name="logout"),
 
 ]
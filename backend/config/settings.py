@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     "rest_framework",
     "django_filters",
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
     "clinic",
     "audit",
     "ai_assistant",
+    "jobs",
     "rest_framework_simplejwt.token_blacklist",
 
 ]
@@ -116,6 +118,36 @@ else:
     }
 
 
+# Cache
+# справочники (услуги, кабинеты, врачи, см. core/refdata.py): locmem в каждом процессе или общий Redis,
+# например REFDATA_CACHE_URL=redis://127.0.0.1:6379/1
+
+REFDATA_CACHE_URL = os.getenv("REFDATA_CACHE_URL")
+# счётчики поколений кеша отчётов (clinic/report_cache.py); сами результаты — в памяти процесса
+REPORTS_CACHE_URL = os.getenv("REPORTS_CACHE_URL")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "refdata": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REFDATA_CACHE_URL}
+        if REFDATA_CACHE_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "refdata"}
+    ),
+    "reports": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REPORTS_CACHE_URL}
+        if REPORTS_CACHE_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "reports"}
+    ),
+}
+# сколько живёт копия справочника; с locmem — ещё и максимальная задержка изменений в других процессах
+REFDATA_TTL = int(os.getenv("REFDATA_TTL", "300"))
+# результатов отчётов в памяти процесса (LRU) и сколько живёт результат без записей в его месяцах
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "256"))
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "300"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -161,6 +193,28 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Background jobs (jobs/, `manage.py run_jobs`)
+# результаты лежат вне MEDIA_ROOT: отдаются только через /api/admin/jobs/<id>/result/
+JOB_RESULTS_ROOT = Path(os.getenv("JOB_RESULTS_ROOT", BASE_DIR / "job_results"))
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+# без heartbeat дольше этого задача считается брошенной и возвращается в очередь
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RESULT_DAYS = int(os.getenv("JOB_RESULT_DAYS", "7"))
+
+# Buffered audit writer (audit/writer.py)
+AUDIT_BUFFER = os.getenv("AUDIT_BUFFER", "1") == "1"
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1.0"))
+# записи ждут сброса в файле: после падения процесса их запишет следующий ("" — без файла)
+AUDIT_SPOOL_DIR = os.getenv("AUDIT_SPOOL_DIR", str(BASE_DIR / "audit_spool"))
+# fsync на каждую запись переживает и отключение питания, но стоит дороже самого INSERT
+AUDIT_SPOOL_FSYNC = os.getenv("AUDIT_SPOOL_FSYNC", "0") == "1"
+# журнал секционирован по месяцам (audit/partitions.py, `manage.py audit_partitions`)
+AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "3"))
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "36"))
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", str(BASE_DIR / "audit_archive"))
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
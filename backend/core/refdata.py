@@ -0,0 +1,140 @@
+"""
+Read-through cache of small reference lists (services, rooms, doctors) for list screens and global search.
+
+Every dataset has a version counter in the "refdata" cache; payloads are stored under the current version,
+so invalidation is one increment and old payloads simply expire. Writes bump the version through
+post_save / post_delete receivers (clinic.signals, accounts.signals).
+
+With the default locmem backend every process has its own copy: another worker sees a change after
+REFDATA_TTL at the latest. Point REFDATA_CACHE_URL at Redis to share versions between processes; the backend
+is never cleared (it may hold other data), clear() bumps every version instead.
+"""
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+REFDATA_CACHE = "refdata"
+LANGS = ("en", "ru", "kk")
+
+
+def request_lang(request) -> str:
+    header = (request.headers.get("Accept-Language") or "").lower()
+    if header.startswith("ru"):
+        return "ru"
+    if header.startswith("kk"):
+        return "kk"
+    return "en"
+
+
+def _cache():
+    return caches[REFDATA_CACHE]
+
+
+def _seed(key: str):
+    # пропавший счётчик начинается с нового значения (как в clinic.report_cache): с 1 снова совпали бы старые данные
+    _cache().add(key, time.time_ns(), timeout=None)
+
+
+def _version(name: str) -> int:
+    key = f"v:{name}"
+    version = _cache().get(key)
+    if version is None:
+        _seed(key)
+        version = _cache().get(key)
+    return version
+
+
+def _bump(name: str):
+    try:
+        _cache().incr(f"v:{name}")
+    except ValueError:
+        _seed(f"v:{name}")
+
+
+def invalidate(*names: str):
+    """
+    Bump now (later readers in this transaction rebuild) and again after commit: a reader that rebuilt
+    from pre-commit rows in between must not keep serving them.
+    """
+    for name in names:
+        _bump(name)
+        transaction.on_commit(lambda name=name: _bump(name))
+
+
+def _services(lang: str) -> dict:
+    from clinic.models import Service
+    from clinic.serializers import ServiceSerializer
+
+    services = list(Service.objects.order_by("code"))
+    rows = ServiceSerializer(services, many=True, context={"lang": lang}).data
+    # search_key не отдаётся в API, но нужен глобальному поиску
+    return {"rows": [dict(row) for row in rows], "keys": [s.search_key for s in services]}
+
+
+def _rooms(lang: str) -> dict:
+    from clinic.models import Room
+    from clinic.serializers import RoomSerializer
+
+    return {"rows": [dict(row) for row in RoomSerializer(Room.objects.order_by("name"), many=True).data]}
+
+
+def _doctors(lang: str) -> dict:
+    from accounts.models import User, UserRole
+    from accounts.serializers import AdminDoctorSerializer
+
+    doctors = User.objects.filter(role=UserRole.DOCTOR).select_related("doctor_profile").order_by("id")
+    return {"rows": [dict(row) for row in AdminDoctorSerializer(doctors, many=True).data]}
+
+
+# name -> (loader, payload depends on language)
+DATASETS = {
+    "services": (_services, True),
+    "rooms": (_rooms, False),
+    "doctors": (_doctors, False),
+}
+
+
+def get(name: str, lang: str = "en") -> dict:
+    """{"rows": [...]} (+ "keys" for services); loads from the DB on a miss."""
+    loader, localized = DATASETS[name]
+    lang = lang if localized and lang in LANGS else ""
+    key = f"{name}:{_version(name)}:{lang}"
+    data = _cache().get(key)
+    if data is None:
+        data = loader(lang or "en")
+        _cache().set(key, data, settings.REFDATA_TTL)
+    return data
+
+
+def rows(name: str, lang: str = "en") -> list[dict]:
+    return get(name, lang)["rows"]
+
+
+def clear():
+    for name in DATASETS:
+        _bump(name)
+
+
+class CachedListMixin:
+    """
+    Unfiltered list() of an admin viewset served from the cache (paginated in memory);
+    any filter / search / ordering param falls back to the regular queryset.
+    """
+    refdata_name: str = ""
+
+    def list(self, request, *args, **kwargs):
+        # page_size пагинатор игнорирует, а фронт его шлёт
+        if set(request.query_params) - {"page", "page_size"}:
+            return super().list(request, *args, **kwargs)
+
+        data = rows(self.refdata_name, request_lang(request))
+        page = self.paginate_queryset(data)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(data)
@@ -1,22 +1,232 @@
-from django.db.models import Q
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import OperationalError, connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Greatest, Reverse
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts.models import UserRole
-from clinic.models import Patient, Service, Appointment
-
-
-def _lang(request) -> str:
-    header = (request.headers.get("Accept-Language") or "").lower()
-    if header.startswith("ru"):
-        return "ru"
-    if header.startswith("kk"):
-        return "kk"
-    return "en"
+from clinic.models import Patient, Appointment
+from clinic.phones import digits_only, looks_like_phone, phone_prefixes
+from clinic.translit import search_key
+from core import refdata
+
+
+def _ranked(qs, term: str, key: str, limit: int) -> list:
+    rank = TrigramWordSimilarity(term, "search_text")
+    if key:
+        rank = Greatest(rank, TrigramWordSimilarity(key, "search_key"))
+    return list(
+        qs.annotate(rank=rank)
+        .order_by("-rank", "last_name", "first_name", "id")
+        .only("id", "first_name", "last_name", "middle_name", "phone", "email")[:limit]
+    )
+
+
+def _phone_matches(qs, q: str, limit: int) -> list:
+    """
+    Number typed from the start (in any of the forms of clinic.phones.phone_prefixes) or its last digits:
+    btree (text_pattern_ops) on phone_digits and its reverse.
+    """
+    digits = digits_only(q)
+    matches = Q(phone_rev__startswith=digits[::-1])
+    for prefix in phone_prefixes(q):
+        matches |= Q(phone_digits__startswith=prefix)
+    return list(
+        qs.annotate(phone_rev=Reverse("phone_digits"))
+        .filter(matches)
+        .order_by("last_name", "first_name", "id")
+        .only("id", "first_name", "last_name", "middle_name", "phone", "email")[:limit]
+    )
+
+
+def search_patients(user, q: str, limit: int) -> list:
+    """
+    Phone-like q: patients whose number starts or ends with it.
+    Otherwise (or if none): patients whose Patient.search_text (name, phone, email) or
+    Patient.search_key (name in any script, see clinic.translit) contains q, best word similarity first;
+    if nothing contains q, fuzzy (strict word similarity) matches on the name instead.
+    Both lookups use the trigram GIN index. Doctors see only their own patients.
+    """
+    term = q.lower()
+    key = search_key(q)
+    qs = Patient.objects.all()
+    if user.role == UserRole.DOCTOR:
+        # EXISTS вместо JOIN + DISTINCT
+        qs = qs.filter(Exists(Appointment.objects.filter(patient=OuterRef("pk"), doctor=user)))
+
+    if looks_like_phone(q):
+        found = _phone_matches(qs, q, limit)
+        if found:
+            return found
+
+    matches = Q(search_text__contains=term)
+    if key:
+        matches |= Q(search_key__contains=key)
+    # ранжируются все совпадения в одном запросе с LIMIT: обрезка до ранжирования теряла точное совпадение
+    found = _ranked(qs.filter(matches), term, key, limit)
+    if not found and key:
+        # опечатки: нечёткий поиск по ФИО только когда подстрока ничего не дала — он заметно дороже.
+        # Без LIMIT в подзапросе: иначе планировщик выбирает seq scan в надежде рано набрать строки
+        found = _ranked(qs.filter(search_key__trigram_strict_word_similar=key), term, key, limit)
+    return found
+
+
+def _service_rows(q: str, lang: str, limit: int) -> list[dict]:
+    """Active services whose code contains q or whose names (any language / script, search_key) do. From refdata."""
+    services = refdata.get("services", lang)
+    term = q.lower()
+    key = search_key(q)
+    found = []
+    for row, row_key in zip(services["rows"], services["keys"]):
+        if row["is_active"] and (term in row["code"].lower() or (key and key in row_key)):
+            found.append({
+                "id": row["id"],
+                "code": row["code"],
+                "name": row["name"],
+                "duration_minutes": row["duration_minutes"],
+                "price": row["price"],
+            })
+            if len(found) == limit:
+                break
+    return found
+
+
+def _appointment_rows(user, q: str, limit: int) -> list[dict]:
+    appt_qs = Appointment.objects.select_related("patient", "doctor", "service").all()
+    if user.role == UserRole.DOCTOR:
+        appt_qs = appt_qs.filter(doctor=user)
+
+    appt_qs = appt_qs.filter(
+        Q(patient__first_name__icontains=q)
+        | Q(patient__last_name__icontains=q)
+        | Q(doctor__email__icontains=q)
+        | Q(service__code__icontains=q)
+    ).order_by("-start_at")[:limit]
+
+    return [
+        {
+            "id": a.id,
+            "start_at": a.start_at,
+            "end_at": a.end_at,
+            "status": a.status,
+            "patient_id": a.patient_id,
+            "patient_name": str(a.patient),
+            "doctor_email": a.doctor.email,
+            "service_code": a.service.code,
+        }
+        for a in appt_qs
+    ]
+
+
+# секции глобального поиска идут параллельно: ответ = самая медленная секция, а не сумма
+SEARCH_WORKERS = 8
+# не уложившаяся секция приходит пустой и попадает в "incomplete", остальные отдаются как есть
+SEARCH_SECTION_TIMEOUT = 1.0
+# соединение потока пула живёт между поисками (запросы свои закрывают: CONN_MAX_AGE по умолчанию 0)
+SEARCH_CONN_MAX_AGE = 60.0
+
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+# секция уходит в пул, только если там есть свободный поток: в очереди её таймаут истёк бы до начала работы
+_search_slots = threading.BoundedSemaphore(SEARCH_WORKERS)
+_search_local = threading.local()
+
+
+def _reuse_connection():
+    """Keep the pool thread's connection unless it is older than SEARCH_CONN_MAX_AGE or broken."""
+    if connection.connection is not None:
+        expired = time.monotonic() - getattr(_search_local, "opened_at", 0.0) > SEARCH_CONN_MAX_AGE
+        if expired or (connection.errors_occurred and not connection.is_usable()):
+            connection.close()
+        else:
+            connection.errors_occurred = False
+    if connection.connection is None:
+        _search_local.opened_at = time.monotonic()
+
+
+def _run_section(fn, timeout: float, pooled: bool = True):
+    """
+    In a pool thread on the thread's own kept connection, or inline in the request thread.
+    statement_timeout makes Postgres cancel a late query instead of leaving it running.
+    """
+    if pooled:
+        _reuse_connection()
+    with transaction.atomic():
+        with connection.cursor() as cur:
+            cur.execute("SELECT set_config('statement_timeout', %s, true)", [f"{int(timeout * 1000)}ms"])
+        return fn()
+
+
+def close_search_connections():
+    """Close the connections kept by the pool threads (e.g. before the test database is dropped)."""
+    barrier = threading.Barrier(SEARCH_WORKERS)
+
+    def close():
+        # барьер: каждая задача занимает свой поток, так закрываются соединения всех потоков
+        try:
+            barrier.wait(5)
+        except threading.BrokenBarrierError:
+            pass
+        connection.close()
+
+    for future in [_search_pool.submit(close) for _ in range(SEARCH_WORKERS)]:
+        future.result()
+
+
+def _submit(fn, timeout: float):
+    """Future of the section in a free pool thread, or None when every thread is busy."""
+    if not _search_slots.acquire(blocking=False):
+        return None
+    future = _search_pool.submit(_run_section, fn, timeout)
+    future.add_done_callback(lambda _: _search_slots.release())
+    return future
+
+
+def run_sections(sections: dict, timeout: float | None = None) -> tuple[dict, list[str]]:
+    """
+    sections: name -> callable returning rows. Returns ({name: rows}, names that did not finish in time).
+    A section starts right away in a free pool thread; when the pool is busy with other searches it runs
+    in the calling thread instead, so its timeout never runs out in a queue.
+    Inside an open transaction runs them one by one: pool connections would not see its uncommitted rows.
+    """
+    if connection.in_atomic_block:
+        return {name: fn() for name, fn in sections.items()}, []
+
+    timeout = timeout or SEARCH_SECTION_TIMEOUT
+    deadline = time.monotonic() + timeout
+    futures = {name: _submit(fn, timeout) for name, fn in sections.items()}
+    results, incomplete = {}, []
+    for name, future in futures.items():
+        if future is not None:
+            continue
+        try:
+            results[name] = _run_section(sections[name], timeout, pooled=False)
+        except OperationalError:
+            results[name] = []
+            incomplete.append(name)
+    for name, future in futures.items():
+        if future is None:
+            continue
+        try:
+            # секция в пуле стартовала сразу; небольшой запас: statement_timeout обычно срабатывает раньше
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()) + 0.1)
+        except (FutureTimeout, OperationalError):
+            future.cancel()
+            results[name] = []
+            incomplete.append(name)
+    return {name: results[name] for name in sections}, [name for name in sections if name in incomplete]
 
 
 class SearchView(APIView):
+    """
+    Patients, services and appointments matching ?q=, looked up concurrently (see run_sections).
+    A section that exceeds SEARCH_SECTION_TIMEOUT is returned empty and listed in "incomplete".
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -24,81 +234,22 @@ class SearchView(APIView):
         if not q:
             return Response({"detail": "Query param 'q' is required."}, status=400)
 
-        lang = _lang(request)
+        lang = refdata.request_lang(request)
         limit = min(int(request.query_params.get("limit", 10)), 50)
-
-        is_admin = request.user.role == UserRole.ADMIN
-        is_doctor = request.user.role == UserRole.DOCTOR
-
-        data = {}
-
-        patients_qs = Patient.objects.all()
-        if is_doctor:
-            # только пациенты этого доктора (через appointments)
-            patients_qs = patients_qs.filter(appointments__doctor=request.user).distinct()
-
-        patients_qs = patients_qs.filter(
-            Q(first_name__icontains=q)
-            | Q(last_name__icontains=q)
-            | Q(middle_name__icontains=q)
-            | Q(phone__icontains=q)
-            | Q(email__icontains=q)
-        ).order_by("last_name", "first_name")[:limit]
-
-        data["patients"] = [
-            {
-                "id": p.id,
-                "full_name": str(p),
-                "phone": p.phone,
-                "email": p.email,
-            }
-            for p in patients_qs
-        ]
-
-        services_qs = Service.objects.filter(is_active=True).filter(
-            Q(code__icontains=q)
-            | Q(name_en__icontains=q)
-            | Q(name_ru__icontains=q)
-            | Q(name_kk__icontains=q)
-        ).order_by("code")[:limit]
-
-        def service_name(s: Service):
-            return getattr(s, f"name_{lang}") or s.name_en
-
-        data["services"] = [
-            {
-                "id": s.id,
-                "code": s.code,
-                "name": service_name(s),
-                "duration_minutes": s.duration_minutes,
-                "price": str(s.price),
-            }
-            for s in services_qs
-        ]
-
-        appt_qs = Appointment.objects.select_related("patient", "doctor", "service").all()
-        if is_doctor:
-            appt_qs = appt_qs.filter(doctor=request.user)
-
-        appt_qs = appt_qs.filter(
-            Q(patient__first_name__icontains=q)
-            | Q(patient__last_name__icontains=q)
-            | Q(doctor__email__icontains=q)
-            | Q(service__code__icontains=q)
-        ).order_by("-start_at")[:limit]
-
-        data["appointments"] = [
-            {
-                "id": a.id,
-                "start_at": a.start_at,
-                "end_at": a.end_at,
-                "status": a.status,
-                "patient_id": a.patient_id,
-                "patient_name": str(a.patient),
-                "doctor_email": a.doctor.email,
-                "service_code": a.service.code,
-            }
-            for a in appt_qs
-        ]
-
+        user = request.user
+
+        data, incomplete = run_sections({
+            "patients": lambda: [
+                {
+                    "id": p.id,
+                    "full_name": str(p),
+                    "phone": p.phone,
+                    "email": p.email,
+                }
+                for p in search_patients(user, q, limit)
+            ],
+            "services": lambda: _service_rows(q, lang, limit),
+            "appointments": lambda: _appointment_rows(user, q, limit),
+        })
+        data["incomplete"] = incomplete
         return Response(data)
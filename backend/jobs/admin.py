@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "created_by", "created_at", "finished_at", "attempts", "worker")
+    list_filter = ("status", "kind")
+    search_fields = ("kind", "created_by__email", "error")
+    readonly_fields = ("created_at", "started_at", "finished_at", "heartbeat_at", "worker", "attempts")
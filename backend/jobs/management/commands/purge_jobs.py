@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs import runner
+
+
+class Command(BaseCommand):
+    help = "Delete finished jobs and their result files older than --days (default JOB_RESULT_DAYS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        days = opts["days"] if opts["days"] is not None else settings.JOB_RESULT_DAYS
+        deleted = runner.purge(timezone.now() - timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} jobs finished more than {days} days ago"))
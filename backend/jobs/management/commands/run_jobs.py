@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import signal
+import threading
+import time as pytime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs import runner
+
+
+class Command(BaseCommand):
+    help = "Run background jobs: a pool of worker threads taking queued jobs from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4, help="Jobs run at the same time")
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds between queue checks when idle")
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+
+    def handle(self, *args, **opts):
+        threads = max(1, opts["threads"])
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            # SIGTERM / Ctrl+C: новые задачи не берём, начатые доводим до конца
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, lambda *_: stop.set())
+
+        running = {}
+        last_beat = 0.0
+        self.stdout.write(f"worker {runner.WORKER_ID}: {threads} threads")
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="job") as pool:
+            while True:
+                for future in [f for f in running if f.done()]:
+                    job = running.pop(future)
+                    self.stdout.write(f"  job {job.pk} ({job.kind}): {future.result()}")
+
+                if pytime.monotonic() - last_beat >= settings.JOB_HEARTBEAT_SECONDS:
+                    runner.heartbeat([job.pk for job in running.values()])
+                    requeued, failed = runner.requeue_stale()
+                    if requeued or failed:
+                        self.stdout.write(self.style.WARNING(f"  stale jobs: {requeued} requeued, {failed} failed"))
+                    last_beat = pytime.monotonic()
+
+                while not stop.is_set() and len(running) < threads:
+                    job = runner.claim()
+                    if job is None:
+                        break
+                    running[pool.submit(runner.run, job)] = job
+
+                # после сигнала остановки продолжаем слать heartbeat, пока начатые задачи не закончатся
+                if (stop.is_set() or opts["once"]) and not running:
+                    break
+                if running:
+                    wait(running, timeout=opts["poll"], return_when=FIRST_COMPLETED)
+                else:
+                    stop.wait(opts["poll"])
+        self.stdout.write(self.style.SUCCESS("worker stopped"))
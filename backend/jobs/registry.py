@@ -0,0 +1,32 @@
+"""
+Job kinds. A handler is registered in some app's tasks.py:
+
+    @register("appointments_export", validate=check_export_params)
+    def export(params: dict, out) -> dict:
+        out.write(...)
+        return {"name": "appointments.csv", "content_type": "text/csv"}
+
+`out` is a binary file opened for writing; the returned dict names the result. `validate(params)` runs
+when the job is submitted and raises rest_framework ValidationError for bad params.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class JobKind:
+    name: str
+    handler: Callable
+    validate: Callable | None = None
+
+
+KINDS: dict[str, JobKind] = {}
+
+
+def register(name: str, validate: Callable | None = None):
+    def decorator(handler):
+        KINDS[name] = JobKind(name, handler, validate)
+        return handler
+    return decorator
@@ -0,0 +1,154 @@
+"""
+Queue operations used by the worker command and the API. Only Postgres and the local filesystem:
+jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, results are written to JOB_RESULTS_ROOT/<id>/<attempt>/.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import socket
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import FINISHED_JOB_STATUSES, Job, JobStatus
+from .registry import KINDS
+
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def results_dir(job: Job) -> Path:
+    return Path(settings.JOB_RESULTS_ROOT) / str(job.pk)
+
+
+def attempt_dir(job: Job) -> Path:
+    return results_dir(job) / str(job.attempts)
+
+
+def result_path(job: Job) -> Path | None:
+    # после успеха задачу больше никто не берёт: attempts — номер попытки, чей файл принят
+    if job.status != JobStatus.SUCCEEDED or not job.result_name:
+        return None
+    return attempt_dir(job) / job.result_name
+
+
+def claim(worker: str = WORKER_ID) -> Job | None:
+    """Take the oldest queued job; concurrent workers skip rows locked by each other."""
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=JobStatus.QUEUED)
+            .order_by("id")
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        job.status = JobStatus.RUNNING
+        job.started_at = job.heartbeat_at = now
+        job.worker = worker
+        job.attempts += 1
+        job.error = ""
+        job.save(update_fields=["status", "started_at", "heartbeat_at", "worker", "attempts", "error"])
+    return job
+
+
+def _finish(job: Job, status: str, **fields) -> bool:
+    # задачу могли вернуть в очередь как зависшую и отдать другому воркеру — тогда результат не наш
+    return bool(
+        Job.objects.filter(pk=job.pk, status=JobStatus.RUNNING, worker=job.worker, attempts=job.attempts)
+        .update(status=status, finished_at=timezone.now(), **fields)
+    )
+
+
+def run(job: Job) -> str:
+    """
+    Run a claimed job in the current thread; returns the status this attempt ended with. Never raises.
+    The result goes to the attempt's own directory and is kept only if _finish confirms the job is still ours.
+    """
+    # свой каталог на попытку: зависшая попытка могла ещё не остановиться и не должна затереть чужой файл
+    directory = attempt_dir(job)
+    partial = directory / ".partial"
+    owned = False
+    try:
+        kind = KINDS.get(job.kind)
+        if kind is None:
+            raise LookupError(f"Unknown job kind '{job.kind}'.")
+
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(partial, "wb") as out:
+            meta = kind.handler(job.params, out) or {}
+        # имя файла приходит от обработчика: только последний компонент пути
+        name = Path(meta.get("name") or "result").name
+        final = directory / name
+        os.replace(partial, final)
+
+        status = JobStatus.SUCCEEDED
+        owned = _finish(
+            job, status,
+            result_name=name,
+            result_content_type=meta.get("content_type", "application/octet-stream"),
+            result_size=final.stat().st_size,
+        )
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        shutil.rmtree(directory, ignore_errors=True)  # недописанный файл
+        status = JobStatus.FAILED
+        owned = _finish(job, status, error=f"{type(e).__name__}: {e}")
+    finally:
+        # поток пула живёт дольше задачи: соединение не должно висеть между задачами
+        connection.close()
+    if not owned:
+        logger.warning("Job %s attempt %s was taken over by another worker; result dropped", job.pk, job.attempts)
+        shutil.rmtree(directory, ignore_errors=True)
+    return status
+
+
+def heartbeat(job_ids) -> int:
+    if not job_ids:
+        return 0
+    return Job.objects.filter(pk__in=job_ids, status=JobStatus.RUNNING).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale(stale_seconds: int | None = None, max_attempts: int | None = None) -> tuple[int, int]:
+    """
+    RUNNING jobs without a heartbeat for stale_seconds (their worker died): back to the queue,
+    or FAILED after max_attempts. Returns (requeued, failed).
+    """
+    stale_seconds = stale_seconds or settings.JOB_STALE_SECONDS
+    max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+    stale = Job.objects.filter(
+        status=JobStatus.RUNNING, heartbeat_at__lt=timezone.now() - timedelta(seconds=stale_seconds),
+    )
+    with transaction.atomic():
+        requeued = stale.filter(attempts__lt=max_attempts).update(
+            status=JobStatus.QUEUED, worker="", heartbeat_at=None,
+        )
+        failed = stale.update(
+            status=JobStatus.FAILED, finished_at=timezone.now(), error="Worker stopped responding.",
+        )
+    return requeued, failed
+
+
+def cancel(job: Job) -> bool:
+    """Only a queued job can be cancelled."""
+    return bool(
+        Job.objects.filter(pk=job.pk, status=JobStatus.QUEUED)
+        .update(status=JobStatus.CANCELLED, finished_at=timezone.now())
+    )
+
+
+def purge(before) -> int:
+    """Delete jobs finished before `before` together with their result files."""
+    jobs = list(Job.objects.filter(status__in=FINISHED_JOB_STATUSES, finished_at__lt=before))
+    for job in jobs:
+        shutil.rmtree(results_dir(job), ignore_errors=True)
+    Job.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+    return len(jobs)
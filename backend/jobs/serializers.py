@@ -0,0 +1,46 @@
+from rest_framework import serializers
+
+from .models import Job
+from .registry import KINDS
+
+
+class JobSerializer(serializers.ModelSerializer):
+    created_by_email = serializers.CharField(source="created_by.email", read_only=True)
+
+    class Meta:
+        model = Job
+        fields = (
+            "id",
+            "kind",
+            "params",
+            "status",
+            "created_by",
+            "created_by_email",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "attempts",
+            "error",
+            "result_name",
+            "result_content_type",
+            "result_size",
+        )
+        read_only_fields = tuple(f for f in fields if f not in ("kind", "params"))
+
+    def validate_kind(self, value):
+        if value not in KINDS:
+            raise serializers.ValidationError(f"Unknown job kind. Available: {', '.join(sorted(KINDS))}.")
+        return value
+
+    def validate(self, attrs):
+        kind = KINDS[attrs["kind"]]
+        params = attrs.get("params") or {}
+        if not isinstance(params, dict):
+            raise serializers.ValidationError({"params": "Must be an object."})
+        if kind.validate:
+            # валидатор может вернуть нормализованные параметры
+            cleaned = kind.validate(params)
+            if cleaned is not None:
+                params = cleaned
+        attrs["params"] = params
+        return attrs
@@ -0,0 +1,169 @@
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITransactionTestCase
+
+from accounts.models import User, UserRole
+from clinic.models import Patient, Service, Appointment
+from clinic.tests.helpers import MONDAY, at
+from clinic.tests.test_api import auth
+from jobs import runner
+from jobs.models import Job, JobStatus
+from jobs.registry import KINDS, JobKind
+
+
+URL = "/api/admin/jobs/"
+
+
+def failing(params, out):
+    out.write(b"half")
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(APITransactionTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings = override_settings(JOB_RESULTS_ROOT=self.tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # только на время теста: реестр общий для всех модулей
+        kinds = mock.patch.dict(KINDS, {"test_failing": JobKind("test_failing", failing)})
+        kinds.start()
+        self.addCleanup(kinds.stop)
+
+        self.admin = User.objects.create_user(email="admin@test.local", role=UserRole.ADMIN)
+        self.doctor = User.objects.create_user(email="doctor1@test.local", role=UserRole.DOCTOR)
+        patient = Patient.objects.create(first_name="John", last_name="Doe")
+        service = Service.objects.create(code="CONSULT", name_en="Consultation", duration_minutes=30)
+        for hh in (9, 10, 11):
+            Appointment.objects.create(
+                patient=patient, doctor=self.doctor, service=service, start_at=at(MONDAY, hh), end_at=at(MONDAY, hh, 30),
+            )
+        auth(self.client, self.admin)
+
+    def work(self):
+        call_command("run_jobs", "--once", "--threads", "2", "--poll", "0.05", stdout=StringIO())
+
+    def test_export_runs_in_worker_and_downloads(self):
+        r = self.client.post(URL, {"kind": "appointments_export", "params": {"doctor": self.doctor.id}}, format="json")
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual((r.data["status"], r.data["params"]["type"]), (JobStatus.QUEUED, "csv"))
+        job_id = r.data["id"]
+        self.assertEqual(self.client.get(f"{URL}{job_id}/result/").status_code, 409)
+
+        self.work()
+        r = self.client.get(f"{URL}{job_id}/")
+        self.assertEqual((r.data["status"], r.data["attempts"]), (JobStatus.SUCCEEDED, 1))
+        self.assertTrue(r.data["result_name"].endswith(".csv"))
+
+        r = self.client.get(f"{URL}{job_id}/result/")
+        self.assertEqual(r.status_code, 200)
+        body = b"".join(r.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(len(body), 4)  # заголовок + 3 записи
+
+    def test_utilization_report_job(self):
+        r = self.client.post(URL, {
+            "kind": "utilization_report", "params": {"date_from": "2030-01-07", "date_to": "2030-01-13"},
+        }, format="json")
+        self.assertEqual(r.status_code, 201)
+        self.work()
+
+        job = Job.objects.get(pk=r.data["id"])
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        payload = json.loads(runner.result_path(job).read_bytes())
+        self.assertEqual(payload["date_from"], "2030-01-07")
+        self.assertIn("results", payload)
+
+    def test_failure_is_recorded(self):
+        job = Job.objects.create(kind="test_failing", created_by=self.admin)
+        with self.assertLogs("jobs.runner", "ERROR"):
+            self.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.error, "RuntimeError: boom")
+        self.assertEqual(list(runner.results_dir(job).iterdir()), [])  # недописанный файл удалён
+
+    def test_stale_job_is_requeued_then_failed(self):
+        job = Job.objects.create(kind="test_failing")
+        claimed = runner.claim(worker="dead:1")
+        self.assertEqual(claimed.pk, job.pk)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+
+        self.assertEqual(runner.requeue_stale(stale_seconds=60, max_attempts=2), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (JobStatus.QUEUED, ""))
+
+        # вторая попытка тоже зависла: больше не повторяем
+        runner.claim(worker="dead:2")
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(runner.requeue_stale(stale_seconds=60, max_attempts=2), (0, 1))
+        # результат первой попытки уже не принимается
+        self.assertFalse(runner._finish(claimed, JobStatus.SUCCEEDED))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatus.FAILED, 2))
+
+    def test_result_of_a_taken_over_attempt_is_dropped(self):
+        job = Job.objects.create(kind="appointments_export", params={"type": "csv"})
+        first = runner.claim(worker="slow:1")
+        # пока первая попытка работает, её признали зависшей и отдали другому воркеру
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        runner.requeue_stale(stale_seconds=60)
+        second = runner.claim(worker="fast:1")
+
+        self.assertEqual(runner.run(second), JobStatus.SUCCEEDED)
+        published = runner.result_path(Job.objects.get(pk=job.pk))
+        content = published.read_bytes()
+
+        # первая попытка заканчивает позже и видит уже другие данные
+        appt = Appointment.objects.first()
+        Appointment.objects.create(
+            patient=appt.patient, doctor=self.doctor, service=appt.service, start_at=at(MONDAY, 12), end_at=at(MONDAY, 12, 30),
+        )
+        with self.assertLogs("jobs.runner", "WARNING"):
+            runner.run(first)
+        job.refresh_from_db()
+        self.assertEqual((job.worker, job.attempts, runner.result_path(job)), ("fast:1", 2, published))
+        self.assertEqual(published.read_bytes(), content)
+        self.assertEqual([p.name for p in runner.results_dir(job).iterdir()], ["2"])  # файл первой попытки удалён
+
+    def test_cancel(self):
+        job_id = self.client.post(URL, {"kind": "appointments_export", "params": {}}, format="json").data["id"]
+        r = self.client.post(f"{URL}{job_id}/cancel/")
+        self.assertEqual((r.status_code, r.data["status"]), (200, JobStatus.CANCELLED))
+        self.assertEqual(self.client.post(f"{URL}{job_id}/cancel/").status_code, 409)
+
+        self.work()
+        self.assertEqual(Job.objects.get(pk=job_id).status, JobStatus.CANCELLED)
+        self.assertEqual(self.client.get(f"{URL}{job_id}/result/").status_code, 409)
+
+    def test_validation(self):
+        post = lambda data: self.client.post(URL, data, format="json").status_code
+        self.assertEqual(post({"kind": "nope", "params": {}}), 400)
+        self.assertEqual(post({"kind": "appointments_export", "params": {"type": "pdf"}}), 400)
+        self.assertEqual(post({"kind": "appointments_export", "params": {"date_from": "yesterday"}}), 400)
+        self.assertEqual(post({"kind": "utilization_report", "params": {"date_from": "2030-01-01", "date_to": "2031-06-01"}}), 400)
+        self.assertEqual(Job.objects.count(), 0)
+
+        auth(self.client, self.doctor)
+        self.assertEqual(self.client.get(URL).status_code, 403)
+
+    def test_purge_removes_old_results(self):
+        job = Job.objects.create(kind="appointments_export")
+        self.work()
+        job.refresh_from_db()
+        directory = runner.results_dir(job)
+        self.assertTrue(directory.exists())
+
+        call_command("purge_jobs", "--days", "1", stdout=StringIO())
+        self.assertTrue(Job.objects.filter(pk=job.pk).exists())
+        Job.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=2))
+        call_command("purge_jobs", "--days", "1", stdout=StringIO())
+        self.assertFalse(Job.objects.filter(pk=job.pk).exists())
+        self.assertFalse(directory.exists())
@@ -0,0 +1,49 @@
+from django.http import FileResponse
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from audit.models import AuditAction
+from audit.utils import log_action
+from core.permissions import IsAdminRole
+from . import runner
+from .models import Job, JobStatus
+from .serializers import JobSerializer
+
+
+class AdminJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Background jobs: POST {"kind", "params"} queues a job (201, status QUEUED); a `run_jobs` worker runs it.
+    Poll GET /{id}/ until SUCCEEDED / FAILED, then download GET /{id}/result/.
+    """
+    queryset = Job.objects.select_related("created_by").all().order_by("-id")
+    serializer_class = JobSerializer
+    permission_classes = [IsAdminRole]
+    filterset_fields = ("status", "kind")
+
+    def perform_create(self, serializer):
+        obj = serializer.save(created_by=self.request.user)
+        log_action(request=self.request, action=AuditAction.CREATE, obj=obj, meta={"kind": obj.kind})
+
+    @action(detail=True, methods=["get"])
+    def result(self, request, pk=None):
+        job = self.get_object()
+        path = runner.result_path(job)
+        if path is None:
+            return Response({"detail": f"Job has no result (status {job.status})."}, status=409)
+        if not path.exists():
+            return Response({"detail": "Result file is gone."}, status=410)
+
+        log_action(request=request, action=AuditAction.READ, obj=job, meta={"type": "job_result"})
+        return FileResponse(
+            open(path, "rb"), as_attachment=True, filename=job.result_name, content_type=job.result_content_type,
+        )
+
+    @action(detail=True, methods=["post"])
+    def cancel(self, request, pk=None):
+        job = self.get_object()
+        if not runner.cancel(job):
+            return Response({"detail": f"Only a queued job can be cancelled (status {job.status})."}, status=409)
+        job.refresh_from_db()
+        log_action(request=request, action=AuditAction.UPDATE, obj=job, meta={"status": JobStatus.CANCELLED})
+        return Response(self.get_serializer(job).data)
@@ -12,6 +12,7 @@ export const adminApi = {
   createPatient: async (payload) => (await http.post("/admin/patients/", payload)).data,
   patchPatient: async (id, payload) => (await http.patch(`/admin/patients/${id}/`, payload)).data,
   deletePatient: async (id) => (await http.delete(`/admin/patients/${id}/`)).data,
+  lookupCaller: async (phone) => (await http.get("/admin/patients/caller_id/", { params: { phone } })).data,
 
   // --- SERVICES ---
   listServices: async (params = {}) => (await http.get("/admin/services/", { params })).data,
@@ -24,6 +25,7 @@ export const adminApi = {
   createRoom: async (payload) => (await http.post("/admin/rooms/", payload)).data,
   patchRoom: async (id, payload) => (await http.patch(`/admin/rooms/${id}/`, payload)).data,
   deleteRoom: async (id) => (await http.delete(`/admin/rooms/${id}/`)).data,
+  getRoomOccupancy: async (date) => (await http.get("/admin/rooms/occupancy/", { params: { date } })).data,
 
   // --- APPOINTMENTS ---
   listAppointments: async (params = {}) => (await http.get("/admin/appointments/", { params })).data,
@@ -31,5 +33,28 @@ export const adminApi = {
   getAppointment: async (id) => (await http.get(`/admin/appointments/${id}/`)).data,
   patchAppointment: async (id, payload) => (await http.patch(`/admin/appointments/${id}/`, payload)).data,
   deleteAppointment: async (id) => (await http.delete(`/admin/appointments/${id}/`)).data,
+  createAppointmentSeries: async (payload) => (await http.post("/admin/appointments/series/", payload)).data,
+  bulkSetAppointmentStatus: async (ids, status) =>
+    (await http.post("/admin/appointments/bulk_status/", { ids, status })).data,
+  exportAppointments: async (params = {}, type = "csv") =>
+    (await http.get("/admin/appointments/export/", { params: { ...params, type }, responseType: "blob" })).data,
+
+  // --- AVAILABILITY ---
+  getAvailability: async (params = {}) => (await http.get("/admin/availability/", { params })).data,
+  findFirstAvailable: async (params = {}) => (await http.get("/admin/availability/first/", { params })).data,
+  getScheduleGrid: async (params = {}) => (await http.get("/admin/schedule/grid/", { params })).data,
+
+  // --- REPORTS ---
+  getAppointmentsReport: async (params = {}) => (await http.get("/admin/reports/appointments/", { params })).data,
+  getAppointmentsTrend: async (params = {}) =>
+    (await http.get("/admin/reports/appointments/trend/", { params })).data,
+  getUtilizationReport: async (params = {}) => (await http.get("/admin/reports/utilization/", { params })).data,
+
+  // --- JOBS ---
+  createJob: async (kind, params = {}) => (await http.post("/admin/jobs/", { kind, params })).data,
+  listJobs: async (params = {}) => (await http.get("/admin/jobs/", { params })).data,
+  getJob: async (id) => (await http.get(`/admin/jobs/${id}/`)).data,
+  downloadJobResult: async (id) => (await http.get(`/admin/jobs/${id}/result/`, { responseType: "blob" })).data,
+  cancelJob: async (id) => (await http.post(`/admin/jobs/${id}/cancel/`)).data,
 
 };
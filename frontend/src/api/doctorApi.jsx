@@ -5,6 +5,9 @@ export const doctorApi = {
   listAppointments: async (params = {}) => (await http.get("/doctor/appointments/", { params })).data,
   getAppointment: async (id) => (await http.get(`/doctor/appointments/${id}/`)).data,
   setStatus: async (id, status) => (await http.post(`/doctor/appointments/${id}/set_status/`, { status })).data,
+  bulkSetStatus: async (ids, status) => (await http.post("/doctor/appointments/bulk_status/", { ids, status })).data,
+  getAvailability: async (params = {}) => (await http.get("/doctor/availability/", { params })).data,
+  getWeekCalendar: async (date) => (await http.get("/doctor/calendar/week/", { params: { date } })).data,
 
   // --- visit notes ---
   listVisitNotes: async (params = {}) => (await http.get("/doctor/visit-notes/", { params })).data,
@@ -12,6 +15,8 @@ export const doctorApi = {
   createVisitNote: async (payload) => (await http.post("/doctor/visit-notes/", payload)).data,
   patchVisitNote: async (id, payload) => (await http.patch(`/doctor/visit-notes/${id}/`, payload)).data,
   deleteVisitNote: async (id) => (await http.delete(`/doctor/visit-notes/${id}/`)).data,
+  searchVisitNotes: async (q, params = {}) =>
+    (await http.get("/doctor/visit-notes/search/", { params: { q, ...params } })).data,
 
   // --- attachments ---
   listAttachments: async (noteId) =>